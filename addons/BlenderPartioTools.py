@@ -15,20 +15,52 @@ import bpy
 import sys
 import os
 import re
+import time
 import mathutils
 import partio_pybind
 from bpy_extras.io_utils import ImportHelper
 from bpy.app.handlers import persistent
 from bpy.props import StringProperty, BoolProperty, EnumProperty, FloatProperty
 from bpy.types import Operator
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 
+# Maps partio's y-up coordinates to Blender's z-up coordinates: (x, y, z) -> (x, -z, y)
+AXIS_CONVERSION = np.array([[1., 0., 0.],
+                            [0., 0., -1.],
+                            [0., 1., 0.]])
+
+
+class PartioFrameBuffers:
+    """Scratch arrays of one emitter that are reused between frames.
+
+    The arrays only grow, so for constant particle counts no memory is allocated per frame.
+    """
+    def __init__(self):
+        self.allocate(0)
+
+    def reserve(self, numParticles):
+        if numParticles > self.capacity:
+            self.allocate(numParticles)
+
+    def allocate(self, numParticles):
+        self.capacity = numParticles
+        self.position = np.empty((numParticles, 3), dtype=np.float32)
+        self.location = np.empty((numParticles, 3), dtype=np.float32)
+        self.colorField = np.empty((numParticles, 3), dtype=np.float32)
+        self.velocity = np.empty((numParticles, 3), dtype=np.float32)
+        self.speed = np.empty(numParticles, dtype=np.float32)
+
+
 class PartioReader:
     def __init__( self, param ):
         self.param = param
+        self.buffers = PartioFrameBuffers()
+        # decoded frames by file name, least recently used first
+        self.frames = {}
+        self.crop = None
 
     def __call__(self, scene, depsgraph=None):
-        partioFile = self.param[0]
         emitterObject = self.param[1]
 
         try:
@@ -39,6 +71,15 @@ class PartioReader:
             bpy.app.handlers.frame_change_post.remove(self)
             return
 
+        fileName = self.fileName(scene)
+        print("Read partio file: " + fileName)
+        p = self.read(fileName, cropBox(emitterObject))
+        self.upload(p, scene, depsgraph)
+        self.retain({fileName: p}, 0)
+
+    def fileName(self, scene, offset=0):
+        partioFile = self.param[0]
+
         indexlist = re.findall(r'\d+', partioFile)
         self.isSequence = True
         if len(indexlist) == 0:
@@ -48,28 +89,71 @@ class PartioReader:
             frameNumber = int(indexlist[-1])
             idx = partioFile.rfind(str(frameNumber))
             l = len(str(frameNumber))
-            fileName = str(partioFile[0:idx]) + str(scene.frame_current-1) + str(partioFile[idx+l:])
-
-        print("Read partio file: " + fileName)
-
-        p = partio_pybind.read(fileName)
+            fileName = str(partioFile[0:idx]) + str(scene.frame_current-1+offset) + str(partioFile[idx+l:])
+        return fileName
+
+    def read(self, fileName, crop=None):
+        # Only touches partio, so this may run on a worker thread
+        p = self.frames.get(fileName)
+        if p is None:
+            if crop is not None and fileName.endswith(".pbk"):
+                # only decompresses the bricks that overlap the crop box
+                p = partio_pybind.readBricked(fileName, crop[0], crop[1])
+            else:
+                p = partio_pybind.read(fileName)
+        return p
+
+    def setCrop(self, crop):
+        # cached frames were cropped to the previous box
+        if crop != self.crop:
+            self.clear()
+            self.crop = crop
+
+    def retain(self, frames, capacity):
+        """Caches the given decoded frames and releases the least recently used ones beyond capacity."""
+        for fileName, p in frames.items():
+            if p is None:
+                continue
+            self.frames.pop(fileName, None)
+            self.frames[fileName] = p
+        while len(self.frames) > capacity:
+            self.evictOldest()
+
+    def evictOldest(self):
+        self.frames.pop(next(iter(self.frames))).release()
+
+    def clear(self):
+        self.retain({}, 0)
+
+    def upload(self, p, scene, depsgraph=None, pNext=None):
+        emitterObject = self.param[1]
+        pointCloud = emitterObject.partio.backend == 'MESH'
 
         cur_frame = scene.frame_current
         start_frame = scene.frame_start
-        if cur_frame == start_frame:
+        if cur_frame == start_frame and not pointCloud:
             seed = emitterObject.particle_systems[0].seed
             emitterObject.particle_systems[0].seed = seed
 
         if p != None:
+            # frames of a live source are read directly from the producer's shared memory
+            shared = isinstance(p, partio_pybind.SharedFrame)
             totalParticles = p.numParticles()
-            print("# particles: " + str(totalParticles))
-
-            emitterObject.particle_systems[0].settings.count = totalParticles
+            # command line renders log a timing line per frame instead
+            headless = bpy.app.background
+            if not headless:
+                print("# particles: " + str(totalParticles))
+
+            if pointCloud:
+                mesh = emitterObject.data
+                resizePointCloud(mesh, totalParticles)
+            else:
+                emitterObject.particle_systems[0].settings.count = totalParticles
 
-            if depsgraph is None:
-                depsgraph = bpy.context.evaluated_depsgraph_get()
-            particle_systems = emitterObject.evaluated_get(depsgraph).particle_systems
-            particles = particle_systems[0].particles
+                if depsgraph is None:
+                    depsgraph = bpy.context.evaluated_depsgraph_get()
+                particle_systems = emitterObject.evaluated_get(depsgraph).particle_systems
+                particles = particle_systems[0].particles
 
             posAttr = None
             velAttr = None
@@ -78,79 +162,382 @@ class PartioReader:
                 if attr.name=="position": posAttr = attr
                 if attr.name.upper()==emitterObject.partio.color_field: velAttr = attr
 
-            pos = np.array(p.data_buffer(posAttr), copy=True)
-            pos[:, [2, 1]] = pos[:, [1, 2]]
-            pos[:, 1] = -pos[:, 1]
-            world_mat = np.array(emitterObject.matrix_world)
-            tpos = np.concatenate([pos, np.ones((p.numParticles(), 1))], axis=1) @ world_mat.T
-            pos = tpos[:, :3]
+            n = totalParticles
+            buffers = self.buffers
+            buffers.reserve(n)
+            if pointCloud:
+                # vertices are given in the emitter's local space, Blender applies its transformation
+                rotation = AXIS_CONVERSION.T.astype(np.float32)
+                translation = None
+            else:
+                world_mat = np.array(emitterObject.matrix_world)
+                # transposed, so that row vectors can be transformed in place with matmul(..., out=...)
+                rotation = (world_mat[:3, :3] @ AXIS_CONVERSION).T.astype(np.float32)
+                translation = world_mat[:3, 3].astype(np.float32)
+
+            if shared:
+                pos = p.array(posAttr)
+            elif scene.frame_subframe > 0.:
+                # motion blur step between two files, interpolated by particle id or extrapolated with the velocity
+                dt = scene.render.fps_base / scene.render.fps
+                pos = partio_pybind.interpolatePositions(p, pNext, scene.frame_subframe, dt, buffers.position)[:n]
+            else:
+                pos = p.data_copy(posAttr, buffers.position)[:n]
+            location = np.matmul(pos, rotation, out=buffers.location[:n])
+            if translation is not None:
+                location += translation
 
             # Set the location of all particle locations to flatList
-            particles.foreach_set("location", pos.ravel())
+            if pointCloud:
+                mesh.vertices.foreach_set("co", location.ravel())
+            else:
+                particles.foreach_set("location", location.ravel())
 
             if velAttr is not None:
-                vel = np.zeros_like(pos)
-                vel[:, 0:velAttr.count] = np.array(p.data_buffer(velAttr), copy=True).astype(float)
+                if shared and velAttr.count == 3 and velAttr.type != partio_pybind.ParticleAttributeType.INT:
+                    colorField = p.array(velAttr)
+                else:
+                    colorField = buffers.colorField[:n]
+                    if velAttr.count < 3:
+                        colorField[:, velAttr.count:] = 0.
+                    p.data_copy(velAttr, colorField)
+                vel = colorField
                 if velAttr.name.upper() == "VELOCITY":
-                    vel[:, [2, 1]] = vel[:, [1, 2]]
-                    vel[:, 1] = -vel[:, 1]
-                    tvel = np.concatenate([vel, np.ones((p.numParticles(), 1))], axis=1) @ world_mat.T - np.append(np.array(emitterObject.location), 0)
-                    vel = tvel[:, :3]
-                particles.foreach_set("velocity", vel.ravel())
-                emitterObject.partio.max_velocity = np.max(np.linalg.norm(vel, axis=1))
+                    vel = np.matmul(colorField, rotation, out=buffers.velocity[:n])
+                    if translation is not None:
+                        vel += translation - np.array(emitterObject.location, dtype=np.float32)
+                if pointCloud:
+                    setPointAttribute(mesh, "velocity", 'FLOAT_VECTOR', vel)
+                else:
+                    particles.foreach_set("velocity", vel.ravel())
+                if not headless:
+                    # only shown in the partio panel
+                    speed = np.einsum('ij,ij->i', vel, vel, out=buffers.speed[:n])
+                    emitterObject.partio.max_velocity = np.sqrt(np.max(speed)) if n > 0 else 0.
+
+            if pointCloud:
+                mesh.update()
+            else:
+                emitterObject.particle_systems[0].settings.frame_end = 0
+
+
+def cropBox(emitterObject):
+    """Returns the bounds of the emitter's crop object in the coordinates of the partio files, or None."""
+    crop = emitterObject.partio.crop_object
+    if crop is None:
+        return None
+    corners = np.array([list(crop.matrix_world @ mathutils.Vector(corner)) for corner in crop.bound_box])
+    world_mat = np.array(emitterObject.matrix_world)
+    # particles are placed at world_mat * AXIS_CONVERSION * position by both backends
+    toPartio = np.linalg.inv(world_mat[:3, :3] @ AXIS_CONVERSION)
+    corners = (corners - world_mat[:3, 3]) @ toPartio.T
+    return tuple(corners.min(axis=0).tolist()), tuple(corners.max(axis=0).tolist())
+
+
+def resizePointCloud(mesh, numPoints):
+    # the vertex layer can only grow, so it is rebuilt whenever the particle count changes
+    if len(mesh.vertices) != numPoints:
+        mesh.clear_geometry()
+        mesh.vertices.add(numPoints)
+
+
+def setPointAttribute(mesh, name, attrType, values):
+    attr = mesh.attributes.get(name)
+    if attr is None:
+        attr = mesh.attributes.new(name=name, type=attrType, domain='POINT')
+    attr.data.foreach_set("vector" if attrType == 'FLOAT_VECTOR' else "value", values.ravel())
+
+
+class PartioDispatcher:
+    """Frame change handler that loads the partio files of all emitters.
+
+    The files of all emitters are read concurrently on a thread pool, then the particles are
+    uploaded to Blender in a single pass on the main thread. With motion blur the last decoded
+    frames stay cached, so the sub-frames of a shutter interval do not read them again.
+
+    In command line renders (blender -b) the frames are rendered in order, so the files of the
+    following frames of the job's range are decoded while the current frame renders, and a
+    timing line is logged per frame instead of the interactive output.
+    """
+    # the frames before, at and after the current frame are needed for motion blur
+    motionBlurFrames = 3
+    # number of frames that are decoded ahead of the current frame in command line renders
+    prefetchFrames = 4
+
+    def __init__(self):
+        self.readers = {}
+        self.executor = None
+        # (emitter name, file name) -> (frame, future) of the files decoded ahead
+        self.prefetched = {}
 
-            emitterObject.particle_systems[0].settings.frame_end = 0
-            p.release()
+    def __call__(self, scene, depsgraph=None):
+        emitters = [obj for obj in bpy.data.objects if obj.partio.init and obj.partio.source == 'FILE']
+
+        # keep one reader, and with it the frame buffers, per emitter
+        readers = {}
+        for obj in emitters:
+            reader = self.readers.get(obj.name)
+            if reader is None:
+                reader = PartioReader([obj.partio.file, obj])
+            reader.param = [obj.partio.file, obj]
+            readers[obj.name] = reader
+        for name, reader in self.readers.items():
+            if name not in readers:
+                self.discardPrefetched(name)
+                reader.clear()
+        self.readers = readers
+        if len(emitters) == 0:
+            return
 
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 1)
+
+        headless = bpy.app.background
+        start = time.perf_counter()
+        capacity = self.motionBlurFrames if scene.render.use_motion_blur else 0
+        fileNames = [self.readers[obj.name].fileName(scene) for obj in emitters]
+        # a sub-frame lies between the files of the current and the next frame
+        nextFileNames = [self.readers[obj.name].fileName(scene, 1)
+                         if scene.frame_subframe > 0. and self.readers[obj.name].isSequence else None
+                         for obj in emitters]
+        for obj in emitters:
+            reader = self.readers[obj.name]
+            crop = cropBox(obj)
+            if crop != reader.crop:
+                # files decoded ahead were cropped to the previous box
+                self.discardPrefetched(obj.name)
+            reader.setCrop(crop)
+        futures = [(self.submitRead(obj, fileName),
+                    self.submitRead(obj, nextFileName) if nextFileName is not None else None)
+                   for obj, fileName, nextFileName in zip(emitters, fileNames, nextFileNames)]
+        if headless:
+            self.prefetch(scene, emitters)
+
+        readTime = waitTime = uploadTime = 0.
+        numParticles = 0
+        for obj, fileName, nextFileName, (future, nextFuture) in zip(emitters, fileNames, nextFileNames, futures):
+            waitStart = time.perf_counter()
+            try:
+                p, emitterReadTime = future.result()
+                pNext, nextReadTime = nextFuture.result() if nextFuture is not None else (None, 0.)
+            except Exception as e:
+                print("Failed to read partio file " + fileName + ": " + str(e))
+                continue
+            waitTime += time.perf_counter() - waitStart
+            emitterReadTime += nextReadTime
+            readTime += emitterReadTime
+            reader = self.readers[obj.name]
+            # counted first, retain() releases the particles if they are not cached
+            emitterParticles = p.numParticles() if p is not None else 0
+            uploadStart = time.perf_counter()
+            try:
+                # like a handler of its own, a failing emitter does not stop the others
+                reader.upload(p, scene, depsgraph, pNext)
+                reader.retain({fileName: p, nextFileName: pNext}, capacity)
+            except Exception as e:
+                print("Failed to load partio file " + fileName + ": " + str(e))
+                continue
+            emitterUploadTime = time.perf_counter() - uploadStart
+            numParticles += emitterParticles
+            uploadTime += emitterUploadTime
+            obj.partio.load_time = 1000. * (emitterReadTime + emitterUploadTime)
+            if not headless:
+                print("Read partio file: %s (read %.1f ms, upload %.1f ms)" %
+                      (fileName, 1000. * emitterReadTime, 1000. * emitterUploadTime))
+
+        if headless:
+            # one line per frame that render farm monitoring can parse
+            print("partio frame=%d subframe=%.3f emitters=%d particles=%d read_ms=%.1f wait_ms=%.1f "
+                  "upload_ms=%.1f total_ms=%.1f prefetched=%d" %
+                  (scene.frame_current, scene.frame_subframe, len(emitters), numParticles, 1000. * readTime,
+                   1000. * waitTime, 1000. * uploadTime, 1000. * (time.perf_counter() - start), len(self.prefetched)))
+        else:
+            print("Loaded %d partio emitters in %.1f ms" % (len(emitters), 1000. * (time.perf_counter() - start)))
+        self.enforceBudget(scene)
+
+    def submitRead(self, obj, fileName):
+        # a file that was decoded ahead is taken over, so that it is owned by the reader's cache only
+        prefetched = self.prefetched.pop((obj.name, fileName), None)
+        if prefetched is not None:
+            return prefetched[1]
+        return self.executor.submit(self.timedRead, self.readers[obj.name], fileName)
+
+    def prefetch(self, scene, emitters):
+        """Decodes the files of the frames after the current one, up to the end of the job's range."""
+        for key, (frame, future) in list(self.prefetched.items()):
+            if frame <= scene.frame_current:
+                # frames were skipped or rendered out of order
+                del self.prefetched[key]
+                self.releaseFuture(future)
+
+        lastFrame = min(scene.frame_end, scene.frame_current + self.prefetchFrames)
+        for frame in range(scene.frame_current + 1, lastFrame + 1):
+            for obj in emitters:
+                reader = self.readers[obj.name]
+                if not reader.isSequence:
+                    continue
+                fileName = reader.fileName(scene, frame - scene.frame_current)
+                key = (obj.name, fileName)
+                if key in self.prefetched or fileName in reader.frames:
+                    continue
+                self.prefetched[key] = (frame, self.executor.submit(self.timedRead, reader, fileName))
+
+    def discardPrefetched(self, name=None):
+        for key, (frame, future) in list(self.prefetched.items()):
+            if name is None or key[0] == name:
+                del self.prefetched[key]
+                self.releaseFuture(future)
+
+    @staticmethod
+    def releaseFuture(future):
+        # reads that are still running release their particles when they are done
+        def release(future):
+            if not future.cancelled() and future.exception() is None:
+                p = future.result()[0]
+                if p is not None:
+                    p.release()
+        if not future.cancel():
+            future.add_done_callback(release)
+
+    def enforceBudget(self, scene):
+        budget = scene.partio_memory_budget * 1024 * 1024
+        if budget <= 0:
+            return
+        # cached motion blur frames are the only particle data that can be given back
+        while partio_pybind.memoryUsage() > budget:
+            cached = [reader for reader in self.readers.values() if len(reader.frames) > 0]
+            if len(cached) == 0:
+                print("Partio: %.1f MB of particle data exceed the memory budget of %.1f MB" %
+                      (partio_pybind.memoryUsage() / (1024. * 1024.), scene.partio_memory_budget))
+                break
+            max(cached, key=lambda reader: len(reader.frames)).evictOldest()
+
+    @staticmethod
+    def timedRead(reader, fileName):
+        start = time.perf_counter()
+        p = reader.read(fileName, reader.crop)
+        return p, time.perf_counter() - start
+
+    def reset(self):
+        self.discardPrefetched()
+        for reader in self.readers.values():
+            reader.clear()
+        self.readers = {}
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+        self.reset()
+
+
+dispatcher = PartioDispatcher()
+
+
+def registerDispatcher():
+    # replaces readers registered per emitter by older versions of the add-on
+    handlers = bpy.app.handlers.frame_change_post
+    for callback in list(handlers):
+        if isinstance(callback, (PartioReader, PartioDispatcher)):
+            handlers.remove(callback)
+    handlers.append(dispatcher)
+
+
+# seconds between two polls of the live sources, about the display rate
+LIVE_UPDATE_INTERVAL = 1. / 30.
+
+
+class PartioLiveSource:
+    """Uploads the newest frame that a running simulation published to shared memory.
+
+    The frame is not copied, its attributes are mapped into numpy arrays. If the producer
+    overwrites the frame during the upload, the next poll uploads the newer frame.
+    """
+    def __init__(self, obj):
+        self.reader = PartioReader([obj.partio.shared_memory_name, obj])
+        self.sharedFrames = None
+        self.counter = None
+
+    def update(self, obj, scene):
+        self.reader.param = [obj.partio.shared_memory_name, obj]
+        if self.sharedFrames is None or self.sharedFrames.closed():
+            # the producer is not running yet or was restarted
+            self.sharedFrames = partio_pybind.SharedFrameReader.open(obj.partio.shared_memory_name)
+            self.counter = None
+            if self.sharedFrames is None:
+                return
+
+        start = time.perf_counter()
+        frame = self.sharedFrames.acquire()
+        if frame is None or frame.counter == self.counter:
+            return
+        self.reader.upload(frame, scene)
+        if not frame.valid():
+            print("Partio: live frame %d was overwritten while uploading" % frame.frame)
+        self.counter = frame.counter
+        obj.partio.load_time = 1000. * (time.perf_counter() - start)
+        print("Live partio frame %d: %d particles, %.1f ms after publishing" %
+              (frame.frame, frame.numParticles(), 1000. * (time.time() - frame.time)))
 
-class PartioImporter(Operator, ImportHelper):
-    bl_idname = "importer.partio"
-    bl_label = "Import partio files"
 
-    filter_glob: StringProperty(
-        default="*.bgeo",
-        options={'HIDDEN'},
-        maxlen=255,
-    )
+class PartioLiveUpdater:
+    """Timer that polls the live sources of all emitters."""
+    def __init__(self):
+        self.sources = {}
 
-    particleRadius: FloatProperty(
-        name="Particle radius",
-        description="Particle radius",
-        default=0.025,
-    )
+    def __call__(self):
+        emitters = [obj for obj in bpy.data.objects if obj.partio.init and obj.partio.source == 'SHARED_MEMORY']
+        if len(emitters) == 0:
+            self.reset()
+            # stops the timer, importing a live source starts it again
+            return None
 
-    maxVel: FloatProperty(
-        name="Max. velocity",
-        description="Max. velocity",
-        default=5.0,
-    )
+        sources = {}
+        for obj in emitters:
+            source = self.sources.get(obj.name)
+            if source is None or source.reader.param[0] != obj.partio.shared_memory_name:
+                source = PartioLiveSource(obj)
+            sources[obj.name] = source
+        self.sources = sources
 
-    def execute(self, context):
-        self.emitterObject = None
-        self.initParticleSystem()
+        scene = bpy.context.scene
+        for obj in emitters:
+            try:
+                self.sources[obj.name].update(obj, scene)
+            except Exception as e:
+                print("Failed to update live partio source " + obj.partio.shared_memory_name + ": " + str(e))
+        return LIVE_UPDATE_INTERVAL
 
-        #run the function on each frame
-        param = [self.filepath, self.emitterObject]
+    def invalidate(self, name):
+        # the next poll uploads the current frame again
+        source = self.sources.get(name)
+        if source is not None:
+            source.counter = None
 
-        self.emitterObject.partio.file = self.filepath
-        self.emitterObject.partio.init = True
+    def reset(self):
+        self.sources = {}
 
-        bpy.app.handlers.frame_change_post.append(PartioReader(param))
 
-        scn = bpy.context.scene
-        scn.render.engine = 'CYCLES'
+liveUpdater = PartioLiveUpdater()
 
-        indexlist = re.findall(r'\d+', self.filepath)
-        self.isSequence = True
-        if len(indexlist) == 0:
-            self.isSequence = False
-            bpy.context.scene.frame_current = 2
-        else:
-            frameNumber = int(indexlist[-1])
-            bpy.context.scene.frame_current = frameNumber+1
 
-        return {'FINISHED'}
+def registerLiveUpdater():
+    if not bpy.app.timers.is_registered(liveUpdater):
+        bpy.app.timers.register(liveUpdater, first_interval=LIVE_UPDATE_INTERVAL, persistent=True)
+
+
+def unregisterLiveUpdater():
+    if bpy.app.timers.is_registered(liveUpdater):
+        bpy.app.timers.unregister(liveUpdater)
+    liveUpdater.reset()
 
+
+class PartioEmitterBuilder:
+    """Creates the emitter object of either backend, shared by the importers.
+
+    The importers provide the backend, particleRadius and maxVel properties and the number
+    of particles that is expected, which selects the display method.
+    """
     def initParticleSystem(self):
         # create emitter object
         bpy.ops.mesh.primitive_cube_add(enter_editmode=False, location=(0, 0, 0))
@@ -159,9 +546,9 @@ class PartioImporter(Operator, ImportHelper):
         self.emitterObject.hide_viewport = False
         self.emitterObject.hide_render = False
         self.emitterObject.hide_select = False
+        self.emitterObject.partio.backend = 'PARTICLES'
 
-        p = partio_pybind.readHeaders(self.filepath)
-        nParticles = p.numParticles()
+        nParticles = self.numParticlesHint()
 
         # add particle system
         bpy.ops.object.modifier_add(type='PARTICLE_SYSTEM')
@@ -182,6 +569,42 @@ class PartioImporter(Operator, ImportHelper):
 
         self.emitterObject.partio.particle_radius = self.particleRadius
 
+        sphereObj = self.initSphere()
+        bpy.context.view_layer.objects.active = self.emitterObject
+        self.initMaterial(sphereObj)
+
+        self.emitterObject.particle_systems[0].settings.render_type = 'OBJECT'
+        self.emitterObject.particle_systems[0].settings.instance_object = bpy.data.objects[sphereObj.name]
+
+    def initPointCloud(self):
+        # create an empty mesh whose vertices are overwritten on each frame
+        mesh = bpy.data.meshes.new("PartioPoints")
+        self.emitterObject = bpy.data.objects.new("PartioPoints", mesh)
+        bpy.context.collection.objects.link(self.emitterObject)
+        bpy.context.view_layer.objects.active = self.emitterObject
+        self.emitterObject.select_set(True)
+        self.emitterObject.partio.backend = 'MESH'
+
+        nParticles = self.numParticlesHint()
+
+        sphereObj = self.initSphere()
+        bpy.context.view_layer.objects.active = self.emitterObject
+
+        # instance the sphere on all vertices
+        modifier = self.emitterObject.modifiers.new("PartioInstancing", 'NODES')
+        modifier.node_group = createInstancingNodeGroup(sphereObj, self.particleRadius)
+
+        if nParticles > 10000:
+            self.emitterObject.partio.display_method = 'DOT'
+        else:
+            self.emitterObject.partio.display_method = 'RENDER'
+        modifier.show_viewport = self.emitterObject.partio.display_method == 'RENDER'
+
+        self.emitterObject.partio.particle_radius = self.particleRadius
+
+        self.initMaterial(sphereObj)
+
+    def initSphere(self):
         # add object for rendering particles
         bpy.ops.mesh.primitive_uv_sphere_add(radius=1, enter_editmode=False, location=(0, 0, 0))
         bpy.ops.object.shade_smooth()
@@ -190,7 +613,9 @@ class PartioImporter(Operator, ImportHelper):
         sphereObj.hide_viewport = False
         sphereObj.hide_render = True
         sphereObj.hide_select = True
+        return sphereObj
 
+    def initMaterial(self, sphereObj):
         # add velocity-dependent color material
         found = True
         index = 1
@@ -217,7 +642,15 @@ class PartioImporter(Operator, ImportHelper):
         diffuse = nodes.new( type = 'ShaderNodeBsdfDiffuse' )
         link = links.new( diffuse.outputs['BSDF'], output.inputs['Surface'] )
 
-        particleInfo = nodes.new( type = 'ShaderNodeParticleInfo' )
+        if self.backend == 'MESH':
+            # the velocity point attribute is passed on to the sphere instances
+            velocityAttribute = nodes.new( type = 'ShaderNodeAttribute' )
+            velocityAttribute.attribute_type = 'INSTANCER'
+            velocityAttribute.attribute_name = "velocity"
+            velocity = velocityAttribute.outputs['Vector']
+        else:
+            particleInfo = nodes.new( type = 'ShaderNodeParticleInfo' )
+            velocity = particleInfo.outputs['Velocity']
 
         vecMath = nodes.new( type = 'ShaderNodeVectorMath' )
         vecMath.operation = 'DOT_PRODUCT'
@@ -233,8 +666,8 @@ class PartioImporter(Operator, ImportHelper):
         ramp = nodes.new( type = 'ShaderNodeValToRGB' )
         ramp.color_ramp.elements[0].color = (0, 0, 1, 1)
 
-        link = links.new( particleInfo.outputs['Velocity'], vecMath.inputs[0] )
-        link = links.new( particleInfo.outputs['Velocity'], vecMath.inputs[1] )
+        link = links.new( velocity, vecMath.inputs[0] )
+        link = links.new( velocity, vecMath.inputs[1] )
 
         link = links.new( vecMath.outputs['Value'], math1.inputs[0] )
         link = links.new( math1.outputs['Value'], math2.inputs[0] )
@@ -244,24 +677,196 @@ class PartioImporter(Operator, ImportHelper):
         self.emitterObject.active_material = material
         sphereObj.active_material = material
 
-        self.emitterObject.particle_systems[0].settings.render_type = 'OBJECT'
-        self.emitterObject.particle_systems[0].settings.instance_object = bpy.data.objects[sphereObj.name]
+
+class PartioImporter(PartioEmitterBuilder, Operator, ImportHelper):
+    bl_idname = "importer.partio"
+    bl_label = "Import partio files"
+
+    filter_glob: StringProperty(
+        default="*.bgeo",
+        options={'HIDDEN'},
+        maxlen=255,
+    )
+
+    particleRadius: FloatProperty(
+        name="Particle radius",
+        description="Particle radius",
+        default=0.025,
+    )
+
+    maxVel: FloatProperty(
+        name="Max. velocity",
+        description="Max. velocity",
+        default=5.0,
+    )
+
+    backend: EnumProperty(
+        name="Backend",
+        description="How the particles are represented in Blender",
+        items=[('PARTICLES', "Particle system", "Drive the particle system of a hidden emitter cube"),
+               ('MESH', "Point cloud", "Write the particles to the vertices of a mesh that is instanced by "
+                                       "Geometry Nodes (requires Blender 3.0)")],
+        default='PARTICLES',
+    )
+
+    def numParticlesHint(self):
+        with partio_pybind.readHeaders(self.filepath) as p:
+            return p.numParticles()
+
+    def execute(self, context):
+        if self.backend == 'MESH' and bpy.app.version < (3, 0, 0):
+            self.report({'ERROR'}, "The point cloud backend requires Blender 3.0 or newer")
+            return {'CANCELLED'}
+
+        self.emitterObject = None
+        if self.backend == 'MESH':
+            self.initPointCloud()
+        else:
+            self.initParticleSystem()
+
+        self.emitterObject.partio.file = self.filepath
+        self.emitterObject.partio.init = True
+
+        #run the dispatcher on each frame
+        registerDispatcher()
+
+        scn = bpy.context.scene
+        scn.render.engine = 'CYCLES'
+
+        indexlist = re.findall(r'\d+', self.filepath)
+        self.isSequence = True
+        if len(indexlist) == 0:
+            self.isSequence = False
+            bpy.context.scene.frame_current = 2
+        else:
+            frameNumber = int(indexlist[-1])
+            bpy.context.scene.frame_current = frameNumber+1
+
+        return {'FINISHED'}
+
+
+class PartioLiveImporter(PartioEmitterBuilder, Operator):
+    """Show the frames that a running simulation publishes to shared memory"""
+    bl_idname = "importer.partio_live"
+    bl_label = "Connect to a live partio source"
+
+    sharedMemoryName: StringProperty(
+        name="Shared memory name",
+        description="Name the simulation publishes its frames under",
+        default="partio",
+    )
+
+    particleRadius: FloatProperty(
+        name="Particle radius",
+        description="Particle radius",
+        default=0.025,
+    )
+
+    maxVel: FloatProperty(
+        name="Max. velocity",
+        description="Max. velocity",
+        default=5.0,
+    )
+
+    backend: EnumProperty(
+        name="Backend",
+        description="How the particles are represented in Blender",
+        items=[('PARTICLES', "Particle system", "Drive the particle system of a hidden emitter cube"),
+               ('MESH', "Point cloud", "Write the particles to the vertices of a mesh that is instanced by "
+                                       "Geometry Nodes (requires Blender 3.0)")],
+        default='MESH',
+    )
+
+    def numParticlesHint(self):
+        sharedFrames = partio_pybind.SharedFrameReader.open(self.sharedMemoryName)
+        frame = sharedFrames.acquire() if sharedFrames is not None else None
+        return frame.numParticles() if frame is not None else 0
+
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+
+    def execute(self, context):
+        if self.backend == 'MESH' and bpy.app.version < (3, 0, 0):
+            self.report({'ERROR'}, "The point cloud backend requires Blender 3.0 or newer")
+            return {'CANCELLED'}
+
+        self.emitterObject = None
+        if self.backend == 'MESH':
+            self.initPointCloud()
+        else:
+            self.initParticleSystem()
+
+        self.emitterObject.partio.source = 'SHARED_MEMORY'
+        self.emitterObject.partio.shared_memory_name = self.sharedMemoryName
+        self.emitterObject.partio.init = True
+
+        #poll the producer independently of frame changes
+        registerLiveUpdater()
+
+        return {'FINISHED'}
+
+
+def createInstancingNodeGroup(sphereObj, radius):
+    group = bpy.data.node_groups.new("PartioInstancing", 'GeometryNodeTree')
+    if hasattr(group, "interface"):
+        # Blender 4.0 and newer
+        group.interface.new_socket("Geometry", in_out='INPUT', socket_type='NodeSocketGeometry')
+        group.interface.new_socket("Geometry", in_out='OUTPUT', socket_type='NodeSocketGeometry')
+    else:
+        group.inputs.new('NodeSocketGeometry', "Geometry")
+        group.outputs.new('NodeSocketGeometry', "Geometry")
+
+    nodes = group.nodes
+    links = group.links
+    groupInput = nodes.new( type = 'NodeGroupInput' )
+    groupOutput = nodes.new( type = 'NodeGroupOutput' )
+    objectInfo = nodes.new( type = 'GeometryNodeObjectInfo' )
+    objectInfo.inputs['Object'].default_value = sphereObj
+    instances = nodes.new( type = 'GeometryNodeInstanceOnPoints' )
+    instances.name = "PartioInstances"
+    instances.inputs['Scale'].default_value = (radius, radius, radius)
+
+    link = links.new( groupInput.outputs[0], instances.inputs['Points'] )
+    link = links.new( objectInfo.outputs['Geometry'], instances.inputs['Instance'] )
+    link = links.new( instances.outputs['Instances'], groupOutput.inputs[0] )
+    return group
+
+
+def instancingNodes(obj):
+    for modifier in obj.modifiers:
+        if modifier.type == 'NODES' and modifier.node_group is not None:
+            node = modifier.node_group.nodes.get("PartioInstances")
+            if node is not None:
+                yield modifier, node
 
 
 def getColorFields(self, context):
-    pheader = partio_pybind.readHeaders(self.file)
     enum_items = [("NONE", "None", "No Coloring", 0)]
+    if self.source == 'SHARED_MEMORY':
+        sharedFrames = partio_pybind.SharedFrameReader.open(self.shared_memory_name)
+        frame = sharedFrames.acquire() if sharedFrames is not None else None
+        if frame is not None:
+            for i in range(frame.numAttributes()):
+                attr = frame.attributeInfo(i)
+                enum_items.append((attr.name.upper(), attr.name, "", i+1))
+        return enum_items
+
+    pheader = partio_pybind.readHeaders(self.file)
     if pheader is not None:
-        for i in range(pheader.numAttributes()):
-            attr = pheader.attributeInfo(i)
-            enum_items.append((attr.name.upper(), attr.name, "", i+1))
+        with pheader:
+            for i in range(pheader.numAttributes()):
+                attr = pheader.attributeInfo(i)
+                enum_items.append((attr.name.upper(), attr.name, "", i+1))
 
     return enum_items
 
 
 def updateEnum(self, context):
-    param = [self.file, context.object]
-    PartioReader(param)(context.scene)
+    if self.source == 'SHARED_MEMORY':
+        liveUpdater.invalidate(context.object.name)
+    else:
+        param = [self.file, context.object]
+        PartioReader(param)(context.scene)
     if context is not None:
         scaling_node = context.object.active_material.node_tree.nodes.get('Math.001').inputs[1]
         scaling_node.default_value = 1. / self.max_velocity
@@ -272,12 +877,17 @@ def updateParticleRadius(self, context):
     for particle_system in cur_obj.particle_systems:
         particle_system.settings.particle_size = self.particle_radius
         particle_system.settings.display_size = 2.0 * self.particle_radius
+    for modifier, node in instancingNodes(cur_obj):
+        node.inputs['Scale'].default_value = (self.particle_radius,) * 3
 
 
 def updateDisplayMethod(self, context):
     cur_obj = context.object
     for particle_system in cur_obj.particle_systems:
         particle_system.settings.display_method = self.display_method
+    # the point cloud shows its bare vertices unless the instancing is enabled
+    for modifier, node in instancingNodes(cur_obj):
+        modifier.show_viewport = self.display_method == 'RENDER'
 
 
 class PartioReinitOperator(bpy.types.Operator):
@@ -290,19 +900,8 @@ class PartioReinitOperator(bpy.types.Operator):
         return context.active_object.partio.init
 
     def execute(self, context):
-        keep_callbacks = []
-        for callback in bpy.app.handlers.frame_change_post:
-            if not isinstance(callback, PartioReader):
-                keep_callbacks.append(callback)
-        
-        for obj in bpy.data.objects:
-            if obj.partio.init:
-                param = [obj.partio.file, obj]
-                keep_callbacks.append(PartioReader(param))
-
-        bpy.app.handlers.frame_change_post.clear()
-        for callback in keep_callbacks:
-            bpy.app.handlers.frame_change_post.append(callback)
+        dispatcher.reset()
+        registerDispatcher()
 
         return {'FINISHED'}
 
@@ -313,6 +912,16 @@ class PartioParameters(bpy.types.PropertyGroup):
     color_field: bpy.props.EnumProperty(name="Color", items=getColorFields, update=updateEnum)
     max_velocity: bpy.props.FloatProperty(name="Max Value of Color Field", default=1.)
     particle_radius: bpy.props.FloatProperty(name="Particle Radius", default=0.025, update=updateParticleRadius)
+    load_time: bpy.props.FloatProperty(name="Load Time (ms)", default=0.)
+    source: bpy.props.EnumProperty(items=[('FILE', 'Files', 'Read a partio file per frame', 0),
+                                          ('SHARED_MEMORY', 'Live', 'Frames a running simulation publishes to shared memory', 1)],
+                                   name="Source", default='FILE')
+    shared_memory_name: bpy.props.StringProperty(name="Shared Memory Name", default="partio")
+    crop_object: bpy.props.PointerProperty(name="Crop Object", type=bpy.types.Object,
+                                           description="Only load the particles of .pbk files inside the bounds of this object")
+    backend: bpy.props.EnumProperty(items=[('PARTICLES', 'Particle system', 'Particle system of an emitter cube', 0),
+                                           ('MESH', 'Point cloud', 'Mesh vertices instanced by Geometry Nodes', 1)],
+                                    name="Backend", default='PARTICLES')
     display_method: bpy.props.EnumProperty(items=[('DOT', 'Point', 'Render as point', 0),
                                                   ('RENDER', 'Object', 'Render as instanced object', 1)],
                                            name="Display Method", update=updateDisplayMethod)
@@ -336,7 +945,10 @@ class PartioPanel(bpy.types.Panel):
         obj = context.object
 
         row = layout.row()
-        row.prop(obj.partio, "file")
+        if obj.partio.source == 'SHARED_MEMORY':
+            row.prop(obj.partio, "shared_memory_name")
+        else:
+            row.prop(obj.partio, "file")
 
         row = layout.row()
         row.prop(obj.partio, "init")
@@ -353,29 +965,57 @@ class PartioPanel(bpy.types.Panel):
         row = layout.row()
         row.prop(obj.partio, "particle_radius")
 
+        row = layout.row()
+        row.prop(obj.partio, "crop_object")
+
+        row = layout.row()
+        row.enabled = False
+        row.prop(obj.partio, "backend")
+
+        row = layout.row()
+        row.enabled = False
+        row.prop(obj.partio, "source")
+
+        row = layout.row()
+        row.label(text="Last frame loaded in %.1f ms" % obj.partio.load_time)
+
+        row = layout.row()
+        row.label(text="Particle memory: %.1f MB in %d objects" %
+                  (partio_pybind.memoryUsage() / (1024. * 1024.), partio_pybind.liveObjects()))
+
+        row = layout.row()
+        row.prop(context.scene, "partio_memory_budget")
+
         row = layout.row()
         row.operator("object.reinit_partio")
 
 
 @persistent
 def loadPost(scene):
-    for obj in bpy.data.objects:
-        if obj.partio.init:
-            param = [obj.partio.file, obj]
-            bpy.app.handlers.frame_change_post.append(PartioReader(param))
+    dispatcher.reset()
+    liveUpdater.reset()
+    if any(obj.partio.init and obj.partio.source == 'FILE' for obj in bpy.data.objects):
+        registerDispatcher()
+    if any(obj.partio.init and obj.partio.source == 'SHARED_MEMORY' for obj in bpy.data.objects):
+        registerLiveUpdater()
 
 
 # Only needed if you want to add into a dynamic menu
 def menu_func_import(self, context):
     self.layout.operator(PartioImporter.bl_idname, text="Partio Import")
+    self.layout.operator(PartioLiveImporter.bl_idname, text="Partio Live Source")
 
 
 def register():
     bpy.utils.register_class(PartioImporter)
+    bpy.utils.register_class(PartioLiveImporter)
     bpy.utils.register_class(PartioParameters)
     bpy.utils.register_class(PartioPanel)
     bpy.utils.register_class(PartioReinitOperator)
     bpy.types.Object.partio = bpy.props.PointerProperty(type=PartioParameters)
+    bpy.types.Scene.partio_memory_budget = bpy.props.FloatProperty(
+        name="Memory Budget (MB)", default=0., min=0.,
+        description="Cached partio frames are released when the particle data exceeds this size, 0 means no limit")
     bpy.types.TOPBAR_MT_file_import.append(menu_func_import)
     bpy.app.handlers.load_post.append(loadPost)
     print(bpy.app.handlers.load_post)
@@ -383,11 +1023,17 @@ def register():
 
 def unregister():
     bpy.utils.unregister_class(PartioImporter)
+    bpy.utils.unregister_class(PartioLiveImporter)
     bpy.utils.unregister_class(PartioParameters)
     bpy.utils.unregister_class(PartioPanel)
     bpy.utils.unregister_class(PartioReinitOperator)
     bpy.types.TOPBAR_MT_file_import.remove(menu_func_import)
     bpy.app.handlers.load_post.remove(loadPost)
+    del bpy.types.Scene.partio_memory_budget
+    if dispatcher in bpy.app.handlers.frame_change_post:
+        bpy.app.handlers.frame_change_post.remove(dispatcher)
+    dispatcher.shutdown()
+    unregisterLiveUpdater()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,186 @@
+"""Read times of the ASCII formats (.geo, .pda) and round-trip checks of their point block parser.
+
+    python benchmarks/ascii_parse.py [number of particles] [--baseline <directory>]
+
+The point blocks are parsed in chunks of lines on separate threads when every thread gets at
+least 1 MB of text, so the default of 500000 particles (about 30 MB of text) is split into as
+many chunks as there are hardware threads. Every file is read back and compared value by value
+with the particles that were written; the values have at most 6 significant digits, which is
+what the writers print. The round trips are checked serially and split into 4 and 7 chunks,
+which PARTIO_ASCII_THREADS forces regardless of the hardware threads. A .pda file with records
+wrapped over two lines and CRLF line endings checks the fallback to the serial parse, and
+truncated files have to be rejected. The read times use the default split.
+
+--baseline points to the directory of a partio_pybind module built from an older revision,
+e.g. the one before the parser was replaced. Its read times of the same files are listed next
+to the current ones; it runs in a separate process since both modules have the same name.
+
+The partio module has to be importable (see README.md).
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+import partio_pybind
+
+
+FORMATS = ["geo", "pda", "geo.gz", "pda.gz"]
+FORCED_CHUNKS = [1, 4, 7]
+REPEAT = 3
+BYTES_PER_THREAD = 1 << 20
+
+BASELINE_READ = """
+import sys, time
+sys.path.insert(0, sys.argv[1])
+import partio_pybind
+times = []
+for i in range(int(sys.argv[3])):
+    start = time.perf_counter()
+    p = partio_pybind.read(sys.argv[2], False)
+    times.append(time.perf_counter() - start)
+print(min(times))
+"""
+
+
+def createParticles(numParticles):
+    rng = np.random.default_rng(0)
+    # at most 6 significant digits, so that the text written by the writers parses to the same floats
+    columns = [("position", partio_pybind.ParticleAttributeType.VECTOR, rng.integers(-99999, 99999, (numParticles, 3)) / 100.),
+               ("velocity", partio_pybind.ParticleAttributeType.VECTOR, rng.integers(-99999, 99999, (numParticles, 3)) * 1e-7),
+               ("density", partio_pybind.ParticleAttributeType.FLOAT, rng.integers(1, 999999, (numParticles, 1)) * 1e3),
+               ("id", partio_pybind.ParticleAttributeType.INT, rng.permutation(numParticles)[:, np.newaxis])]
+    p = partio_pybind.create()
+    attrs = [p.addAttribute(name, attrType, values.shape[1]) for name, attrType, values in columns]
+    p.addParticles(numParticles)
+    for attr, (name, attrType, values) in zip(attrs, columns):
+        np.asarray(p.data_buffer_mutable(attr))[:] = values
+    return p
+
+
+def columns(p):
+    result = {}
+    for i in range(p.numAttributes()):
+        attr = p.attributeInfo(i)
+        dtype = np.int32 if attr.type == partio_pybind.ParticleAttributeType.INT else np.float32
+        result[attr.name] = np.empty((p.numParticles(), attr.count), dtype=dtype)
+        p.data_copy(attr, result[attr.name])
+    return result
+
+
+def compare(label, expected, q):
+    actual = columns(q)
+    errors = []
+    if q.numParticles() != len(expected["position"]):
+        errors.append("%d instead of %d particles" % (q.numParticles(), len(expected["position"])))
+    else:
+        for name, values in expected.items():
+            if name not in actual:
+                errors.append("attribute %s missing" % name)
+                continue
+            mismatches = np.flatnonzero(np.any(actual[name] != values, axis=1))
+            if len(mismatches) > 0:
+                errors.append("%s differs in %d particles, first %d" % (name, len(mismatches), mismatches[0]))
+    print("%-32s %s" % (label, "ok" if not errors else "FAILED: " + ", ".join(errors)))
+    return not errors
+
+
+def writeWrappedPDA(fileName, expected):
+    # every 1000th record continues on the next line, lines end with CRLF
+    numParticles = len(expected["position"])
+    with open(fileName, "w", newline="") as f:
+        f.write("ATTRIBUTES\r\n position velocity density id\r\nTYPES\r\n V V R I\r\n")
+        f.write("NUMBER_OF_PARTICLES: %d\r\nBEGIN DATA\r\n" % numParticles)
+        for i in range(numParticles):
+            values = [repr(float(v)) for v in expected["position"][i]] + [repr(float(v)) for v in expected["velocity"][i]]
+            values += [repr(float(expected["density"][i, 0])), str(expected["id"][i, 0])]
+            separator = " \r\n  " if i % 1000 == 999 else " "
+            f.write(" ".join(values[:3]) + separator + " ".join(values[3:]) + "\r\n")
+
+
+def forcedChunks(chunks):
+    if chunks is None:
+        os.environ.pop("PARTIO_ASCII_THREADS", None)
+    else:
+        os.environ["PARTIO_ASCII_THREADS"] = str(chunks)
+
+
+def checkTruncated(label, fileName):
+    # cut off in the middle of the point block
+    truncated = fileName[:-len(".geo")] + ".truncated" + fileName[-len(".geo"):]
+    with open(fileName, "rb") as f:
+        data = f.read()
+    with open(truncated, "wb") as f:
+        f.write(data[:len(data) // 2])
+    q = partio_pybind.read(truncated, False)
+    print("%-32s %s" % (label, "ok" if q is None else "FAILED: %d particles read" % q.numParticles()))
+    return q is None
+
+
+def readTime(fileName):
+    times = []
+    for i in range(REPEAT):
+        start = time.perf_counter()
+        q = partio_pybind.read(fileName, False)
+        times.append(time.perf_counter() - start)
+        q.release()
+    return min(times)
+
+
+def baselineReadTime(baseline, fileName):
+    output = subprocess.check_output([sys.executable, "-c", BASELINE_READ, baseline, fileName, str(REPEAT)])
+    return float(output.decode().split()[-1])
+
+
+def main():
+    argv = sys.argv[1:]
+    baseline = None
+    if "--baseline" in argv:
+        index = argv.index("--baseline")
+        baseline = os.path.abspath(argv[index + 1])
+        del argv[index:index + 2]
+    numParticles = int(argv[0]) if len(argv) > 0 else 500000
+    numThreads = os.cpu_count() or 1
+
+    p = createParticles(numParticles)
+    expected = columns(p)
+    succeeded = True
+    with tempfile.TemporaryDirectory() as directory:
+        print("%d particles, %d hardware threads" % (numParticles, numThreads))
+        results = []
+        for extension in FORMATS:
+            fileName = os.path.join(directory, "particles." + extension)
+            partio_pybind.write(fileName, p, False, False)
+            results.append((extension, fileName, os.path.getsize(fileName)))
+
+        wrappedFileName = os.path.join(directory, "wrapped.pda")
+        writeWrappedPDA(wrappedFileName, expected)
+        for chunks in FORCED_CHUNKS:
+            forcedChunks(chunks)
+            suffix = ", %d chunk%s" % (chunks, "" if chunks == 1 else "s")
+            for extension, fileName, size in results:
+                with partio_pybind.read(fileName, False) as q:
+                    succeeded &= compare("round trip " + extension + suffix, expected, q)
+            with partio_pybind.read(wrappedFileName, False) as q:
+                succeeded &= compare("wrapped records pda" + suffix, expected, q)
+            for extension, fileName, size in results:
+                if not extension.endswith(".gz"):
+                    succeeded &= checkTruncated("truncated " + extension + suffix, fileName)
+        forcedChunks(None)
+
+        print("%-9s %10s %8s %12s %14s" % ("format", "size (MB)", "chunks", "read (ms)", "baseline (ms)"))
+        for extension, fileName, size in results:
+            # the text size decides the chunks, compressed files are split after decompression
+            textSize = size if not extension.endswith(".gz") else os.path.getsize(fileName[:-3])
+            chunks = max(1, min(numThreads, textSize // BYTES_PER_THREAD))
+            current = 1000. * readTime(fileName)
+            previous = "%14.1f" % (1000. * baselineReadTime(baseline, fileName)) if baseline else "%14s" % "-"
+            print("%-9s %10.2f %8d %12.1f %s" % (extension, size / 1e6, chunks, current, previous))
+    p.release()
+    if not succeeded:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
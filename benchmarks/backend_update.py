@@ -0,0 +1,61 @@
+"""Compares the per-frame update cost of the particle system and the point cloud backend.
+
+Run it headless with the Blender version the add-on is used with:
+
+    blender --background --python benchmarks/backend_update.py -- <partio file> [number of frames]
+
+The partio module has to be importable by Blender's Python (see README.md).
+"""
+import os
+import sys
+import time
+import bpy
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "addons"))
+import BlenderPartioTools
+
+
+def benchmark(filepath, backend, numFrames):
+    bpy.ops.wm.read_homefile(use_empty=True)
+    bpy.ops.importer.partio(filepath=filepath, backend=backend)
+
+    scene = bpy.context.scene
+    # the importer also creates the instanced sphere, the emitter is the object that reads the file
+    emitterObject = next(obj for obj in scene.objects if obj.partio.init and obj.partio.file == filepath)
+    firstFrame = scene.frame_current
+    frameTimes = []
+    loadTimes = []
+    for frame in range(firstFrame, firstFrame + numFrames):
+        start = time.perf_counter()
+        scene.frame_set(frame)
+        # includes the depsgraph evaluation, i.e. re-emitting the particle system
+        frameTimes.append(1000. * (time.perf_counter() - start))
+        loadTimes.append(emitterObject.partio.load_time)
+    return frameTimes, loadTimes
+
+
+def main():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    if len(argv) == 0:
+        print("usage: blender --background --python backend_update.py -- <partio file> [number of frames]")
+        return
+    filepath = os.path.abspath(argv[0])
+    numFrames = max(2, int(argv[1])) if len(argv) > 1 else 20
+
+    BlenderPartioTools.register()
+    backends = ['PARTICLES']
+    if bpy.app.version >= (3, 0, 0):
+        backends.append('MESH')
+
+    results = {backend: benchmark(filepath, backend, numFrames) for backend in backends}
+
+    print("%-10s %18s %18s" % ("backend", "frame_set (ms)", "read+upload (ms)"))
+    for backend, (frameTimes, loadTimes) in results.items():
+        # the first frame allocates the buffers, so it is not taken into account
+        print("%-10s %18.2f %18.2f" % (backend, np.median(frameTimes[1:]), np.median(loadTimes[1:])))
+    BlenderPartioTools.unregister()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Compression ratio and throughput of the shuffled column format (.psc) compared to .bgeo.gz.
+
+    python benchmarks/columnar_codec.py [number of particles]
+
+The data is a synthetic fluid: a jittered block of particles with a smooth velocity field, a
+density close to the rest density and ids, once in simulation order and once sorted along a
+Morton curve (partio_pybind.sortSpatially). The ratio is the size of the raw particle data
+divided by the file size, MB/s refer to the raw particle data.
+
+The partio module has to be importable (see README.md).
+"""
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import partio_pybind
+
+
+FORMATS = ["bgeo", "bgeo.gz", "psc"]
+REPEAT = 3
+
+
+def syntheticFluid(numParticles, spacing=0.01):
+    n = max(2, int(round(numParticles ** (1. / 3.))))
+    grid = np.stack(np.meshgrid(np.arange(n), np.arange(n), np.arange(n), indexing='ij'), axis=-1).reshape(-1, 3)
+    rng = np.random.default_rng(0)
+    position = (grid * spacing + rng.normal(scale=0.1 * spacing, size=grid.shape)).astype(np.float32)
+    velocity = np.stack([np.sin(position[:, 1] * 4.), np.cos(position[:, 0] * 4.), -position[:, 2]], axis=1).astype(np.float32)
+    density = (1000. + rng.normal(scale=5., size=len(position))).astype(np.float32)
+    # simulators reorder particles as they move, the ids stay in the original order
+    order = rng.permutation(len(position))
+
+    p = partio_pybind.create()
+    columns = [("position", partio_pybind.ParticleAttributeType.VECTOR, position[order]),
+               ("velocity", partio_pybind.ParticleAttributeType.VECTOR, velocity[order]),
+               ("density", partio_pybind.ParticleAttributeType.FLOAT, density[order, np.newaxis]),
+               ("id", partio_pybind.ParticleAttributeType.INT, np.arange(len(position))[:, np.newaxis])]
+    attrs = [p.addAttribute(name, attrType, values.shape[1]) for name, attrType, values in columns]
+    p.addParticles(len(position))
+    for attr, (name, attrType, values) in zip(attrs, columns):
+        np.asarray(p.data_buffer_mutable(attr))[:] = values
+    return p
+
+
+def rawSize(p):
+    return sum(4 * p.attributeInfo(i).count for i in range(p.numAttributes())) * p.numParticles()
+
+
+def measure(p, directory, extension):
+    fileName = os.path.join(directory, "particles." + extension)
+    writeTimes = []
+    readTimes = []
+    for i in range(REPEAT):
+        start = time.perf_counter()
+        partio_pybind.write(fileName, p, False, False)
+        writeTimes.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        q = partio_pybind.read(fileName, False)
+        readTimes.append(time.perf_counter() - start)
+        q.release()
+    return os.path.getsize(fileName), min(writeTimes), min(readTimes)
+
+
+def main():
+    numParticles = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    original = syntheticFluid(numParticles)
+    morton = partio_pybind.sortSpatially(original)
+    raw = rawSize(original)
+    print("%d particles, %.1f MB of particle data, %d hardware threads" % (original.numParticles(), raw / 1e6, os.cpu_count() or 1))
+    print("%-9s %-10s %12s %8s %14s %14s" % ("format", "order", "size (MB)", "ratio", "write (MB/s)", "read (MB/s)"))
+    with tempfile.TemporaryDirectory() as directory:
+        for order, p in (("simulation", original), ("morton", morton)):
+            for extension in FORMATS:
+                size, writeTime, readTime = measure(p, directory, extension)
+                print("%-9s %-10s %12.2f %8.2f %14.0f %14.0f" % (extension, order, size / 1e6, raw / size,
+                                                                 raw / writeTime / 1e6, raw / readTime / 1e6))
+    morton.release()
+    original.release()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""Connected components of particles on the uniform grid compared to a kd-tree neighbor search.
+
+    python benchmarks/connected_components.py [number of particles] [radius]
+
+Two particles are connected if they are at most radius apart. partio_pybind.computeConnectedComponents
+is timed on one thread and, if there are more, on all hardware threads. The kd-tree approach is what the partio API
+offered before: sort() builds the kd-tree, findPoints() returns the candidates in the box around
+every particle and the pairs within the radius are joined in a union-find. The loop over the
+particles runs in Python, like it does in scripts that use the kd-tree. Both have to number the
+clusters identically.
+
+First, the grid is checked against a brute-force test of all pairs on small sets, including
+particles exactly radius apart, duplicates, negative coordinates and coordinates far from the
+origin. The script exits with an error if a check fails.
+
+The partio module has to be importable (see README.md).
+"""
+import os
+import sys
+import time
+import numpy as np
+import partio_pybind
+
+
+def createParticles(position):
+    p = partio_pybind.create()
+    posAttr = p.addAttribute("position", partio_pybind.ParticleAttributeType.VECTOR, 3)
+    p.addParticles(len(position))
+    np.asarray(p.data_buffer_mutable(posAttr))[:] = position
+    return p
+
+
+def droplets(numParticles, radius, rng):
+    # clumps of particles like a splash, with isolated particles between them
+    centers = rng.random((max(1, numParticles // 200), 3), dtype=np.float32)
+    clumped = centers[rng.integers(0, len(centers), numParticles * 3 // 4)]
+    clumped += rng.normal(scale=2. * radius, size=clumped.shape).astype(np.float32)
+    scattered = rng.random((numParticles - len(clumped), 3), dtype=np.float32)
+    return np.concatenate([clumped, scattered])
+
+
+def labelsInOrder(parents):
+    # cluster ids in order of the first particle, like computeConnectedComponents numbers them
+    roots = np.array([find(parents, i) for i in range(len(parents))])
+    _, first, inverse = np.unique(roots, return_index=True, return_inverse=True)
+    return np.argsort(np.argsort(first))[inverse]
+
+
+def find(parents, i):
+    while parents[i] != i:
+        parents[i] = parents[parents[i]]
+        i = parents[i]
+    return i
+
+
+def unite(parents, a, b):
+    a = find(parents, a)
+    b = find(parents, b)
+    if a != b:
+        parents[max(a, b)] = min(a, b)
+
+
+def bruteForce(position, radius):
+    parents = list(range(len(position)))
+    radiusSquared = np.float32(radius) * np.float32(radius)
+    for i in range(len(position)):
+        # the same float32 arithmetic as the grid, so pairs exactly radius apart agree
+        offset = position[i + 1:] - position[i]
+        distanceSquared = offset[:, 0] * offset[:, 0] + offset[:, 1] * offset[:, 1] + offset[:, 2] * offset[:, 2]
+        for j in np.flatnonzero(distanceSquared <= radiusSquared):
+            unite(parents, i, i + 1 + j)
+    return labelsInOrder(parents)
+
+
+def kdTree(p, position, radius):
+    p.sort()
+    parents = list(range(len(position)))
+    radiusSquared = np.float32(radius) * np.float32(radius)
+    for i in range(len(position)):
+        candidates = p.findPoints(position[i] - radius, position[i] + radius)
+        candidates = candidates[candidates > i]
+        offset = position[candidates] - position[i]
+        distanceSquared = np.einsum('ij,ij->i', offset, offset)
+        for j in candidates[distanceSquared <= radiusSquared]:
+            unite(parents, i, j)
+    return labelsInOrder(parents)
+
+
+def check(label, position, radius):
+    with createParticles(position) as p:
+        expected = bruteForce(position, radius)
+        results = [partio_pybind.computeConnectedComponents(p, radius, numThreads) for numThreads in (1, 3)]
+    ok = all(np.array_equal(result, expected) for result in results)
+    print("%-40s %s" % (label, "ok" if ok else "FAILED"))
+    return ok
+
+
+def checks(rng):
+    radius = 0.05
+    succeeded = check("random", rng.random((2000, 3), dtype=np.float32), radius)
+    succeeded &= check("droplets", droplets(2000, 0.01, rng), 0.01)
+    # chains along the axes with a spacing of exactly the radius, and a gap slightly larger
+    steps = np.arange(20, dtype=np.float32)[:, np.newaxis]
+    chain = np.concatenate([steps * np.float32(0.25) * axis for axis in np.eye(3, dtype=np.float32)] +
+                           [steps * np.float32(0.2500001) * [1, 0, 0] + [0, 10, 0]]).astype(np.float32)
+    succeeded &= check("spacing exactly radius", chain, 0.25)
+    duplicates = np.repeat(rng.random((200, 3), dtype=np.float32), 3, axis=0)
+    succeeded &= check("duplicates", duplicates, 1e-4)
+    succeeded &= check("negative coordinates", rng.random((2000, 3), dtype=np.float32) - 0.5, radius)
+    succeeded &= check("far from the origin", 1e4 + 100. * rng.random((2000, 3), dtype=np.float32), 3.)
+    return succeeded
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, 1000. * (time.perf_counter() - start)
+
+
+def main():
+    numParticles = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    radius = float(sys.argv[2]) if len(sys.argv) > 2 else 0.005
+    rng = np.random.default_rng(0)
+    succeeded = checks(rng)
+
+    position = droplets(numParticles, radius, rng)
+    numThreads = os.cpu_count() or 1
+    with createParticles(position) as p:
+        print("%d particles, radius %g, %d hardware thread%s" % (numParticles, radius, numThreads, "" if numThreads == 1 else "s"))
+        grid, gridTime = timed(partio_pybind.computeConnectedComponents, p, radius, 1)
+        # on a single hardware thread the parallel run is the same as the serial one
+        parallelTime = timed(partio_pybind.computeConnectedComponents, p, radius, 0)[1] if numThreads > 1 else None
+        tree, treeTime = timed(kdTree, p, position, radius)
+        _, sortTime = timed(p.sort)
+    print("%-40s %d clusters" % ("grid and kd-tree agree" if np.array_equal(grid, tree) else "grid and kd-tree DIFFER",
+                                 grid.max() + 1))
+    succeeded &= np.array_equal(grid, tree)
+    print("%-40s %10s" % ("method", "time (ms)"))
+    print("%-40s %10.1f" % ("grid, 1 thread", gridTime))
+    if parallelTime is not None:
+        print("%-40s %10.1f" % ("grid, %d threads" % numThreads, parallelTime))
+    print("%-40s %10.1f" % ("kd-tree sort", sortTime))
+    print("%-40s %10.1f" % ("kd-tree sort + findPoints per particle", treeTime))
+    if not succeeded:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Compares the particle memory layouts on the path of a frame update: read, transform, foreach_set.
+
+    python benchmarks/memory_layout.py [partio file] [number of particles]
+    blender --background --python benchmarks/memory_layout.py -- [partio file] [number of particles]
+
+Without a file, a .bgeo file with random positions, velocities and ids is written first. For every
+layout (partio_pybind.ParticleLayout) the file is read, the positions are transformed by a
+rotation like the add-on does and handed to foreach_set. The positions are taken once with
+data_copy and once through the buffer of data_buffer, which depends on how the layout stores
+the attribute. In Blender foreach_set fills the vertices of a mesh, otherwise the values are
+copied into a flat float32 array of the same size instead.
+
+The partio module has to be importable (see README.md).
+"""
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import partio_pybind
+
+try:
+    import bpy
+except ImportError:
+    bpy = None
+
+
+LAYOUTS = [partio_pybind.ParticleLayout.SIMPLE, partio_pybind.ParticleLayout.INTERLEAVE, partio_pybind.ParticleLayout.ALIGNED]
+REPEAT = 5
+
+
+def writeParticles(fileName, numParticles):
+    rng = np.random.default_rng(0)
+    p = partio_pybind.create()
+    posAttr = p.addAttribute("position", partio_pybind.ParticleAttributeType.VECTOR, 3)
+    velAttr = p.addAttribute("velocity", partio_pybind.ParticleAttributeType.VECTOR, 3)
+    idAttr = p.addAttribute("id", partio_pybind.ParticleAttributeType.INT, 1)
+    p.addParticles(numParticles)
+    np.asarray(p.data_buffer_mutable(posAttr))[:] = rng.random((numParticles, 3), dtype=np.float32)
+    np.asarray(p.data_buffer_mutable(velAttr))[:] = rng.standard_normal((numParticles, 3), dtype=np.float32)
+    np.asarray(p.data_buffer_mutable(idAttr))[:, 0] = np.arange(numParticles)
+    partio_pybind.write(fileName, p, False, False)
+    p.release()
+
+
+class Target:
+    """Receives the transformed positions, the vertices of a mesh in Blender"""
+
+    def __init__(self, numParticles):
+        if bpy is not None:
+            self.mesh = bpy.data.meshes.new("memory_layout")
+            self.mesh.vertices.add(numParticles)
+        else:
+            self.values = np.empty(3 * numParticles, dtype=np.float32)
+
+    def foreach_set(self, location):
+        if bpy is not None:
+            self.mesh.vertices.foreach_set("co", location.ravel())
+        else:
+            self.values[:] = location.ravel()
+
+    def remove(self):
+        if bpy is not None:
+            bpy.data.meshes.remove(self.mesh)
+
+
+def measure(fileName, layout, zeroCopy, rotation, target):
+    readTimes = []
+    transformTimes = []
+    setTimes = []
+    for i in range(REPEAT):
+        start = time.perf_counter()
+        p = partio_pybind.read(fileName, False, layout)
+        posAttr = p.attributeInfo("position")
+        n = p.numParticles()
+        read = time.perf_counter()
+        if zeroCopy:
+            pos = np.asarray(p.data_buffer(posAttr))
+        else:
+            pos = p.data_copy(posAttr, np.empty((n, 3), dtype=np.float32))
+        location = np.matmul(pos, rotation)
+        transformed = time.perf_counter()
+        target.foreach_set(location)
+        end = time.perf_counter()
+        p.release()
+        readTimes.append(1000. * (read - start))
+        transformTimes.append(1000. * (transformed - read))
+        setTimes.append(1000. * (end - transformed))
+    return min(readTimes), min(transformTimes), min(setTimes)
+
+
+def main():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else sys.argv[1:]
+    fileName = argv[0] if len(argv) > 0 else None
+    numParticles = int(argv[1]) if len(argv) > 1 else 2000000
+
+    with tempfile.TemporaryDirectory() as directory:
+        if fileName is None:
+            fileName = os.path.join(directory, "particles.bgeo")
+            writeParticles(fileName, numParticles)
+        with partio_pybind.read(fileName, False) as p:
+            numParticles = p.numParticles()
+        angle = np.radians(30.)
+        rotation = np.array([[np.cos(angle), -np.sin(angle), 0.], [np.sin(angle), np.cos(angle), 0.], [0., 0., 1.]], dtype=np.float32)
+        target = Target(numParticles)
+
+        print("%d particles, foreach_set %s" % (numParticles, "into mesh vertices" if bpy is not None else "stand-in (no Blender)"))
+        print("%-11s %-12s %10s %15s %17s %11s" % ("layout", "positions", "read (ms)", "transform (ms)", "foreach_set (ms)", "total (ms)"))
+        for layout in LAYOUTS:
+            for zeroCopy in (False, True):
+                readTime, transformTime, setTime = measure(fileName, layout, zeroCopy, rotation, target)
+                print("%-11s %-12s %10.1f %15.1f %17.1f %11.1f" % (layout.name, "data_buffer" if zeroCopy else "data_copy",
+                                                                readTime, transformTime, setTime, readTime + transformTime + setTime))
+        target.remove()
+
+
+if __name__ == "__main__":
+    main()
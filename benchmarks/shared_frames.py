@@ -0,0 +1,141 @@
+"""Throughput and latency of live frames in shared memory compared to writing and reading files.
+
+A stand-in producer, i.e. a simulation that publishes its particles, runs in a separate process:
+
+    python benchmarks/shared_frames.py produce <name> [number of particles] [number of frames] [frames per second]
+
+The add-on shows it with File > Import > Partio Live Source and the same name. Without
+arguments the benchmark starts the producer itself and consumes its frames:
+
+    python benchmarks/shared_frames.py [number of particles] [number of frames]
+
+The partio module has to be importable (see README.md).
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+import partio_pybind
+
+
+def createParticles(numParticles):
+    p = partio_pybind.create()
+    posAttr = p.addAttribute("position", partio_pybind.ParticleAttributeType.VECTOR, 3)
+    velAttr = p.addAttribute("velocity", partio_pybind.ParticleAttributeType.VECTOR, 3)
+    idAttr = p.addAttribute("id", partio_pybind.ParticleAttributeType.INT, 1)
+    p.addParticles(numParticles)
+    position = np.asarray(p.data_buffer_mutable(posAttr))
+    velocity = np.asarray(p.data_buffer_mutable(velAttr))
+    np.asarray(p.data_buffer_mutable(idAttr))[:, 0] = np.arange(numParticles)
+    rng = np.random.default_rng(0)
+    position[:] = rng.random((numParticles, 3), dtype=np.float32)
+    velocity[:] = rng.standard_normal((numParticles, 3), dtype=np.float32)
+    return p, position, velocity
+
+
+def slotBytes(numParticles):
+    # position, velocity and id plus the alignment of each column
+    return numParticles * 7 * 4 + 3 * 64
+
+
+def produce(name, numParticles, numFrames, fps):
+    p, position, velocity = createParticles(numParticles)
+    writer = partio_pybind.SharedFrameWriter(name, 3, slotBytes(numParticles))
+    dt = 1. / fps if fps > 0 else 0.
+    start = time.perf_counter()
+    for frame in range(numFrames):
+        position += 0.01 * velocity
+        writer.publish(p, frame)
+        if dt > 0:
+            time.sleep(max(0., start + (frame + 1) * dt - time.perf_counter()))
+    elapsed = time.perf_counter() - start
+    print("published %d frames in %.2f s" % (writer.published(), elapsed))
+    # give the consumer time to read the last frame before the shared memory is removed
+    time.sleep(0.5)
+    del writer
+    p.release()
+
+
+def consume(name, numParticles, numFrames):
+    producer = subprocess.Popen([sys.executable, os.path.abspath(__file__), "produce", name,
+                                 str(numParticles), str(numFrames), "0"])
+    reader = None
+    while reader is None:
+        reader = partio_pybind.SharedFrameReader.open(name)
+        if producer.poll() is not None:
+            raise RuntimeError("the producer exited before publishing")
+
+    location = np.empty((numParticles, 3), dtype=np.float32)
+    rotation = np.eye(3, dtype=np.float32)
+    latencies = []
+    lastCounter = 0
+    overwritten = 0
+    start = None
+    while not reader.closed():
+        frame = reader.acquire()
+        if frame is None or frame.counter == lastCounter:
+            continue
+        if start is None:
+            start = time.perf_counter()
+            firstCounter = frame.counter
+        # what the add-on does with a frame: map it and transform it into the Blender buffer
+        np.matmul(frame.array(frame.attributeInfo("position")), rotation, out=location)
+        if not frame.valid():
+            overwritten += 1
+        latencies.append(1000. * (time.time() - frame.time))
+        lastCounter = frame.counter
+        end = time.perf_counter()
+    elapsed = end - start
+    producer.wait()
+
+    consumed = len(latencies)
+    frameBytes = numParticles * 7 * 4
+    print("shared memory: %d of %d frames consumed, %.0f frames/s, %.0f MB/s" %
+          (consumed, lastCounter - firstCounter + 1, consumed / elapsed, consumed * frameBytes / elapsed / 1e6))
+    print("shared memory latency: median %.3f ms, 95%% %.3f ms, %d frames overwritten while read" %
+          (np.median(latencies), np.percentile(latencies, 95), overwritten))
+
+
+def files(numParticles, numFrames):
+    # the current workflow: the simulation writes a file per frame that Blender reads back
+    p, position, velocity = createParticles(numParticles)
+    buffer = np.empty((numParticles, 3), dtype=np.float32)
+    latencies = []
+    with tempfile.TemporaryDirectory() as directory:
+        fileName = os.path.join(directory, "frame.bgeo")
+        for frame in range(numFrames):
+            position += 0.01 * velocity
+            start = time.perf_counter()
+            partio_pybind.write(fileName, p, False, False)
+            with partio_pybind.read(fileName, False) as q:
+                q.data_copy(q.attributeInfo("position"), buffer)
+            latencies.append(1000. * (time.perf_counter() - start))
+    p.release()
+    print("bgeo files: %.0f frames/s, %.0f MB/s" %
+          (1000. / np.mean(latencies), numParticles * 7 * 4 / np.mean(latencies) / 1e3))
+    print("bgeo files latency: median %.3f ms, 95%% %.3f ms" % (np.median(latencies), np.percentile(latencies, 95)))
+
+
+def main():
+    argv = sys.argv[1:]
+    if len(argv) > 0 and argv[0] == "produce":
+        if len(argv) < 2:
+            print("usage: shared_frames.py produce <name> [number of particles] [number of frames] [frames per second]")
+            return
+        numParticles = int(argv[2]) if len(argv) > 2 else 100000
+        numFrames = int(argv[3]) if len(argv) > 3 else 1000
+        fps = float(argv[4]) if len(argv) > 4 else 30.
+        produce(argv[1], numParticles, numFrames, fps)
+        return
+
+    numParticles = int(argv[0]) if len(argv) > 0 else 100000
+    numFrames = int(argv[1]) if len(argv) > 1 else 200
+    print("%d particles, %d frames" % (numParticles, numFrames))
+    consume("partio_benchmark_%d" % os.getpid(), numParticles, numFrames)
+    files(numParticles, numFrames)
+
+
+if __name__ == "__main__":
+    main()
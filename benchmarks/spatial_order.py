@@ -0,0 +1,90 @@
+"""Compares files written in the original particle order with files written in Morton order.
+
+    python benchmarks/spatial_order.py [partio file]
+
+Without a file a synthetic fluid block in shuffled order is used. For every format the file
+size, the write time, the read time and the time of a neighborhood query on the particles
+read back (computeConnectedComponents, which depends on memory locality) are reported.
+
+The partio module has to be importable (see README.md).
+"""
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import partio_pybind
+
+
+# not .pbk, its writer groups the particles into spatial bricks in either order
+FORMATS = ["bgeo", "bgeo.gz"]
+REPEAT = 3
+
+
+def syntheticFluid(numParticles=500000, spacing=0.01):
+    # a block of fluid with a smooth velocity field, in random order like after the particles mixed,
+    # the ids are in file order as simulators write them
+    n = int(round(numParticles ** (1. / 3.)))
+    grid = np.stack(np.meshgrid(np.arange(n), np.arange(n), np.arange(n), indexing='ij'), axis=-1).reshape(-1, 3)
+    rng = np.random.default_rng(0)
+    position = (grid * spacing + rng.normal(scale=0.1 * spacing, size=grid.shape)).astype(np.float32)
+    velocity = np.stack([np.sin(position[:, 1] * 4.), np.cos(position[:, 0] * 4.), -position[:, 2]], axis=1).astype(np.float32)
+    order = rng.permutation(len(position))
+
+    p = partio_pybind.create()
+    posAttr = p.addAttribute("position", partio_pybind.ParticleAttributeType.VECTOR, 3)
+    velAttr = p.addAttribute("velocity", partio_pybind.ParticleAttributeType.VECTOR, 3)
+    idAttr = p.addAttribute("id", partio_pybind.ParticleAttributeType.INT, 1)
+    p.addParticles(len(position))
+    np.asarray(p.data_buffer_mutable(posAttr))[:] = position[order]
+    np.asarray(p.data_buffer_mutable(velAttr))[:] = velocity[order]
+    np.asarray(p.data_buffer_mutable(idAttr))[:, 0] = np.arange(len(position))
+    return p, 2. * spacing
+
+
+def timed(function, *args):
+    times = []
+    for i in range(REPEAT):
+        start = time.perf_counter()
+        result = function(*args)
+        times.append(1000. * (time.perf_counter() - start))
+        if i + 1 < REPEAT and hasattr(result, "release"):
+            result.release()
+    return result, min(times)
+
+
+def measure(p, directory, extension, spatial, radius):
+    fileName = os.path.join(directory, "particles." + extension)
+    if spatial:
+        _, writeTime = timed(partio_pybind.writeSpatiallySorted, fileName, p, False, "id", False)
+    else:
+        _, writeTime = timed(partio_pybind.write, fileName, p, False, False)
+    q, readTime = timed(partio_pybind.read, fileName, False)
+    _, queryTime = timed(partio_pybind.computeConnectedComponents, q, radius, 1)
+    q.release()
+    return os.path.getsize(fileName), writeTime, readTime, queryTime
+
+
+def main():
+    if len(sys.argv) > 1:
+        p = partio_pybind.read(sys.argv[1])
+        position = np.empty((p.numParticles(), 3), dtype=np.float32)
+        p.data_copy(p.attributeInfo("position"), position)
+        extent = position.max(axis=0) - position.min(axis=0)
+        # about 8 particles per query cell
+        radius = float(np.cbrt(np.prod(np.maximum(extent, 1e-6)) * 8. / max(1, p.numParticles())))
+    else:
+        p, radius = syntheticFluid()
+    print("%d particles, neighborhood radius %g" % (p.numParticles(), radius))
+    print("%-9s %-8s %12s %12s %12s %12s" % ("format", "order", "size (MB)", "write (ms)", "read (ms)", "query (ms)"))
+    with tempfile.TemporaryDirectory() as directory:
+        for extension in FORMATS:
+            for spatial in (False, True):
+                size, writeTime, readTime, queryTime = measure(p, directory, extension, spatial, radius)
+                print("%-9s %-8s %12.2f %12.1f %12.1f %12.1f" % (extension, "morton" if spatial else "original",
+                                                                 size / 1e6, writeTime, readTime, queryTime))
+    p.release()
+
+
+if __name__ == "__main__":
+    main()
@@ -54,6 +54,14 @@ namespace Partio{
 //! Opaque random access method to a single particle. No number is implied or guaranteed.
 typedef uint64_t ParticleIndex;
 
+//! Memory layout of the particle data of a particle set
+enum ParticleLayout
+{
+    LAYOUT_SIMPLE=0,    //!< One array per attribute, see create()
+    LAYOUT_INTERLEAVE,  //!< All attributes of a particle stored next to each other, see createInterleave()
+    LAYOUT_ALIGNED      //!< One contiguous, 64 byte aligned array per attribute, see createAligned()
+};
+
 class ParticlesData;
 class ParticlesDataMutable;
 // Particle Collection Interface
@@ -280,6 +288,12 @@ ParticlesDataMutable* create();
 
 ParticlesDataMutable* createInterleave();
 
+//! Like create() but every attribute array starts on a 64 byte boundary
+ParticlesDataMutable* createAligned();
+
+//! Provides an empty particle instance with the given memory layout, freed with p->release()
+ParticlesDataMutable* create(const ParticleLayout layout);
+
 //! Clone a ParticlesData instance into a new ParticlesDataMutable instance.
 //! This does *not* copy data, it only copies the attribute schema.
 ParticlesDataMutable* cloneSchema(const ParticlesData&);
@@ -293,6 +307,10 @@ ParticlesDataMutable* clone(const ParticlesData&, bool particles=true);
 //! freed with p->release()
 ParticlesDataMutable* read(const char* filename,const bool verbose=true,std::ostream& errorStream=std::cerr);
 
+//! Provides read/write access to a particle set stored in a file, using the
+//! given memory layout for the particle data. freed with p->release()
+ParticlesDataMutable* read(const char* filename,const ParticleLayout layout,const bool verbose=true,std::ostream& errorStream=std::cerr);
+
 //! Provides read access to a particle headers (number of particles
 //! and attribute information, much cheapeer
 ParticlesInfo* readHeaders(const char* filename,const bool verbose=true,std::ostream& errorStream=std::cerr);
@@ -301,6 +319,23 @@ ParticlesInfo* readHeaders(const char* filename,const bool verbose=true,std::ost
 //! if filename ends with .gz or forceCompressed is true, the file is compressed.
 void write(const char* filename,const ParticlesData&,const bool forceCompressed=false,bool verbose=true,std::ostream& errorStream=std::cerr);
 
+//! Reads the particles of a bricked .pbk file that lie inside the given bounding box.
+//! Only the bricks whose bounds overlap the box are decompressed. freed with p->release()
+ParticlesDataMutable* readBricked(const char* filename,const float bboxMin[3],const float bboxMax[3],const ParticleLayout layout=LAYOUT_SIMPLE,const bool verbose=true,std::ostream& errorStream=std::cerr);
+
+//! Writes a particle set to a bricked .pbk file. The particles are sorted into the cells
+//! of a uniform grid with about particlesPerBrick particles per cell, every non-empty cell
+//! is compressed as a brick and the brick bounds are stored in the header.
+//! write() uses 16384 particles per brick for .pbk files.
+bool writeBricked(const char* filename,const ParticlesData& particles,const int particlesPerBrick=16384,const bool verbose=true,std::ostream& errorStream=std::cerr);
+
+//! Writes a particle set like write() with the particles reordered along a Morton (Z-order)
+//! curve through their positions, see sortSpatially(). Neighboring particles end up next to
+//! each other in the file, which compresses better and gives readers a cache friendly order.
+//! Returns false if there is no position attribute, no writer for the extension or the
+//! writer fails.
+bool writeSpatiallySorted(const char* filename,const ParticlesData& particles,const bool forceCompressed=false,const std::string& identifier="id",const bool verbose=true,std::ostream& errorStream=std::cerr);
+
 //! Cached (only one copy) read only way to read a particle file
 /*!
   Loads a file read-only if not already in memory, otherwise returns
@@ -330,8 +365,36 @@ void endCachedAccess(ParticlesData* particles);
 //! Prints a subset of particle data in a textual form
 void print(const ParticlesData* particles);
 
+//! Returns the number of bytes of particle data, fixed attribute data and indexed strings
+//! held by a particle set. Objects from readHeaders() hold no data.
+size_t memoryUsage(const ParticlesInfo& particles);
+
 ParticlesDataMutable* computeClustering(ParticlesDataMutable* particles, const int numNeighbors,const double radiusSearch,const double radiusInside,const int connections,const double density);
 
+//! Groups particles into connected components, two particles are connected if their
+//! positions are at most radius apart. Writes a cluster index in [0,numClusters) per
+//! particle to clusterIds, which must hold numParticles() values, and returns numClusters
+//! or -1 if there is no position attribute. A radius <= 0 puts every particle in its own
+//! cluster. Uses a uniform grid and union-find and runs on numThreads threads, 0 means
+//! one per hardware thread.
+int computeConnectedComponents(const ParticlesData& particles,const float radius,int* clusterIds,int numThreads=0);
+
+//! Writes the positions of the particles of frame0 at the fraction t in [0,1] of the way to
+//! frame1 to positions, which must hold 3*frame0.numParticles() floats. Particles are matched
+//! by the INT attribute identifier, or by index if neither frame has it and the particle count
+//! did not change, and their positions are interpolated linearly. Particles that are missing
+//! in frame1, or all particles if frame1 is null, are extrapolated over t*dt with their
+//! "velocity" attribute if there is one. Returns false if there is no position attribute.
+bool interpolatePositions(const ParticlesData& frame0,const ParticlesData* frame1,const float t,const float dt,float* positions,const std::string& identifier="id");
+
+//! Returns a copy of the particle set with the particles ordered along a Morton (Z-order)
+//! curve through their positions, quantized to 21 bits per axis of the bounding box. The
+//! INT attribute identifier is added with the original index of every particle if the set
+//! does not have it, so sorting by it restores the original order. Runs on numThreads
+//! threads, 0 means one per hardware thread. Returns null if there is no position attribute,
+//! freed with p->release()
+ParticlesDataMutable* sortSpatially(const ParticlesData& particles,const std::string& identifier="id",int numThreads=0);
+
 //! Merges one particle set into another
 /*!
   Given a ParticleSetMutable, merges it with a second ParticleSet,
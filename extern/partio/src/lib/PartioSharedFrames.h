@@ -0,0 +1,144 @@
+/*
+PARTIO SOFTWARE
+Copyright 2010 Disney Enterprises, Inc. All rights reserved
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are
+met:
+
+* Redistributions of source code must retain the above copyright
+notice, this list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright
+notice, this list of conditions and the following disclaimer in
+the documentation and/or other materials provided with the
+distribution.
+
+* The names "Disney", "Walt Disney Pictures", "Walt Disney Animation
+Studios" or the names of its contributors may NOT be used to
+endorse or promote products derived from this software without
+specific prior written permission from Walt Disney Pictures.
+
+Disclaimer: THIS SOFTWARE IS PROVIDED BY WALT DISNEY PICTURES AND
+CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING,
+BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY, FITNESS
+FOR A PARTICULAR PURPOSE, NONINFRINGEMENT AND TITLE ARE DISCLAIMED.
+IN NO EVENT SHALL WALT DISNEY PICTURES, THE COPYRIGHT HOLDER OR
+CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND BASED ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGES.
+*/
+
+#ifndef _PartioSharedFrames_h_
+#define _PartioSharedFrames_h_
+
+#include <cstddef>
+#include <iostream>
+#include <string>
+#include <vector>
+#include <stdint.h>
+#include "PartioAttribute.h"
+
+namespace Partio{
+
+class ParticlesData;
+struct SharedFramesSegment;
+
+//! Per-particle attribute of a frame in shared memory, the values of all particles are
+//! stored contiguously, i.e. data holds numParticles*count values of the attribute type
+struct SharedAttribute
+{
+    std::string name;
+    ParticleAttributeType type;
+    int count;
+    const void* data;
+};
+
+//! Frame that a SharedFrameReader found in shared memory
+struct SharedFrame
+{
+    //! Publication number of the frame, increases by one for every published frame
+    uint64_t counter;
+    //! Frame number given by the producer
+    int frame;
+    //! Seconds since the epoch at which the frame was published
+    double time;
+    int numParticles;
+    std::vector<SharedAttribute> attributes;
+
+    //! Slot and sequence number the frame was read from, used by SharedFrameReader::valid
+    int slot;
+    uint64_t sequence;
+};
+
+//#####################################################################
+// Class SharedFrameWriter
+//#####################################################################
+//! Producer side of a ring buffer of particle frames in named shared memory.
+/*!
+  A simulator publishes frames that other processes read without going
+  through files. The ring holds numSlots frames, publishing overwrites
+  the oldest one. Per-particle attributes are transported, indexed
+  string attributes and fixed attributes are skipped. The segment is
+  removed when the writer is destroyed.
+*/
+class SharedFrameWriter
+{
+    SharedFramesSegment* segment;
+    std::ostream* errorStream;
+
+    SharedFrameWriter(SharedFramesSegment* segment,std::ostream* errorStream);
+public:
+    ~SharedFrameWriter();
+
+    //! Creates the shared memory segment name with numSlots slots, each holding at most
+    //! slotBytes bytes of particle data, and replaces an existing segment of that name.
+    //! Returns 0 on failure.
+    static SharedFrameWriter* create(const char* name,const int numSlots,const size_t slotBytes,std::ostream* errorStream=&std::cerr);
+
+    //! Copies the per-particle attributes of a frame into the next slot, returns false if
+    //! they do not fit into a slot
+    bool publish(const ParticlesData& particles,const int frame);
+
+    //! Number of frames published so far
+    uint64_t published() const;
+//#####################################################################
+};
+
+//#####################################################################
+// Class SharedFrameReader
+//#####################################################################
+//! Consumer side of a ring buffer written by SharedFrameWriter.
+/*!
+  acquire() gives direct pointers into shared memory, nothing is copied.
+  A frame remains readable until the writer wraps around the ring and
+  reuses its slot, valid() tells whether that happened in the meantime.
+*/
+class SharedFrameReader
+{
+    SharedFramesSegment* segment;
+
+    SharedFrameReader(SharedFramesSegment* segment);
+public:
+    ~SharedFrameReader();
+
+    //! Maps the shared memory segment name, returns 0 if there is no such segment
+    static SharedFrameReader* open(const char* name,std::ostream* errorStream=0);
+
+    //! Fills frame with the newest completely published frame, false if there is none
+    bool acquire(SharedFrame& frame) const;
+
+    //! Whether the slot of frame was not overwritten since it was acquired
+    bool valid(const SharedFrame& frame) const;
+
+    //! Whether the writer of the segment was destroyed, a new writer creates a new segment
+    bool closed() const;
+//#####################################################################
+};
+
+}
+#endif
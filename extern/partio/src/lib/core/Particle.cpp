@@ -39,6 +39,7 @@ OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGES.
 #include <PartioVec3.h>
 #include "ParticleSimple.h"
 #include "ParticleSimpleInterleave.h"
+#include "ParticleHeaders.h"
 #include <iostream>
 #include <string>
 #include <cstring>
@@ -46,6 +47,11 @@ OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGES.
 #include <vector>
 #include <unordered_map>
 #include <memory>
+#include <algorithm>
+#include <atomic>
+#include <cmath>
+#include <thread>
+#include <limits>
 
 namespace Partio{
 
@@ -74,6 +80,22 @@ createInterleave()
     return new ParticlesSimpleInterleave;
 }
 
+ParticlesDataMutable*
+createAligned()
+{
+    return new ParticlesSimple(64);
+}
+
+ParticlesDataMutable*
+create(const ParticleLayout layout)
+{
+    switch(layout){
+        case LAYOUT_INTERLEAVE: return createInterleave();
+        case LAYOUT_ALIGNED: return createAligned();
+        default: return create();
+    }
+}
+
 
 ParticlesDataMutable*
 cloneSchema(const ParticlesData& other)
@@ -230,6 +252,36 @@ print(const ParticlesData* particles)
     }
 }
 
+size_t
+memoryUsage(const ParticlesInfo& particles)
+{
+    // headers only describe the attributes, they hold no data
+    if (dynamic_cast<const ParticleHeaders*>(&particles)) return 0;
+    const ParticlesData* data = dynamic_cast<const ParticlesData*>(&particles);
+    if (!data) return 0;
+
+    size_t bytes = 0;
+    for (int i=0; i<data->numAttributes(); i++) {
+        ParticleAttribute attr;
+        data->attributeInfo(i, attr);
+        bytes += size_t(data->numParticles()) * TypeSize(attr.type) * attr.count;
+        if (attr.type == INDEXEDSTR) {
+            const std::vector<std::string>& strs = data->indexedStrs(attr);
+            for (size_t k=0; k<strs.size(); k++) bytes += strs[k].size();
+        }
+    }
+    for (int i=0; i<data->numFixedAttributes(); i++) {
+        FixedAttribute attr;
+        data->fixedAttributeInfo(i, attr);
+        bytes += size_t(TypeSize(attr.type)) * attr.count;
+        if (attr.type == INDEXEDSTR) {
+            const std::vector<std::string>& strs = data->fixedIndexedStrs(attr);
+            for (size_t k=0; k<strs.size(); k++) bytes += strs[k].size();
+        }
+    }
+    return bytes;
+}
+
 double hash(int n, double* args)
 {
     // combine args into a single seed
@@ -430,6 +482,373 @@ computeClustering(ParticlesDataMutable* particles, const int numNeighbors,const
     return cluster;;
 }
 
+namespace {
+
+//! Concurrent union-find, roots are always linked to the smaller index
+struct ConcurrentDisjointSets
+{
+    std::vector<std::atomic<int> > parent;
+
+    ConcurrentDisjointSets(const int count)
+        :parent(count)
+    {
+        for (int i=0; i<count; i++) parent[i].store(i, std::memory_order_relaxed);
+    }
+
+    int find(int i)
+    {
+        while (true) {
+            int p = parent[i].load();
+            if (p == i) return i;
+            int grandParent = parent[p].load();
+            // path halving, losing the race only costs a shortcut
+            if (p != grandParent) parent[i].compare_exchange_weak(p, grandParent);
+            i = grandParent;
+        }
+    }
+
+    void unite(int a, int b)
+    {
+        while (true) {
+            a = find(a);
+            b = find(b);
+            if (a == b) return;
+            if (a < b) std::swap(a, b);
+            int expected = a;
+            if (parent[a].compare_exchange_strong(expected, b)) return;
+        }
+    }
+};
+
+inline uint64_t gridCellKey(const int64_t x, const int64_t y, const int64_t z)
+{
+    const int64_t offset = int64_t(1) << 20;
+    return (uint64_t(x + offset) << 42) | (uint64_t(y + offset) << 21) | uint64_t(z + offset);
+}
+
+inline int64_t gridCellCoordinate(const float value, const float invCellSize)
+{
+    const double cell = std::floor(double(value) * invCellSize);
+    // keeps every field of the key and of its neighbor keys within 21 bits
+    const double limit = double((int64_t(1) << 20) - 2);
+    return int64_t(std::max(-limit, std::min(limit, cell)));
+}
+
+}
+
+int
+computeConnectedComponents(const ParticlesData& particles, const float radius, int* clusterIds, int numThreads)
+{
+    const int numParticles = particles.numParticles();
+    if (radius <= 0) {
+        for (int i=0; i<numParticles; i++) clusterIds[i] = i;
+        return numParticles;
+    }
+
+    ParticleAttribute posAttr;
+    if (!particles.attributeInfo("position", posAttr) || posAttr.type != VECTOR || posAttr.count != 3) {
+        std::cerr << "Partio: computeConnectedComponents, position attribute is not a vector of size 3" << std::endl;
+        return -1;
+    }
+    if (numParticles == 0) return 0;
+    const char* positions = particles.data<char>(posAttr, 0);
+    const ptrdiff_t stride = numParticles > 1 ? particles.data<char>(posAttr, 1) - positions : 0;
+    const float radiusSquared = radius * radius;
+    const float invCellSize = 1.f / radius;
+
+    // bucket particles into a uniform grid with cell size radius
+    std::vector<std::pair<uint64_t,int> > keyAndIndex(numParticles);
+    for (int i=0; i<numParticles; i++) {
+        const float* p = reinterpret_cast<const float*>(positions + i * stride);
+        keyAndIndex[i] = std::make_pair(gridCellKey(gridCellCoordinate(p[0], invCellSize),
+            gridCellCoordinate(p[1], invCellSize), gridCellCoordinate(p[2], invCellSize)), i);
+    }
+    std::sort(keyAndIndex.begin(), keyAndIndex.end());
+    std::vector<uint64_t> cellKeys;
+    std::vector<int> cellStarts;
+    for (int i=0; i<numParticles; i++) {
+        if (i == 0 || keyAndIndex[i].first != keyAndIndex[i-1].first) {
+            cellKeys.push_back(keyAndIndex[i].first);
+            cellStarts.push_back(i);
+        }
+    }
+    cellStarts.push_back(numParticles);
+    const int numCells = static_cast<int>(cellKeys.size());
+
+    ConcurrentDisjointSets sets(numParticles);
+    auto linkCells = [&](const int firstCell, const int lastCell) {
+        for (int cell=firstCell; cell<lastCell; cell++) {
+            const uint64_t key = cellKeys[cell];
+            // visit the cell itself and the 13 neighbors with a larger key, every pair is tested once
+            for (int64_t dx=-1; dx<=1; dx++) for (int64_t dy=-1; dy<=1; dy++) for (int64_t dz=-1; dz<=1; dz++) {
+                const uint64_t neighborKey = key + (uint64_t(dx) << 42) + (uint64_t(dy) << 21) + uint64_t(dz);
+                if (neighborKey < key) continue;
+                int neighbor = cell;
+                if (neighborKey != key) {
+                    std::vector<uint64_t>::const_iterator it = std::lower_bound(cellKeys.begin() + cell, cellKeys.end(), neighborKey);
+                    if (it == cellKeys.end() || *it != neighborKey) continue;
+                    neighbor = static_cast<int>(it - cellKeys.begin());
+                }
+                for (int i=cellStarts[cell]; i<cellStarts[cell+1]; i++) {
+                    const int a = keyAndIndex[i].second;
+                    const float* pa = reinterpret_cast<const float*>(positions + a * stride);
+                    for (int j=(neighbor == cell ? i+1 : cellStarts[neighbor]); j<cellStarts[neighbor+1]; j++) {
+                        const int b = keyAndIndex[j].second;
+                        const float* pb = reinterpret_cast<const float*>(positions + b * stride);
+                        const float x = pa[0]-pb[0], y = pa[1]-pb[1], z = pa[2]-pb[2];
+                        if (x*x + y*y + z*z <= radiusSquared) sets.unite(a, b);
+                    }
+                }
+            }
+        }
+    };
+
+    if (numThreads <= 0) numThreads = std::max(1u, std::thread::hardware_concurrency());
+    numThreads = std::min(numThreads, numCells);
+    if (numThreads == 1) {
+        linkCells(0, numCells);
+    } else {
+        std::vector<std::thread> threads;
+        for (int t=0; t<numThreads; t++) {
+            threads.push_back(std::thread(linkCells, int(int64_t(numCells) * t / numThreads), int(int64_t(numCells) * (t+1) / numThreads)));
+        }
+        for (size_t t=0; t<threads.size(); t++) threads[t].join();
+    }
+
+    // roots are the smallest index of their component, so this numbers clusters in order of first appearance
+    int numClusters = 0;
+    for (int i=0; i<numParticles; i++) {
+        const int root = sets.find(i);
+        clusterIds[i] = root == i ? numClusters++ : clusterIds[root];
+    }
+    return numClusters;
+}
+
+namespace {
+
+//! Returns the first value of a per-particle attribute and the byte stride between particles,
+//! or null if the attribute is missing or does not have the given type and count
+const char* attributeColumn(const ParticlesData& particles, const char* name, const ParticleAttributeType type, const int count, ptrdiff_t& stride)
+{
+    ParticleAttribute attr;
+    if (!particles.attributeInfo(name, attr) || attr.type != type || attr.count != count) return 0;
+    if (particles.numParticles() == 0) return 0;
+    const char* base = particles.data<char>(attr, 0);
+    stride = particles.numParticles() > 1 ? particles.data<char>(attr, 1) - base : 0;
+    return base;
+}
+
+}
+
+bool
+interpolatePositions(const ParticlesData& frame0, const ParticlesData* frame1, const float t, const float dt, float* positions, const std::string& identifier)
+{
+    const int numParticles = frame0.numParticles();
+    ptrdiff_t posStride0 = 0;
+    const char* pos0 = attributeColumn(frame0, "position", VECTOR, 3, posStride0);
+    if (!pos0) {
+        if (numParticles == 0) return true;
+        std::cerr << "Partio: interpolatePositions, position attribute is not a vector of size 3" << std::endl;
+        return false;
+    }
+    ptrdiff_t velStride0 = 0;
+    const char* vel0 = attributeColumn(frame0, "velocity", VECTOR, 3, velStride0);
+
+    // index of the same particle in frame1 for every particle of frame0, -1 if it is missing
+    std::vector<int> match(numParticles, -1);
+    ptrdiff_t posStride1 = 0;
+    const char* pos1 = frame1 ? attributeColumn(*frame1, "position", VECTOR, 3, posStride1) : 0;
+    if (pos1) {
+        const int numParticles1 = frame1->numParticles();
+        ptrdiff_t idStride0 = 0, idStride1 = 0;
+        const char* id0 = attributeColumn(frame0, identifier.c_str(), INT, 1, idStride0);
+        const char* id1 = attributeColumn(*frame1, identifier.c_str(), INT, 1, idStride1);
+        if (id0 && id1) {
+            std::unordered_map<int,int> idToParticleIndex;
+            idToParticleIndex.reserve(numParticles1);
+            for (int i=0; i<numParticles1; i++) {
+                idToParticleIndex[*reinterpret_cast<const int*>(id1 + i * idStride1)] = i;
+            }
+            for (int i=0; i<numParticles; i++) {
+                std::unordered_map<int,int>::const_iterator it = idToParticleIndex.find(*reinterpret_cast<const int*>(id0 + i * idStride0));
+                if (it != idToParticleIndex.end()) match[i] = it->second;
+            }
+        } else if (!id0 && !id1 && numParticles == numParticles1) {
+            // without identifiers only an unchanged particle count allows to match particles by index
+            for (int i=0; i<numParticles; i++) match[i] = i;
+        }
+    }
+
+    const float velocityScale = t * dt;
+    for (int i=0; i<numParticles; i++) {
+        const float* p0 = reinterpret_cast<const float*>(pos0 + i * posStride0);
+        float* out = positions + 3 * i;
+        if (match[i] >= 0) {
+            const float* p1 = reinterpret_cast<const float*>(pos1 + match[i] * posStride1);
+            for (int k=0; k<3; k++) out[k] = p0[k] + t * (p1[k] - p0[k]);
+        } else if (vel0) {
+            const float* v0 = reinterpret_cast<const float*>(vel0 + i * velStride0);
+            for (int k=0; k<3; k++) out[k] = p0[k] + velocityScale * v0[k];
+        } else {
+            for (int k=0; k<3; k++) out[k] = p0[k];
+        }
+    }
+    return true;
+}
+
+namespace {
+
+//! Spreads the lower 21 bits of v so that two zero bits follow each bit
+inline uint64_t spreadBits(uint64_t v)
+{
+    v &= 0x1fffff;
+    v = (v | v << 32) & 0x1f00000000ffffULL;
+    v = (v | v << 16) & 0x1f0000ff0000ffULL;
+    v = (v | v << 8) & 0x100f00f00f00f00fULL;
+    v = (v | v << 4) & 0x10c30c30c30c30c3ULL;
+    v = (v | v << 2) & 0x1249249249249249ULL;
+    return v;
+}
+
+//! Runs work(begin, end) on numThreads threads that split [0, numItems) evenly
+template<class F>
+void parallelRanges(const int numItems, int numThreads, const F& work)
+{
+    numThreads = std::max(1, std::min(numThreads, numItems));
+    if (numThreads == 1) {
+        work(0, numItems);
+        return;
+    }
+    std::vector<std::thread> threads;
+    for (int t=0; t<numThreads; t++) {
+        threads.push_back(std::thread(work, int(int64_t(numItems) * t / numThreads), int(int64_t(numItems) * (t+1) / numThreads)));
+    }
+    for (size_t t=0; t<threads.size(); t++) threads[t].join();
+}
+
+}
+
+ParticlesDataMutable*
+sortSpatially(const ParticlesData& particles, const std::string& identifier, int numThreads)
+{
+    ParticleAttribute posAttr;
+    if (!particles.attributeInfo("position", posAttr) || posAttr.type != VECTOR || posAttr.count != 3) {
+        std::cerr << "Partio: sortSpatially, position attribute is not a vector of size 3" << std::endl;
+        return 0;
+    }
+    const int numParticles = particles.numParticles();
+    if (numThreads <= 0) numThreads = std::max(1u, std::thread::hardware_concurrency());
+    // below this, starting threads costs more than it saves
+    if (numParticles < 65536) numThreads = 1;
+
+    // bounding box of the positions, per thread and then combined
+    const char* positions = numParticles ? particles.data<char>(posAttr, 0) : 0;
+    const ptrdiff_t stride = numParticles > 1 ? particles.data<char>(posAttr, 1) - positions : 0;
+    const int numRanges = std::max(1, std::min(numThreads, numParticles));
+    const float huge = std::numeric_limits<float>::max();
+    std::vector<Vec3> boxMin(numRanges, Vec3(huge, huge, huge)), boxMax(numRanges, Vec3(-huge, -huge, -huge));
+    parallelRanges(numRanges, numRanges, [&](const int firstRange, const int lastRange) {
+        for (int r=firstRange; r<lastRange; r++) {
+            for (int i=int(int64_t(numParticles) * r / numRanges); i<int(int64_t(numParticles) * (r+1) / numRanges); i++) {
+                const Vec3 p(reinterpret_cast<const float*>(positions + i * stride));
+                boxMin[r] = boxMin[r].min(p);
+                boxMax[r] = boxMax[r].max(p);
+            }
+        }
+    });
+    Vec3 lo = boxMin[0], hi = boxMax[0];
+    for (int r=1; r<numRanges; r++) {
+        lo = lo.min(boxMin[r]);
+        hi = hi.max(boxMax[r]);
+    }
+
+    // 21 bits per axis on the largest extent keeps the cells cubic
+    const Vec3 size = hi - lo;
+    const float extent = std::max(size.x, std::max(size.y, size.z));
+    const double origin[3] = {lo.x, lo.y, lo.z};
+    const double scale = extent > 0 ? double((1 << 21) - 1) / extent : 0.;
+    std::vector<std::pair<uint64_t,int> > codeAndIndex(numParticles);
+    parallelRanges(numParticles, numThreads, [&](const int begin, const int end) {
+        for (int i=begin; i<end; i++) {
+            const float* p = reinterpret_cast<const float*>(positions + i * stride);
+            uint64_t code = 0;
+            for (int k=0; k<3; k++) {
+                // NaN positions end up in cell 0
+                const double cell = (double(p[k]) - origin[k]) * scale;
+                code |= spreadBits(cell > 0 ? uint64_t(std::min(cell, double((1 << 21) - 1))) : 0) << (2 - k);
+            }
+            codeAndIndex[i] = std::make_pair(code, i);
+        }
+    });
+
+    // sort chunks in parallel and merge them pairwise
+    const int numChunks = std::max(1, std::min(numThreads, numParticles));
+    std::vector<int> chunkStarts;
+    for (int c=0; c<=numChunks; c++) chunkStarts.push_back(int(int64_t(numParticles) * c / numChunks));
+    parallelRanges(numChunks, numChunks, [&](const int begin, const int end) {
+        for (int c=begin; c<end; c++) std::sort(codeAndIndex.begin() + chunkStarts[c], codeAndIndex.begin() + chunkStarts[c+1]);
+    });
+    for (int width=1; width<numChunks; width*=2) {
+        const int numMerges = (numChunks + 2*width - 1) / (2*width);
+        parallelRanges(numMerges, numMerges, [&](const int begin, const int end) {
+            for (int m=begin; m<end; m++) {
+                const int first = chunkStarts[2*m*width];
+                const int middle = chunkStarts[std::min(numChunks, (2*m+1)*width)];
+                const int last = chunkStarts[std::min(numChunks, (2*m+2)*width)];
+                std::inplace_merge(codeAndIndex.begin() + first, codeAndIndex.begin() + middle, codeAndIndex.begin() + last);
+            }
+        });
+    }
+
+    ParticlesDataMutable* sorted = create();
+    FixedAttribute fixedAttr;
+    for (int i=0; i<particles.numFixedAttributes(); i++) {
+        particles.fixedAttributeInfo(i, fixedAttr);
+        FixedAttribute sortedFixedAttr = sorted->addFixedAttribute(fixedAttr.name.c_str(), fixedAttr.type, fixedAttr.count);
+        if (fixedAttr.type == INDEXEDSTR) {
+            const std::vector<std::string>& values = particles.fixedIndexedStrs(fixedAttr);
+            for (size_t j=0; j<values.size(); j++) sorted->registerFixedIndexedStr(sortedFixedAttr, values[j].c_str());
+        }
+        std::memcpy(sorted->fixedDataWrite<void>(sortedFixedAttr), particles.fixedData<void>(fixedAttr), TypeSize(fixedAttr.type) * fixedAttr.count);
+    }
+    sorted->addParticles(numParticles);
+
+    ParticleAttribute attr;
+    bool hasIdentifier = false;
+    for (int a=0; a<particles.numAttributes(); a++) {
+        particles.attributeInfo(a, attr);
+        hasIdentifier |= attr.name == identifier;
+        ParticleAttribute sortedAttr = sorted->addAttribute(attr.name.c_str(), attr.type, attr.count);
+        if (attr.type == INDEXEDSTR) {
+            // registered in the same order, so the indices stay valid
+            const std::vector<std::string>& values = particles.indexedStrs(attr);
+            for (size_t j=0; j<values.size(); j++) sorted->registerIndexedStr(sortedAttr, values[j].c_str());
+        }
+        if (!numParticles) continue;
+        const size_t size = TypeSize(attr.type) * attr.count;
+        const char* source = particles.data<char>(attr, 0);
+        const ptrdiff_t sourceStride = numParticles > 1 ? particles.data<char>(attr, 1) - source : 0;
+        char* destination = sorted->dataWrite<char>(sortedAttr, 0);
+        const ptrdiff_t destinationStride = numParticles > 1 ? sorted->dataWrite<char>(sortedAttr, 1) - destination : 0;
+        parallelRanges(numParticles, numThreads, [&](const int begin, const int end) {
+            for (int i=begin; i<end; i++) {
+                std::memcpy(destination + i * destinationStride, source + codeAndIndex[i].second * sourceStride, size);
+            }
+        });
+    }
+
+    if (!hasIdentifier) {
+        // the original index, sorting by it restores the simulation order
+        ParticleAttribute idAttr = sorted->addAttribute(identifier.c_str(), INT, 1);
+        if (numParticles) {
+            char* ids = sorted->dataWrite<char>(idAttr, 0);
+            const ptrdiff_t idStride = numParticles > 1 ? sorted->dataWrite<char>(idAttr, 1) - ids : 0;
+            for (int i=0; i<numParticles; i++) *reinterpret_cast<int*>(ids + i * idStride) = codeAndIndex[i].second;
+        }
+    }
+    return sorted;
+}
+
 template<typename T>
 struct AttributePair {
     T base;
@@ -42,7 +42,12 @@ OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGES.
 #include <map>
 #include <algorithm>
 #include <cassert>
+#include <cstdlib>
+#include <cstring>
 #include <iostream>
+#ifdef PARTIO_WIN32
+#    include <malloc.h>
+#endif
 
 #include "KdTree.h"
 
@@ -50,19 +55,47 @@ OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGES.
 using namespace Partio;
 
 ParticlesSimple::
-ParticlesSimple()
-    :particleCount(0),allocatedCount(0),kdtree(0)
+ParticlesSimple(const size_t columnAlignment)
+    :particleCount(0),allocatedCount(0),columnAlignment(columnAlignment),kdtree(0)
 {
 }
 
 ParticlesSimple::
 ~ParticlesSimple()
 {
-    for(unsigned int i=0;i<attributeData.size();i++) free(attributeData[i]);
+    for(unsigned int i=0;i<attributeData.size();i++) freeColumn(attributeData[i]);
     for(unsigned int i=0;i<fixedAttributeData.size();i++) free(fixedAttributeData[i]);
     delete kdtree;
 }
 
+char* ParticlesSimple::
+reallocColumn(char* column,const size_t oldBytes,const size_t newBytes) const
+{
+    if(!columnAlignment) return (char*)realloc(column,newBytes);
+
+    // there is no aligned realloc, so copy the used part over by hand
+    char* memory=0;
+#ifdef PARTIO_WIN32
+    memory=(char*)_aligned_malloc(std::max(newBytes,columnAlignment),columnAlignment);
+#else
+    void* aligned=0;
+    if(posix_memalign(&aligned,columnAlignment,std::max(newBytes,columnAlignment))==0) memory=(char*)aligned;
+#endif
+    if(!memory) return 0;
+    if(column) memcpy(memory,column,std::min(oldBytes,newBytes));
+    freeColumn(column);
+    return memory;
+}
+
+void ParticlesSimple::
+freeColumn(char* column) const
+{
+#ifdef PARTIO_WIN32
+    if(columnAlignment){_aligned_free(column);return;}
+#endif
+    free(column);
+}
+
 void ParticlesSimple::
 release()
 {
@@ -225,7 +258,7 @@ addAttribute(const char* attribute,ParticleAttributeType type,const int count)
 
     int stride=TypeSize(type)*count;
     attributeStrides.push_back(stride);
-    char* dataPointer=(char*)malloc((size_t)allocatedCount*(size_t)stride);
+    char* dataPointer=reallocColumn(0,0,(size_t)allocatedCount*(size_t)stride);
     attributeData.push_back(dataPointer);
     attributeOffsets.push_back(dataPointer-(char*)0);
     attributeIndexedStrs.push_back(IndexedStrTable());
@@ -261,9 +294,10 @@ ParticleIndex ParticlesSimple::
 addParticle()
 {
     if(allocatedCount==particleCount){
+        const int oldCount=allocatedCount;
         allocatedCount=std::max(10,std::max(allocatedCount*3/2,particleCount));
         for(unsigned int i=0;i<attributes.size();i++) {
-            char *memory = (char*)realloc(attributeData[i],(size_t)attributeStrides[i]*(size_t)allocatedCount);
+            char *memory = reallocColumn(attributeData[i],(size_t)attributeStrides[i]*(size_t)oldCount,(size_t)attributeStrides[i]*(size_t)allocatedCount);
             if(memory){
                 attributeData[i]=memory;
             }
@@ -279,9 +313,10 @@ addParticles(const int countToAdd)
 {
     if(particleCount+countToAdd>allocatedCount){
         // TODO: this should follow 2/3 rule
+        const int oldCount=allocatedCount;
         allocatedCount=allocatedCount+countToAdd;
         for(unsigned int i=0;i<attributes.size();i++){
-            attributeData[i]=(char*)realloc(attributeData[i],(size_t)attributeStrides[i]*(size_t)allocatedCount);
+            attributeData[i]=reallocColumn(attributeData[i],(size_t)attributeStrides[i]*(size_t)oldCount,(size_t)attributeStrides[i]*(size_t)allocatedCount);
             attributeOffsets[i]=attributeData[i]-(char*)0;
         }
     }
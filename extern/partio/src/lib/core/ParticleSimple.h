@@ -54,7 +54,8 @@ public:
 
     virtual void release();
 
-    ParticlesSimple();
+    //! columnAlignment>0 places every attribute array on a multiple of that many bytes
+    ParticlesSimple(const size_t columnAlignment=0);
 
     int numAttributes() const;
     int numFixedAttributes() const;
@@ -99,9 +100,13 @@ private:
     void dataInternalMultiple(const ParticleAttribute& attribute,const int indexCount,
         const ParticleIndex* particleIndices,const bool sorted,char* values) const;
 
+    char* reallocColumn(char* column,const size_t oldBytes,const size_t newBytes) const;
+    void freeColumn(char* column) const;
+
 private:
     int particleCount;
     int allocatedCount;
+    size_t columnAlignment;
     std::vector<char*> attributeData; // Inside is data of appropriate type
     std::vector<size_t> attributeOffsets; // Inside is data of appropriate type
     struct IndexedStrTable{
@@ -37,6 +37,7 @@ OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGES.
 #include "PartioEndian.h"
 #include "../core/ParticleHeaders.h"
 #include "ZIP.h"
+#include "MappedFile.h"
 
 #include <algorithm>
 #include <iostream>
@@ -193,10 +194,13 @@ bool skipPrimitives(int nPoints, int nPrims, int nPrimAttrib, istream* input,std
     return true;
 }
 
-ParticlesDataMutable* readBGEO(const char* filename,const bool headersOnly,std::ostream* errorStream)
+ParticlesDataMutable* readBGEO(const char* filename,const bool headersOnly,std::ostream* errorStream,const ParticleLayout layout)
 {
-    unique_ptr<istream> input(Gzip_In(filename,ios::in|ios::binary));
-    if(!*input){
+    // uncompressed files are mapped so the point block can be swapped straight into the columns
+    unique_ptr<MappedFile> mapped(MappedFile::open(filename));
+    unique_ptr<istream> streamInput(mapped ? 0 : Gzip_In(filename,ios::in|ios::binary));
+    istream* input=mapped ? &mapped->stream() : streamInput.get();
+    if(!input || !*input){
         if(errorStream) *errorStream<<"Partio: Unable to open file "<<filename<<endl;
         return 0;
     }
@@ -238,7 +242,7 @@ ParticlesDataMutable* readBGEO(const char* filename,const bool headersOnly,std::
     // Allocate a simple particle with the appropriate number of points
     ParticlesDataMutable* simple=0;
     if(headersOnly) simple=new ParticleHeaders;
-    else simple=create();
+    else simple=create(layout);
 
     simple->addParticles(nPoints);
 
@@ -251,10 +255,27 @@ ParticlesDataMutable* readBGEO(const char* filename,const bool headersOnly,std::
     attrOffsets.push_back(0); // pull values from byte offset
     attrHandles.push_back(simple->addAttribute("position",VECTOR,3)); // we always have one
     accessors.push_back(ParticleAccessor(attrHandles[0]));
-    getAttributes(particleSize, attrOffsets, attrHandles, accessors, nPointAttrib, input.get(), simple, headersOnly, errorStream);
+    getAttributes(particleSize, attrOffsets, attrHandles, accessors, nPointAttrib, input, simple, headersOnly, errorStream);
 
+    const size_t pointBlockSize=(size_t)nPoints*particleSize*sizeof(int);
+    const char* pointBlock=mapped && !headersOnly ? mapped->current(pointBlockSize) : 0;
     if(headersOnly) {
-        skip(input.get(),nPoints*particleSize*sizeof(int));
+        skip(input,pointBlockSize);
+    } else if(pointBlock) {
+        // Gather and swap one attribute at a time from the mapped records
+        for(unsigned int attrIndex=0;attrIndex<attrHandles.size();attrIndex++){
+            ParticleAttribute& handle=attrHandles[attrIndex];
+            const size_t bytes=handle.count*sizeof(int);
+            char* column=simple->dataWrite<char>(handle,0);
+            const ptrdiff_t stride=nPoints>1 ? simple->dataWrite<char>(handle,1)-column : (ptrdiff_t)bytes;
+            const char* record=pointBlock+attrOffsets[attrIndex]*sizeof(int);
+            for(int i=0;i<nPoints;i++){
+                int* data=(int*)(column+i*stride);
+                memcpy(data,record+(size_t)i*particleSize*sizeof(int),bytes);
+                for(int k=0;k<handle.count;k++) BIGEND::swap(data[k]);
+            }
+        }
+        input->seekg(pointBlockSize,ios::cur);
     } else {
         // Read the points
         int *buffer=new int[particleSize];
@@ -280,13 +301,13 @@ ParticlesDataMutable* readBGEO(const char* filename,const bool headersOnly,std::
         delete [] buffer;
     }
 
-    if (!skipPrimitives(nPoints, nPrims, nPrimAttrib, input.get(),errorStream)) return simple;
+    if (!skipPrimitives(nPoints, nPrims, nPrimAttrib, input,errorStream)) return simple;
 
     particleSize=0;
     vector<int> fixedAttrOffsets; // offsets in # of 32 bit offsets
     vector<FixedAttribute> fixedAttrHandles;
     vector<DummyAccessor> fixedAccessors;
-    getAttributes(particleSize, fixedAttrOffsets, fixedAttrHandles, fixedAccessors, nAttrib, input.get(), simple, headersOnly, errorStream);
+    getAttributes(particleSize, fixedAttrOffsets, fixedAttrHandles, fixedAccessors, nAttrib, input, simple, headersOnly, errorStream);
 
     if (headersOnly) return simple;
 
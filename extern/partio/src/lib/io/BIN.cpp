@@ -42,6 +42,7 @@ Modifications from: github user: redpawfx (redpawFX@gmail.com)  and Luma Picture
 #include "../core/ParticleHeaders.h"
 #include "PartioEndian.h"
 #include "ZIP.h"
+#include "MappedFile.h"
 
 #include <iostream>
 #include <fstream>
@@ -90,9 +91,12 @@ typedef struct{
 } BIN_HEADERV6;
 
 
-ParticlesDataMutable* readBIN(const char* filename, const bool headersOnly,std::ostream* errorStream){
+ParticlesDataMutable* readBIN(const char* filename, const bool headersOnly,std::ostream* errorStream,const ParticleLayout layout){
 
-    unique_ptr<istream> input(new ifstream(filename,ios::in|ios::binary));
+    // records are fixed size, reading them from a mapping avoids a buffered copy per field
+    unique_ptr<MappedFile> mapped(MappedFile::open(filename));
+    unique_ptr<istream> streamInput(mapped ? 0 : new ifstream(filename,ios::in|ios::binary));
+    istream* input=mapped ? &mapped->stream() : streamInput.get();
 
     if(!*input){
         if(errorStream) *errorStream << "Partio: Unable to open file " << filename << endl;
@@ -122,7 +126,7 @@ ParticlesDataMutable* readBIN(const char* filename, const bool headersOnly,std::
     }
 
 
-    ParticlesDataMutable* simple = headersOnly ? new ParticleHeaders: create();
+    ParticlesDataMutable* simple = headersOnly ? new ParticleHeaders: create(layout);
     simple->addParticles(header.numParticles);
 
     ParticleAttribute posAttr;
@@ -36,12 +36,14 @@ OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGES.
 #include "../Partio.h"
 #include "../core/ParticleHeaders.h"
 #include "ZIP.h"
+#include "PartioAscii.h"
 
 #include <iostream>
 #include <fstream>
 #include <string>
 #include <cassert>
 #include <memory>
+#include <limits>
 
 
 namespace Partio
@@ -50,14 +52,14 @@ namespace Partio
 using namespace std;
 
 template<ParticleAttributeType ETYPE>
-void readGeoAttr(istream& f,const ParticleAttribute& attr,ParticleAccessor& accessor,ParticlesDataMutable::iterator& iterator)
+bool readGeoAttr(const char*& p,const char* end,const ParticleAttribute& attr,ParticlesDataMutable& simple,const ParticleIndex index)
 {
-    //cout<<"reading "<<TypeName(attr.type)<<endl;
     typedef typename ETYPE_TO_TYPE<ETYPE>::TYPE TYPE;
-    TYPE* data=accessor.raw<TYPE>(iterator);
+    TYPE* data=simple.dataWrite<TYPE>(attr,index);
     for(int k=0;k<attr.count;k++){
-        f>>data[k];
+        if(!parseNumber(p,end,data[k])) return false;
     }
+    return true;
 }
 
 void writeString(std::ostream& output,const char* s){
@@ -107,7 +109,7 @@ string scanString(istream& input)
     return string(buf);
 }
 
-ParticlesDataMutable* readGEO(const char* filename,const bool headersOnly,std::ostream* errorStream)
+ParticlesDataMutable* readGEO(const char* filename,const bool headersOnly,std::ostream* errorStream,const ParticleLayout layout)
 {
     unique_ptr<istream> input(Gzip_In(filename,ios::in));
     if(!*input){
@@ -118,7 +120,7 @@ ParticlesDataMutable* readGEO(const char* filename,const bool headersOnly,std::o
 
     ParticlesDataMutable* simple=0;
     if(headersOnly) simple=new ParticleHeaders;
-    else simple=create();
+    else simple=create(layout);
 
     // read NPoints and NPointAttrib
     string word;
@@ -127,19 +129,19 @@ ParticlesDataMutable* readGEO(const char* filename,const bool headersOnly,std::o
         if(word=="NPoints") *input>>NPoints;
         else if(word=="NPointAttrib"){*input>>NPointAttrib;break;}
     }
-    // skip until PointAttrib
-    while(input->good()){
-        *input>>word;
-        if(word=="PointAttrib") break;
-    }
+    // skip until PointAttrib, without point attributes the points follow the header line
+    if(NPointAttrib>0){
+        while(input->good()){
+            *input>>word;
+            if(word=="PointAttrib") break;
+        }
+    }else input->ignore(numeric_limits<streamsize>::max(),'\n');
     // read attribute descriptions
     int attrInfoRead = 0;
     
     ParticleAttribute positionAttr=simple->addAttribute("position",VECTOR,3);
-    ParticleAccessor positionAccessor(positionAttr);
 
     vector<ParticleAttribute> attrs;
-    vector<ParticleAccessor> accessors;
     while (input->good() && attrInfoRead < NPointAttrib) {
         string attrName, attrType;
         int nvals = 0;
@@ -161,7 +163,6 @@ ParticlesDataMutable* readGEO(const char* filename,const bool headersOnly,std::o
                     }
                 }
             }
-            accessors.push_back(ParticleAccessor(attrs.back()));
             attrInfoRead++;
             
         }else{
@@ -179,46 +180,44 @@ ParticlesDataMutable* readGEO(const char* filename,const bool headersOnly,std::o
                 type=NONE;
             }
             attrs.push_back(simple->addAttribute(attrName.c_str(),type,nvals));
-            accessors.push_back(ParticleAccessor(attrs.back()));
             attrInfoRead++;
         }
     }
 
     simple->addParticles(NPoints);
 
-    ParticlesDataMutable::iterator iterator=simple->begin();
-    iterator.addAccessor(positionAccessor);
-    for(size_t i=0;i<accessors.size();i++) iterator.addAccessor(accessors[i]);
-
     if(headersOnly) return simple; // escape before we try to touch data
-    
-    
-    float fval;
-    // TODO: fix
-    for(ParticlesDataMutable::iterator end=simple->end();iterator!=end  && input->good();++iterator){
-        float* posInternal=positionAccessor.raw<float>(iterator); 
-        for(int i=0;i<3;i++) *input>>posInternal[i];
-        *input>>fval;
-        //cout<<"saw "<<posInternal[0]<<" "<<posInternal[1]<<" "<<posInternal[2]<<endl;
-        
-        // skip open paren
-        char paren = 0;
-        *input>> paren;
-        if (paren != '(') break;
-        
-        // read additional attribute values
+
+    // Parse the point block from memory, one point per line
+    vector<char> buffer;
+    readRemaining(*input,buffer);
+    const char* begin=buffer.empty() ? 0 : &buffer[0];
+    ParticlesDataMutable& particles=*simple;
+    const int numParsed=parseRecords(begin,begin+buffer.size(),NPoints,[&](const char*& p,const char* end,const int index){
+        float* posInternal=particles.dataWrite<float>(positionAttr,index);
+        float w;
+        for(int i=0;i<3;i++) if(!parseNumber(p,end,posInternal[i])) return false;
+        if(!parseNumber(p,end,w)) return false;
+
+        // attribute values are wrapped in parens, which are omitted without attributes
+        if(!parseChar(p,end,'(')) return attrs.empty();
         for (unsigned int i=0;i<attrs.size();i++){
+            bool ok=false;
             switch(attrs[i].type){
                 case NONE: assert(false);break;
-                case FLOAT: readGeoAttr<FLOAT>(*input,attrs[i],accessors[i],iterator);break;
-                case VECTOR: readGeoAttr<VECTOR>(*input,attrs[i],accessors[i],iterator);break;
-                case INT: readGeoAttr<INT>(*input,attrs[i],accessors[i],iterator);break;
-                case INDEXEDSTR: readGeoAttr<INDEXEDSTR>(*input,attrs[i],accessors[i],iterator);break;
+                case FLOAT: ok=readGeoAttr<FLOAT>(p,end,attrs[i],particles,index);break;
+                case VECTOR: ok=readGeoAttr<VECTOR>(p,end,attrs[i],particles,index);break;
+                case INT: ok=readGeoAttr<INT>(p,end,attrs[i],particles,index);break;
+                case INDEXEDSTR: ok=readGeoAttr<INDEXEDSTR>(p,end,attrs[i],particles,index);break;
             }
+            if(!ok) return false;
         }
-        // skip closing parenthes
-        *input >> paren;
-        if (paren != ')') break;
+        return parseChar(p,end,')');
+    });
+    if(numParsed!=NPoints){
+        if(errorStream) *errorStream<<"Partio: Failed to read point "<<numParsed<<" of "<<NPoints<<" in '"<<filename<<"'"<<endl;
+        simple->release();
+        return 0;
     }
     return simple;
 }
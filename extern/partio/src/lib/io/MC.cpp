@@ -129,7 +129,7 @@ bool IsStringInCharArray(std::string target, char** list){
 static const int MC_MAGIC = ((((('F'<<8)|'O')<<8)|'R')<<8)|'4';
 static const int HEADER_SIZE = 56;
 
-ParticlesDataMutable* readMC(const char* filename, const bool headersOnly,std::ostream* errorStream){
+ParticlesDataMutable* readMC(const char* filename, const bool headersOnly,std::ostream* errorStream,const ParticleLayout layout){
 
     std::unique_ptr<std::istream> input(Gzip_In(filename,std::ios::in|std::ios::binary));
     if(!*input){
@@ -165,7 +165,7 @@ ParticlesDataMutable* readMC(const char* filename, const bool headersOnly,std::o
         simple = new ParticleHeaders;
     }
     else{
-        simple=create();
+        simple=create(layout);
     }
 
     int numParticles = 0;
@@ -0,0 +1,158 @@
+/*
+PARTIO SOFTWARE
+Copyright 2010 Disney Enterprises, Inc. All rights reserved
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are
+met:
+
+* Redistributions of source code must retain the above copyright
+notice, this list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright
+notice, this list of conditions and the following disclaimer in
+the documentation and/or other materials provided with the
+distribution.
+
+* The names "Disney", "Walt Disney Pictures", "Walt Disney Animation
+Studios" or the names of its contributors may NOT be used to
+endorse or promote products derived from this software without
+specific prior written permission from Walt Disney Pictures.
+
+Disclaimer: THIS SOFTWARE IS PROVIDED BY WALT DISNEY PICTURES AND
+CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING,
+BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY, FITNESS
+FOR A PARTICULAR PURPOSE, NONINFRINGEMENT AND TITLE ARE DISCLAIMED.
+IN NO EVENT SHALL WALT DISNEY PICTURES, THE COPYRIGHT HOLDER OR
+CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND BASED ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGES.
+*/
+
+#ifdef PARTIO_WIN32
+#    define NOMINMAX
+#    include <windows.h>
+#else
+#    include <sys/mman.h>
+#    include <sys/stat.h>
+#    include <fcntl.h>
+#    include <unistd.h>
+#endif
+
+#include "MappedFile.h"
+
+namespace Partio{
+
+//#####################################################################
+// Class MappedFile::Buffer
+//#####################################################################
+MappedFile::Buffer::
+Buffer(const char* begin,const char* end)
+{
+    char* b=const_cast<char*>(begin);
+    setg(b,b,const_cast<char*>(end));
+}
+
+std::streambuf::pos_type MappedFile::Buffer::
+seekoff(off_type off,std::ios_base::seekdir dir,std::ios_base::openmode which)
+{
+    if(!(which & std::ios_base::in)) return pos_type(off_type(-1));
+    char* target=0;
+    if(dir==std::ios_base::beg) target=eback()+off;
+    else if(dir==std::ios_base::cur) target=gptr()+off;
+    else target=egptr()+off;
+    if(target<eback() || target>egptr()) return pos_type(off_type(-1));
+    setg(eback(),target,egptr());
+    return pos_type(target-eback());
+}
+
+std::streambuf::pos_type MappedFile::Buffer::
+seekpos(pos_type pos,std::ios_base::openmode which)
+{
+    return seekoff(off_type(pos),std::ios_base::beg,which);
+}
+
+//#####################################################################
+// Class MappedFile
+//#####################################################################
+MappedFile::
+MappedFile(const char* base,size_t length)
+    :base(base),length(length),
+#ifdef PARTIO_WIN32
+    fileHandle(0),mappingHandle(0),
+#endif
+    buffer(base,base+length),input(&buffer)
+{
+}
+
+MappedFile::
+~MappedFile()
+{
+#ifdef PARTIO_WIN32
+    UnmapViewOfFile(base);
+    CloseHandle((HANDLE)mappingHandle);
+    CloseHandle((HANDLE)fileHandle);
+#else
+    munmap(const_cast<char*>(base),length);
+#endif
+}
+
+MappedFile* MappedFile::
+open(const std::string& filename)
+{
+    const char* base=0;
+    size_t length=0;
+#ifdef PARTIO_WIN32
+    HANDLE file=CreateFileA(filename.c_str(),GENERIC_READ,FILE_SHARE_READ,0,OPEN_EXISTING,FILE_ATTRIBUTE_NORMAL,0);
+    if(file==INVALID_HANDLE_VALUE) return 0;
+    LARGE_INTEGER fileSize;
+    if(!GetFileSizeEx(file,&fileSize) || fileSize.QuadPart<2){CloseHandle(file);return 0;}
+    HANDLE mapping=CreateFileMappingA(file,0,PAGE_READONLY,0,0,0);
+    if(!mapping){CloseHandle(file);return 0;}
+    base=(const char*)MapViewOfFile(mapping,FILE_MAP_READ,0,0,0);
+    if(!base){CloseHandle(mapping);CloseHandle(file);return 0;}
+    length=(size_t)fileSize.QuadPart;
+#else
+    int fd=::open(filename.c_str(),O_RDONLY);
+    if(fd<0) return 0;
+    struct stat info;
+    if(fstat(fd,&info)!=0 || info.st_size<2){::close(fd);return 0;}
+    length=(size_t)info.st_size;
+    void* address=mmap(0,length,PROT_READ,MAP_PRIVATE,fd,0);
+    ::close(fd);
+    if(address==MAP_FAILED) return 0;
+    base=(const char*)address;
+#endif
+
+    // gzip magic, compressed files have to go through Gzip_In
+    if((unsigned char)base[0]==0x1f && (unsigned char)base[1]==0x8b){
+#ifdef PARTIO_WIN32
+        UnmapViewOfFile(base);CloseHandle(mapping);CloseHandle(file);
+#else
+        munmap(const_cast<char*>(base),length);
+#endif
+        return 0;
+    }
+
+    MappedFile* mapped=new MappedFile(base,length);
+#ifdef PARTIO_WIN32
+    mapped->fileHandle=file;
+    mapped->mappingHandle=mapping;
+#endif
+    return mapped;
+}
+
+const char* MappedFile::
+current(size_t numBytes)
+{
+    if(!input) return 0;
+    std::streamoff offset=input.tellg();
+    if(offset<0 || (size_t)offset+numBytes>length) return 0;
+    return base+offset;
+}
+
+} // namespace Partio
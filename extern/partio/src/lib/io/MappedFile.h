@@ -0,0 +1,98 @@
+/*
+PARTIO SOFTWARE
+Copyright 2010 Disney Enterprises, Inc. All rights reserved
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are
+met:
+
+* Redistributions of source code must retain the above copyright
+notice, this list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright
+notice, this list of conditions and the following disclaimer in
+the documentation and/or other materials provided with the
+distribution.
+
+* The names "Disney", "Walt Disney Pictures", "Walt Disney Animation
+Studios" or the names of its contributors may NOT be used to
+endorse or promote products derived from this software without
+specific prior written permission from Walt Disney Pictures.
+
+Disclaimer: THIS SOFTWARE IS PROVIDED BY WALT DISNEY PICTURES AND
+CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING,
+BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY, FITNESS
+FOR A PARTICULAR PURPOSE, NONINFRINGEMENT AND TITLE ARE DISCLAIMED.
+IN NO EVENT SHALL WALT DISNEY PICTURES, THE COPYRIGHT HOLDER OR
+CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND BASED ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGES.
+*/
+
+#ifndef _MappedFile_h_
+#define _MappedFile_h_
+
+#include <cstddef>
+#include <istream>
+#include <streambuf>
+#include <string>
+
+namespace Partio{
+
+//#####################################################################
+// Class MappedFile
+//#####################################################################
+//! Read-only memory mapping of an uncompressed particle file.
+/*!
+  Readers use this to avoid streaming large uncompressed point blocks
+  through an istream. Only pages that are actually touched are faulted
+  in by the operating system. open() returns 0 if the file cannot be
+  mapped or is gzip compressed, in which case the caller should fall
+  back to Gzip_In().
+*/
+class MappedFile
+{
+    class Buffer:public std::streambuf
+    {
+    public:
+        Buffer(const char* begin,const char* end);
+    protected:
+        pos_type seekoff(off_type off,std::ios_base::seekdir dir,std::ios_base::openmode which);
+        pos_type seekpos(pos_type pos,std::ios_base::openmode which);
+    };
+
+    const char* base;
+    size_t length;
+#ifdef PARTIO_WIN32
+    void* fileHandle;
+    void* mappingHandle;
+#endif
+    Buffer buffer;
+    std::istream input;
+
+    MappedFile(const char* base,size_t length);
+public:
+    ~MappedFile();
+
+    //! Maps filename, returns 0 if not possible or if the file is compressed
+    static MappedFile* open(const std::string& filename);
+
+    //! Start of the mapped file
+    const char* data() const {return base;}
+
+    //! Size of the mapped file in bytes
+    size_t size() const {return length;}
+
+    //! Stream over the mapped bytes, used for parsing headers
+    std::istream& stream() {return input;}
+
+    //! Pointer to the current stream position if at least numBytes remain, 0 otherwise
+    const char* current(size_t numBytes);
+//#####################################################################
+};
+}
+#endif
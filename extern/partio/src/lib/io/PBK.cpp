@@ -0,0 +1,425 @@
+/*
+PARTIO SOFTWARE
+Copyright 2010 Disney Enterprises, Inc. All rights reserved
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are
+met:
+
+* Redistributions of source code must retain the above copyright
+notice, this list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright
+notice, this list of conditions and the following disclaimer in
+the documentation and/or other materials provided with the
+distribution.
+
+* The names "Disney", "Walt Disney Pictures", "Walt Disney Animation
+Studios" or the names of its contributors may NOT be used to
+endorse or promote products derived from this software without
+specific prior written permission from Walt Disney Pictures.
+
+Disclaimer: THIS SOFTWARE IS PROVIDED BY WALT DISNEY PICTURES AND
+CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING,
+BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY, FITNESS
+FOR A PARTICULAR PURPOSE, NONINFRINGEMENT AND TITLE ARE DISCLAIMED.
+IN NO EVENT SHALL WALT DISNEY PICTURES, THE COPYRIGHT HOLDER OR
+CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND BASED ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGES.
+*/
+
+#include "../Partio.h"
+#include "../core/ParticleHeaders.h"
+#include "PartioBinary.h"
+#include "PartioEndian.h"
+
+#include <algorithm>
+#include <cmath>
+#include <cstring>
+#include <fstream>
+#include <iostream>
+#include <memory>
+#include <sstream>
+#include <string>
+#include <vector>
+#ifdef PARTIO_USE_ZLIB
+#include <zlib.h>
+#endif
+
+namespace Partio{
+
+using namespace std;
+
+/*
+  Bricked particle file (.pbk), all values little endian:
+
+    char[4] "PBRK", int version, int compression (0 none, 1 zlib)
+    int numParticles, int numAttributes
+      per attribute: string name, int type, int count[, string table if INDEXEDSTR]
+    int numFixedAttributes
+      per fixed attribute: string name, int type, int count[, string table], values
+    int numBricks
+      per brick: float bboxMin[3], float bboxMax[3], int numParticles, uint64 offset, uint64 size
+    brick data
+
+  Strings are stored as int length plus characters. The particles of a brick lie in one
+  cell of a uniform grid, its data holds the values of every attribute for all particles of
+  the brick, one attribute after the other, and is compressed on its own, so a reader only
+  has to decompress the bricks whose bounds overlap the region it is interested in.
+*/
+
+static const char PBK_MAGIC[4]={'P','B','R','K'};
+static const int PBK_VERSION=1;
+static const int PBK_PARTICLES_PER_BRICK=16384;
+
+struct PBKBrick
+{
+    float bboxMin[3],bboxMax[3];
+    int numParticles;
+    uint64_t offset,size;
+};
+
+static ParticlesDataMutable* readPBKFile(const char* filename,const bool headersOnly,const float* bboxMin,const float* bboxMax,std::ostream* errorStream,const ParticleLayout layout)
+{
+    ifstream input(filename,ios::in|ios::binary);
+    if(!input){
+        if(errorStream) *errorStream<<"Partio: Unable to open file "<<filename<<endl;
+        return 0;
+    }
+
+    input.seekg(0,ios::end);
+    const uint64_t fileSize=uint64_t(input.tellg());
+    input.seekg(0,ios::beg);
+
+    char magic[4];
+    int version=0,compression=0,numParticles=0,numAttributes=0;
+    input.read(magic,4);
+    read<LITEND>(input,version,compression,numParticles,numAttributes);
+    if(!input || memcmp(magic,PBK_MAGIC,4)!=0){
+        if(errorStream) *errorStream<<"Partio: Magic number of '"<<filename<<"' doesn't match pbk magic"<<endl;
+        return 0;
+    }
+    if(version!=PBK_VERSION){
+        if(errorStream) *errorStream<<"Partio: Unsupported pbk version "<<version<<" in '"<<filename<<"'"<<endl;
+        return 0;
+    }
+    // every attribute takes at least a name length, a type and a count
+    if(numParticles<0 || numAttributes<0 || uint64_t(numAttributes)*12>fileSize){
+        if(errorStream) *errorStream<<"Partio: Invalid pbk header in '"<<filename<<"'"<<endl;
+        return 0;
+    }
+#ifndef PARTIO_USE_ZLIB
+    if(compression!=0 && !headersOnly){
+        if(errorStream) *errorStream<<"Partio: pbk file '"<<filename<<"' is compressed but partio was not compiled with zlib"<<endl;
+        return 0;
+    }
+#endif
+
+    unique_ptr<ParticlesDataMutable,void(*)(ParticlesDataMutable*)> simple(
+        headersOnly ? new ParticleHeaders : create(layout),[](ParticlesDataMutable* p){p->release();});
+
+    vector<ParticleAttribute> attrs(numAttributes);
+    vector<size_t> attrSizes(numAttributes);
+    size_t particleSize=0;
+    int posIndex=-1;
+    for(int i=0;i<numAttributes;i++){
+        string name;
+        int type=0,count=0;
+        if(readString(input,name)) read<LITEND>(input,type,count);
+        if(!input || type<VECTOR || type>INDEXEDSTR || count<=0 || uint64_t(count)*4>fileSize){
+            if(errorStream) *errorStream<<"Partio: Invalid attribute "<<name<<" in '"<<filename<<"'"<<endl;
+            return 0;
+        }
+        attrs[i]=simple->addAttribute(name.c_str(),ParticleAttributeType(type),count);
+        attrSizes[i]=TypeSize(attrs[i].type)*count;
+        particleSize+=attrSizes[i];
+        if(name=="position" && (type==VECTOR || type==FLOAT) && count==3) posIndex=i;
+        if(type==INDEXEDSTR){
+            vector<string> strings;
+            if(!readStrings(input,strings)){
+                if(errorStream) *errorStream<<"Partio: Invalid strings of attribute "<<name<<" in '"<<filename<<"'"<<endl;
+                return 0;
+            }
+            if(!headersOnly) for(size_t k=0;k<strings.size();k++) simple->registerIndexedStr(attrs[i],strings[k].c_str());
+        }
+    }
+
+    if(!readFixedAttributes(input,*simple,headersOnly,fileSize,filename,errorStream)) return 0;
+
+    int numBricks=0;
+    read<LITEND>(input,numBricks);
+    const uint64_t brickTableEntrySize=6*sizeof(float)+sizeof(int)+2*sizeof(uint64_t);
+    if(!input || numBricks<0 || uint64_t(numBricks)*brickTableEntrySize>fileSize){
+        if(errorStream) *errorStream<<"Partio: Invalid pbk header in '"<<filename<<"'"<<endl;
+        return 0;
+    }
+    vector<PBKBrick> bricks(numBricks);
+    int64_t brickParticles=0;
+    for(int b=0;b<numBricks;b++){
+        PBKBrick& brick=bricks[b];
+        read<LITEND>(input,brick.bboxMin[0],brick.bboxMin[1],brick.bboxMin[2]);
+        read<LITEND>(input,brick.bboxMax[0],brick.bboxMax[1],brick.bboxMax[2]);
+        read<LITEND>(input,brick.numParticles,brick.offset,brick.size);
+        if(!input){
+            if(errorStream) *errorStream<<"Partio: Invalid pbk header in '"<<filename<<"'"<<endl;
+            return 0;
+        }
+        // the data has to lie in the file and hold the particles of the brick, compressed at most by deflate's ratio
+        const uint64_t maxRawSize=compression==0 ? brick.size : brick.size*MAX_DEFLATE_RATIO;
+        if(brick.numParticles<0 || brick.offset>fileSize || brick.size>fileSize-brick.offset ||
+            (brick.numParticles>0 && particleSize>maxRawSize/uint64_t(brick.numParticles)) ||
+            (compression==0 && uint64_t(brick.numParticles)*particleSize!=brick.size)){
+            if(errorStream) *errorStream<<"Partio: Invalid brick "<<b<<" in '"<<filename<<"'"<<endl;
+            return 0;
+        }
+        brickParticles+=brick.numParticles;
+    }
+    if(brickParticles!=numParticles){
+        if(errorStream) *errorStream<<"Partio: The bricks of '"<<filename<<"' hold "<<brickParticles<<" particles instead of "<<numParticles<<endl;
+        return 0;
+    }
+
+    if(headersOnly){
+        simple->addParticles(numParticles);
+        return simple.release();
+    }
+
+    // decompress the bricks that overlap the box and select the particles inside of it
+    const bool cropped=bboxMin && bboxMax;
+    if(cropped && posIndex<0){
+        if(errorStream) *errorStream<<"Partio: pbk file '"<<filename<<"' has no position attribute to crop with"<<endl;
+        return 0;
+    }
+    vector<vector<char> > brickData;
+    vector<vector<int> > brickSelection;
+    vector<int> brickCounts;
+    int total=0;
+    vector<char> compressed;
+    for(int b=0;b<numBricks;b++){
+        const PBKBrick& brick=bricks[b];
+        if(cropped){
+            bool overlaps=true;
+            for(int k=0;k<3;k++) overlaps=overlaps && brick.bboxMin[k]<=bboxMax[k] && brick.bboxMax[k]>=bboxMin[k];
+            if(!overlaps) continue;
+        }
+        vector<char> data(size_t(brick.numParticles)*particleSize);
+        input.seekg(brick.offset);
+        if(compression==0){
+            if(data.size()) input.read(&data[0],data.size());
+        }else{
+#ifdef PARTIO_USE_ZLIB
+            compressed.resize(brick.size);
+            if(compressed.size()) input.read(&compressed[0],compressed.size());
+            uLongf rawSize=data.size();
+            if(input && (uncompress(reinterpret_cast<Bytef*>(data.data()),&rawSize,reinterpret_cast<const Bytef*>(compressed.data()),compressed.size())!=Z_OK || rawSize!=data.size())){
+                if(errorStream) *errorStream<<"Partio: Failed to decompress brick "<<b<<" of '"<<filename<<"'"<<endl;
+                return 0;
+            }
+#endif
+        }
+        if(!input){
+            if(errorStream) *errorStream<<"Partio: Unexpected end of file in '"<<filename<<"'"<<endl;
+            return 0;
+        }
+        swapWords(data.data(),data.size());
+
+        vector<int> selection;
+        if(cropped){
+            size_t posOffset=0;
+            for(int i=0;i<posIndex;i++) posOffset+=attrSizes[i]*brick.numParticles;
+            const float* positions=reinterpret_cast<const float*>(&data[posOffset]);
+            for(int j=0;j<brick.numParticles;j++){
+                const float* p=positions+3*j;
+                if(p[0]>=bboxMin[0] && p[0]<=bboxMax[0] && p[1]>=bboxMin[1] && p[1]<=bboxMax[1] && p[2]>=bboxMin[2] && p[2]<=bboxMax[2])
+                    selection.push_back(j);
+            }
+            if(selection.empty()) continue;
+        }
+        const int count=cropped ? int(selection.size()) : brick.numParticles;
+        total+=count;
+        brickCounts.push_back(count);
+        brickData.push_back(vector<char>());
+        brickData.back().swap(data);
+        brickSelection.push_back(vector<int>());
+        brickSelection.back().swap(selection);
+    }
+
+    simple->addParticles(total);
+    if(total==0) return simple.release();
+    for(int i=0;i<numAttributes;i++){
+        char* base=simple->dataWrite<char>(attrs[i],0);
+        const ptrdiff_t stride=total>1 ? simple->dataWrite<char>(attrs[i],1)-base : 0;
+        const size_t size=attrSizes[i];
+        int index=0;
+        for(size_t b=0;b<brickData.size();b++){
+            const int brickParticles=int(brickData[b].size()/particleSize);
+            size_t columnOffset=0;
+            for(int k=0;k<i;k++) columnOffset+=attrSizes[k]*brickParticles;
+            const char* column=brickData[b].data()+columnOffset;
+            const vector<int>& selection=brickSelection[b];
+            if(!cropped && stride==ptrdiff_t(size)){
+                memcpy(base+index*stride,column,size*brickCounts[b]);
+                index+=brickCounts[b];
+            }else if(!cropped){
+                for(int j=0;j<brickCounts[b];j++,index++) memcpy(base+index*stride,column+j*size,size);
+            }else{
+                for(size_t j=0;j<selection.size();j++,index++) memcpy(base+index*stride,column+selection[j]*size,size);
+            }
+        }
+    }
+    return simple.release();
+}
+
+ParticlesDataMutable* readPBK(const char* filename,const bool headersOnly,std::ostream* errorStream,const ParticleLayout layout)
+{
+    return readPBKFile(filename,headersOnly,0,0,errorStream,layout);
+}
+
+ParticlesDataMutable* readPBKBox(const char* filename,const float bboxMin[3],const float bboxMax[3],std::ostream* errorStream,const ParticleLayout layout)
+{
+    return readPBKFile(filename,false,bboxMin,bboxMax,errorStream,layout);
+}
+
+bool writePBKBricks(const char* filename,const ParticlesData& p,const int particlesPerBrick,std::ostream* errorStream)
+{
+    ParticleAttribute posAttr;
+    if(!p.attributeInfo("position",posAttr) || (posAttr.type!=VECTOR && posAttr.type!=FLOAT) || posAttr.count!=3){
+        if(errorStream) *errorStream<<"Partio: pbk files need a position attribute with 3 components"<<endl;
+        return false;
+    }
+    const int numParticles=p.numParticles();
+    vector<ParticleAttribute> attrs(p.numAttributes());
+    vector<size_t> attrSizes(attrs.size());
+    vector<const char*> attrBases(attrs.size());
+    vector<ptrdiff_t> attrStrides(attrs.size());
+    for(size_t i=0;i<attrs.size();i++){
+        p.attributeInfo(int(i),attrs[i]);
+        attrSizes[i]=TypeSize(attrs[i].type)*attrs[i].count;
+        attrBases[i]=numParticles ? p.data<char>(attrs[i],0) : 0;
+        attrStrides[i]=numParticles>1 ? p.data<char>(attrs[i],1)-attrBases[i] : 0;
+    }
+    const char* posBase=numParticles ? p.data<char>(posAttr,0) : 0;
+    const ptrdiff_t posStride=numParticles>1 ? p.data<char>(posAttr,1)-posBase : 0;
+
+    // grid cells of roughly equal volume, about particlesPerBrick particles each for uniform density
+    float bboxMin[3]={0,0,0},bboxMax[3]={0,0,0};
+    for(int i=0;i<numParticles;i++){
+        const float* pos=reinterpret_cast<const float*>(posBase+i*posStride);
+        for(int k=0;k<3;k++){
+            if(i==0 || pos[k]<bboxMin[k]) bboxMin[k]=pos[k];
+            if(i==0 || pos[k]>bboxMax[k]) bboxMax[k]=pos[k];
+        }
+    }
+    const int numCells=max(1,(numParticles+max(1,particlesPerBrick)-1)/max(1,particlesPerBrick));
+    const double maxExtent=max(double(bboxMax[0]-bboxMin[0]),max(double(bboxMax[1]-bboxMin[1]),double(bboxMax[2]-bboxMin[2])));
+    double extent[3];
+    for(int k=0;k<3;k++) extent[k]=maxExtent>0 ? max(double(bboxMax[k]-bboxMin[k]),maxExtent*1e-3) : 1.;
+    const double cellSize=cbrt(extent[0]*extent[1]*extent[2]/numCells);
+    int64_t resolution[3];
+    double scale[3];
+    for(int k=0;k<3;k++){
+        resolution[k]=min(int64_t(1024),max(int64_t(1),int64_t(extent[k]/cellSize+0.5)));
+        scale[k]=resolution[k]/extent[k];
+    }
+    vector<pair<int64_t,int> > keyAndIndex(numParticles);
+    for(int i=0;i<numParticles;i++){
+        const float* pos=reinterpret_cast<const float*>(posBase+i*posStride);
+        int64_t cell[3];
+        for(int k=0;k<3;k++){
+            const double c=(pos[k]-bboxMin[k])*scale[k];
+            cell[k]=c>=0 ? min(resolution[k]-1,int64_t(c)) : 0;
+        }
+        keyAndIndex[i]=make_pair((cell[0]*resolution[1]+cell[1])*resolution[2]+cell[2],i);
+    }
+    sort(keyAndIndex.begin(),keyAndIndex.end());
+
+    // gather and compress the particles of every brick
+    vector<PBKBrick> bricks;
+    vector<vector<char> > brickData;
+    vector<char> raw;
+    for(int start=0;start<numParticles;){
+        int end=start+1;
+        while(end<numParticles && keyAndIndex[end].first==keyAndIndex[start].first) end++;
+        PBKBrick brick;
+        brick.numParticles=end-start;
+        for(int j=start;j<end;j++){
+            const float* pos=reinterpret_cast<const float*>(posBase+keyAndIndex[j].second*posStride);
+            for(int k=0;k<3;k++){
+                if(j==start || pos[k]<brick.bboxMin[k]) brick.bboxMin[k]=pos[k];
+                if(j==start || pos[k]>brick.bboxMax[k]) brick.bboxMax[k]=pos[k];
+            }
+        }
+        raw.clear();
+        for(size_t i=0;i<attrs.size();i++){
+            for(int j=start;j<end;j++){
+                const char* value=attrBases[i]+keyAndIndex[j].second*attrStrides[i];
+                raw.insert(raw.end(),value,value+attrSizes[i]);
+            }
+        }
+        swapWords(raw.data(),raw.size());
+        brickData.push_back(vector<char>());
+#ifdef PARTIO_USE_ZLIB
+        uLongf size=compressBound(raw.size());
+        brickData.back().resize(size);
+        if(compress2(reinterpret_cast<Bytef*>(brickData.back().data()),&size,reinterpret_cast<const Bytef*>(raw.data()),raw.size(),Z_DEFAULT_COMPRESSION)!=Z_OK){
+            if(errorStream) *errorStream<<"Partio: Failed to compress particles for "<<filename<<endl;
+            return false;
+        }
+        brickData.back().resize(size);
+#else
+        brickData.back()=raw;
+#endif
+        brick.size=brickData.back().size();
+        bricks.push_back(brick);
+        start=end;
+    }
+
+    ostringstream header;
+    header.write(PBK_MAGIC,4);
+#ifdef PARTIO_USE_ZLIB
+    write<LITEND>(header,PBK_VERSION,int(1));
+#else
+    write<LITEND>(header,PBK_VERSION,int(0));
+#endif
+    write<LITEND>(header,numParticles,int(attrs.size()));
+    for(size_t i=0;i<attrs.size();i++){
+        writeString(header,attrs[i].name);
+        write<LITEND>(header,int(attrs[i].type),attrs[i].count);
+        if(attrs[i].type==INDEXEDSTR) writeStrings(header,p.indexedStrs(attrs[i]));
+    }
+    writeFixedAttributes(header,p);
+    write<LITEND>(header,int(bricks.size()));
+    const size_t brickTableSize=bricks.size()*(6*sizeof(float)+sizeof(int)+2*sizeof(uint64_t));
+    uint64_t offset=uint64_t(header.tellp())+brickTableSize;
+    for(size_t b=0;b<bricks.size();b++){
+        PBKBrick& brick=bricks[b];
+        brick.offset=offset;
+        offset+=brick.size;
+        write<LITEND>(header,brick.bboxMin[0],brick.bboxMin[1],brick.bboxMin[2]);
+        write<LITEND>(header,brick.bboxMax[0],brick.bboxMax[1],brick.bboxMax[2]);
+        write<LITEND>(header,brick.numParticles,brick.offset,brick.size);
+    }
+
+    ofstream output(filename,ios::out|ios::binary);
+    if(!output){
+        if(errorStream) *errorStream<<"Partio: Unable to open file "<<filename<<endl;
+        return false;
+    }
+    const string headerData=header.str();
+    output.write(headerData.data(),headerData.size());
+    for(size_t b=0;b<brickData.size();b++) output.write(brickData[b].data(),brickData[b].size());
+    return bool(output);
+}
+
+bool writePBK(const char* filename,const ParticlesData& p,const bool /*compressed*/,std::ostream* errorStream)
+{
+    // bricks are always compressed if partio has zlib, the flag is ignored
+    return writePBKBricks(filename,p,PBK_PARTICLES_PER_BRICK,errorStream);
+}
+
+}
@@ -35,6 +35,7 @@ OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGES.
 #include "../Partio.h"
 #include "../core/ParticleHeaders.h"
 #include "ZIP.h"
+#include "PartioAscii.h"
 
 #include <iostream>
 #include <fstream>
@@ -49,7 +50,7 @@ using namespace std;
 
 // TODO: convert this to use iterators like the rest of the readers/writers
 
-ParticlesDataMutable* readPDA(const char* filename,const bool headersOnly,std::ostream* errorStream)
+ParticlesDataMutable* readPDA(const char* filename,const bool headersOnly,std::ostream* errorStream,const ParticleLayout layout)
 {
     unique_ptr<istream> input(Gzip_In(filename,ios::in|ios::binary));
     if(!*input){
@@ -59,7 +60,7 @@ ParticlesDataMutable* readPDA(const char* filename,const bool headersOnly,std::o
 
     ParticlesDataMutable* simple=0;
     if(headersOnly) simple=new ParticleHeaders;
-    else simple=create();
+    else simple=create(layout);
 
     // read NPoints and NPointAttrib
     string word;
@@ -116,28 +117,32 @@ ParticlesDataMutable* readPDA(const char* filename,const bool headersOnly,std::o
         if(word != "DATA"){simple->release();return 0;}
     }
 
-    // Read actual particle data
+    // Read actual particle data, one particle per line
     if(!input->good()){simple->release();return 0;}
-    for(unsigned int particleIndex=0;input->good() && particleIndex<num; particleIndex++) {
+    vector<char> buffer;
+    readRemaining(*input,buffer);
+    const char* begin=buffer.empty() ? 0 : &buffer[0];
+    ParticlesDataMutable& particles=*simple;
+    const int numParsed=parseRecords(begin,begin+buffer.size(),num,[&](const char*& p,const char* end,const int particleIndex){
         for(unsigned int attrIndex=0;attrIndex<attrs.size();attrIndex++){
             if(attrs[attrIndex].type==Partio::INT){
-                int* data=simple->dataWrite<int>(attrs[attrIndex],particleIndex);
-                for(int count=0;count<attrs[attrIndex].count;count++){
-                    int ival;
-                    *input>>ival;
-                    data[count]=ival;
-                }
+                int* data=particles.dataWrite<int>(attrs[attrIndex],particleIndex);
+                for(int count=0;count<attrs[attrIndex].count;count++)
+                    if(!parseNumber(p,end,data[count])) return false;
             }else if(attrs[attrIndex].type==Partio::FLOAT || attrs[attrIndex].type==Partio::VECTOR){
-                float* data=simple->dataWrite<float>(attrs[attrIndex],particleIndex);
-                for(int count=0;count<attrs[attrIndex].count;count++){
-                    float fval;
-                    *input>>fval;
-                    data[count]=fval;
-                }
+                float* data=particles.dataWrite<float>(attrs[attrIndex],particleIndex);
+                for(int count=0;count<attrs[attrIndex].count;count++)
+                    if(!parseNumber(p,end,data[count])) return false;
             }
         }
+        return true;
+    });
+    if(numParsed!=(int)num){
+        if(errorStream) *errorStream<<"Partio: Failed to read particle "<<numParsed<<" of "<<num<<" in '"<<filename<<"'"<<endl;
+        simple->release();
+        return 0;
     }
-    
+
     return simple;
 }
 
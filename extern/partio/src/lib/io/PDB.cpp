@@ -42,6 +42,7 @@ namespace PDB{
 }
 #include "PartioEndian.h"
 #include "ZIP.h"
+#include "MappedFile.h"
 #include <algorithm>
 #include <iostream>
 #include <fstream>
@@ -89,11 +90,14 @@ string GetString(istream& input,bool& error)
 }
 
 
-template<int bits> ParticlesDataMutable* readPDBHelper(const char* filename,const bool headersOnly,std::ostream* errorStream)
+template<int bits> ParticlesDataMutable* readPDBHelper(const char* filename,const bool headersOnly,std::ostream* errorStream,const ParticleLayout layout)
 {
 
-    unique_ptr<istream> input(Gzip_In(filename,ios::in|ios::binary));
-    if(!*input){
+    // uncompressed channels are stored as native columns and can be copied straight from the mapping
+    unique_ptr<MappedFile> mapped(MappedFile::open(filename));
+    unique_ptr<istream> streamInput(mapped ? 0 : Gzip_In(filename,ios::in|ios::binary));
+    istream* input=mapped ? &mapped->stream() : streamInput.get();
+    if(!input || !*input){
         if(errorStream) *errorStream<<"Partio: Unable to open file "<<filename<<endl;
         return 0;
     }
@@ -101,7 +105,7 @@ template<int bits> ParticlesDataMutable* readPDBHelper(const char* filename,cons
     // Use simple particle since we don't have optimized storage.
     ParticlesDataMutable* simple=0;
     if(headersOnly) simple=new ParticleHeaders;
-    else simple=create();
+    else simple=create(layout);
 
     // Read header and add as many particles as found
     typename PDB_POLICY<bits>::HEADER header;
@@ -137,27 +141,41 @@ template<int bits> ParticlesDataMutable* readPDBHelper(const char* filename,cons
             case PDB_LONG: type=INT;break;
             default: type=NONE;break;
         }
-        int size=header.data_size*channelData.datasize;
+        const int64_t size=(int64_t)header.data_size*channelData.datasize;
 
         // Read data or skip if we haven't found appropriate type handle
         if(type==NONE){
             char buf[1024];
-            int toSkip=size;
+            int64_t toSkip=size;
             while(toSkip>0){
-                input->read(buf,min(toSkip,1024));
+                input->read(buf,min(toSkip,(int64_t)1024));
                 toSkip-=1024;
             }
             if(errorStream) *errorStream<<"Partio: Attribute '"<<name<<"' cannot map type"<<endl;
         }else{
             int count=channelData.datasize/TypeSize(type);
+            // the channels are copied by attribute size, a remainder would overrun the columns
+            if(count<1 || channelData.datasize!=(unsigned int)(count*TypeSize(type))){
+                if(errorStream) *errorStream<<"Partio: Attribute '"<<name<<"' has a data size of "<<channelData.datasize<<" bytes that is no multiple of its type"<<endl;
+                simple->release();
+                return 0;
+            }
             ParticleAttribute attrHandle=simple->addAttribute(name.c_str(),type,count);
             if(headersOnly){
                 char buf[1024];
-                int toSkip=size;
+                int64_t toSkip=size;
                 while(toSkip>0){
-                    input->read(buf,min(toSkip,1024));
+                    input->read(buf,min(toSkip,(int64_t)1024));
                     toSkip-=1024;
                 }
+            }else if(const char* channel=mapped ? mapped->current(size) : 0){
+                const size_t bytes=sizeof(float)*attrHandle.count;
+                char* column=simple->dataWrite<char>(attrHandle,0);
+                const int nPoints=simple->numParticles();
+                const ptrdiff_t stride=nPoints>1 ? simple->dataWrite<char>(attrHandle,1)-column : (ptrdiff_t)bytes;
+                if(stride==(ptrdiff_t)bytes) memcpy(column,channel,size);
+                else for(int i=0;i<nPoints;i++) memcpy(column+i*stride,channel+i*bytes,bytes);
+                input->seekg(size,ios::cur);
             }else{
                 Partio::ParticlesDataMutable::iterator it=simple->begin();
                 Partio::ParticleAccessor accessor(attrHandle);
@@ -251,11 +269,11 @@ bool writePDBHelper(const char* filename,const ParticlesData& p,const bool compr
     return true;
 }
 
-ParticlesDataMutable* readPDB32(const char* filename,const bool headersOnly,std::ostream* errorStream)
-{return readPDBHelper<32>(filename,headersOnly,errorStream);}
+ParticlesDataMutable* readPDB32(const char* filename,const bool headersOnly,std::ostream* errorStream,const ParticleLayout layout)
+{return readPDBHelper<32>(filename,headersOnly,errorStream,layout);}
 
-ParticlesDataMutable* readPDB64(const char* filename,const bool headersOnly,std::ostream* errorStream)
-{return readPDBHelper<64>(filename,headersOnly,errorStream);}
+ParticlesDataMutable* readPDB64(const char* filename,const bool headersOnly,std::ostream* errorStream,const ParticleLayout layout)
+{return readPDBHelper<64>(filename,headersOnly,errorStream,layout);}
 
 bool writePDB32(const char* filename,const ParticlesData& p,const bool compressed,std::ostream* errorStream)
 {return writePDBHelper<32>(filename,p,compressed,errorStream);}
@@ -263,7 +281,7 @@ bool writePDB32(const char* filename,const ParticlesData& p,const bool compresse
 bool writePDB64(const char* filename,const ParticlesData& p,const bool compressed,std::ostream* errorStream)
 {return writePDBHelper<64>(filename,p,compressed,errorStream);}
 
-ParticlesDataMutable* readPDB(const char* filename,const bool headersOnly,std::ostream* errorStream)
+ParticlesDataMutable* readPDB(const char* filename,const bool headersOnly,std::ostream* errorStream,const ParticleLayout layout)
 {
     unique_ptr<istream> input(Gzip_In(filename,ios::in|ios::binary));
     if(!*input){
@@ -283,9 +301,9 @@ ParticlesDataMutable* readPDB(const char* filename,const bool headersOnly,std::o
     input->read((char*)&channelIOHeader,sizeof(channelIOHeader));
     //cout<<"we got channel io as "<<int(channelIOHeader.type)<<" swap is "<<channelIOHeader.swap<<endl;
     if(channelIOHeader.type > 5  || channelIOHeader.type < 0 || (channelIOHeader.swap != 1 && channelIOHeader.swap != 0)){
-        return readPDBHelper<32>(filename,headersOnly,errorStream);
+        return readPDBHelper<32>(filename,headersOnly,errorStream,layout);
     }else{
-        return readPDBHelper<64>(filename,headersOnly,errorStream);
+        return readPDBHelper<64>(filename,headersOnly,errorStream,layout);
     }
 }
 
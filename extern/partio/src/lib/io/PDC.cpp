@@ -74,7 +74,7 @@ string readName(istream& input){
     return result;
 }
 
-ParticlesDataMutable* readPDC(const char* filename, const bool headersOnly,std::ostream* errorStream){
+ParticlesDataMutable* readPDC(const char* filename, const bool headersOnly,std::ostream* errorStream,const ParticleLayout layout){
 
     unique_ptr<istream> input(Gzip_In(filename,std::ios::in|std::ios::binary));
     if(!*input){
@@ -92,7 +92,7 @@ ParticlesDataMutable* readPDC(const char* filename, const bool headersOnly,std::
     BIGEND::swap(header.numParticles);
     BIGEND::swap(header.numAttrs);
 
-    ParticlesDataMutable* simple = headersOnly ? new ParticleHeaders: create();
+    ParticlesDataMutable* simple = headersOnly ? new ParticleHeaders: create(layout);
     simple->addParticles(header.numParticles);
 
     for(int attrIndex = 0; attrIndex < header.numAttrs; attrIndex++){
@@ -146,7 +146,7 @@ static bool write_buffer(std::ostream& os, z_stream& z, char* out_buf, void* p,
 
 
 
-ParticlesDataMutable* readPRT(const char* filename,const bool headersOnly,std::ostream* errorStream)
+ParticlesDataMutable* readPRT(const char* filename,const bool headersOnly,std::ostream* errorStream,const ParticleLayout layout)
 {
     std::unique_ptr<std::istream> input(new std::ifstream(filename,std::ios::in|std::ios::binary));
     if (!*input) {
@@ -157,7 +157,7 @@ ParticlesDataMutable* readPRT(const char* filename,const bool headersOnly,std::o
     // Use simple particle since we don't have optimized storage.
     ParticlesDataMutable* simple=0;
     if (headersOnly) simple=new ParticleHeaders;
-    else simple=create();
+    else simple=create(layout);
 
     FileHeadder header;
     input->read((char*)&header,sizeof(FileHeadder));
@@ -437,7 +437,7 @@ bool writePRT(const char* filename,const ParticlesData& p,const bool /*compresse
 
 
 namespace Partio{
-ParticlesDataMutable* readPRT(const char* filename,const bool headersOnly, std::ostream* error)
+ParticlesDataMutable* readPRT(const char* filename,const bool headersOnly, std::ostream* error,const ParticleLayout layout)
 {
     std::cerr<<"PRT not supported on windows"<<std::endl;
     return 0;
@@ -0,0 +1,377 @@
+/*
+PARTIO SOFTWARE
+Copyright 2010 Disney Enterprises, Inc. All rights reserved
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are
+met:
+
+* Redistributions of source code must retain the above copyright
+notice, this list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright
+notice, this list of conditions and the following disclaimer in
+the documentation and/or other materials provided with the
+distribution.
+
+* The names "Disney", "Walt Disney Pictures", "Walt Disney Animation
+Studios" or the names of its contributors may NOT be used to
+endorse or promote products derived from this software without
+specific prior written permission from Walt Disney Pictures.
+
+Disclaimer: THIS SOFTWARE IS PROVIDED BY WALT DISNEY PICTURES AND
+CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING,
+BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY, FITNESS
+FOR A PARTICULAR PURPOSE, NONINFRINGEMENT AND TITLE ARE DISCLAIMED.
+IN NO EVENT SHALL WALT DISNEY PICTURES, THE COPYRIGHT HOLDER OR
+CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND BASED ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGES.
+*/
+
+#include "../Partio.h"
+#include "../core/ParticleHeaders.h"
+#include "PartioBinary.h"
+#include "PartioEndian.h"
+
+#include <algorithm>
+#include <atomic>
+#include <cstring>
+#include <fstream>
+#include <iostream>
+#include <memory>
+#include <sstream>
+#include <string>
+#include <thread>
+#include <vector>
+#ifdef PARTIO_USE_ZLIB
+#include <zlib.h>
+#endif
+
+namespace Partio{
+
+using namespace std;
+
+/*
+  Shuffled column file (.psc), all values little endian:
+
+    char[4] "PSHC", int version, int compression (0 none, 1 zlib)
+    int numParticles, int particlesPerBlock, int numAttributes
+      per attribute: string name, int type, int count, int filter[, string table if INDEXEDSTR]
+    int numFixedAttributes
+      per fixed attribute: string name, int type, int count[, string table], values
+    per attribute, per block: uint64 offset, uint64 size
+    block data
+
+  Strings are stored as int length plus characters. Every attribute column is split into
+  blocks of particlesPerBlock particles that are compressed on their own, so that columns
+  and blocks can be decompressed in parallel. Before compression the 4 byte words of a
+  block are byte shuffled, i.e. the first bytes of all words are followed by the second
+  bytes and so on, which puts the slowly varying sign and exponent bytes of floats next to
+  each other. With the delta filter every word is replaced by its difference to the same
+  component of the previous particle first, which suits ids and sorted positions.
+*/
+
+static const char PSC_MAGIC[4]={'P','S','H','C'};
+static const int PSC_VERSION=1;
+static const int PSC_PARTICLES_PER_BLOCK=65536;
+
+enum PSCFilter {PSC_SHUFFLE=0,PSC_DELTA_SHUFFLE=1};
+
+//! Runs task(i) for all i in [0,numTasks) on one thread per hardware thread
+template<class F>
+static void parallelTasks(const int numTasks,const F& task)
+{
+    const int numThreads=min(numTasks,int(max(1u,thread::hardware_concurrency())));
+    if(numThreads<=1){
+        for(int i=0;i<numTasks;i++) task(i);
+        return;
+    }
+    atomic<int> next(0);
+    auto work=[&](){
+        for(int i=next++;i<numTasks;i=next++) task(i);
+    };
+    vector<thread> threads;
+    for(int t=0;t<numThreads;t++) threads.push_back(thread(work));
+    for(size_t t=0;t<threads.size();t++) threads[t].join();
+}
+
+//! Filters the native words of numParticles particles with count words each, the shuffled
+//! bytes are in little endian order
+static void encodeBlock(const char* words,const int numParticles,const int count,const int filter,char* shuffled)
+{
+    const size_t numWords=size_t(numParticles)*count;
+    const uint32_t* values=reinterpret_cast<const uint32_t*>(words);
+    for(size_t w=0;w<numWords;w++){
+        uint32_t value=values[w];
+        if(filter==PSC_DELTA_SHUFFLE && w>=size_t(count)) value-=values[w-count];
+        for(int b=0;b<4;b++) shuffled[b*numWords+w]=char(value>>(8*b));
+    }
+}
+
+//! Inverse of encodeBlock
+static void decodeBlock(const char* shuffled,const int numParticles,const int count,const int filter,char* words)
+{
+    const size_t numWords=size_t(numParticles)*count;
+    const unsigned char* bytes=reinterpret_cast<const unsigned char*>(shuffled);
+    uint32_t* values=reinterpret_cast<uint32_t*>(words);
+    for(size_t w=0;w<numWords;w++){
+        uint32_t value=uint32_t(bytes[w])|uint32_t(bytes[numWords+w])<<8|uint32_t(bytes[2*numWords+w])<<16|uint32_t(bytes[3*numWords+w])<<24;
+        if(filter==PSC_DELTA_SHUFFLE && w>=size_t(count)) value+=values[w-count];
+        values[w]=value;
+    }
+}
+
+static bool compressBlock(const vector<char>& raw,vector<char>& compressed)
+{
+#ifdef PARTIO_USE_ZLIB
+    uLongf size=compressBound(raw.size());
+    compressed.resize(size);
+    // shuffled words compress almost as well with the fastest level, at about three times the speed
+    if(compress2(reinterpret_cast<Bytef*>(compressed.data()),&size,reinterpret_cast<const Bytef*>(raw.data()),raw.size(),Z_BEST_SPEED)!=Z_OK) return false;
+    compressed.resize(size);
+#else
+    compressed=raw;
+#endif
+    return true;
+}
+
+ParticlesDataMutable* readPSC(const char* filename,const bool headersOnly,std::ostream* errorStream,const ParticleLayout layout)
+{
+    ifstream input(filename,ios::in|ios::binary);
+    if(!input){
+        if(errorStream) *errorStream<<"Partio: Unable to open file "<<filename<<endl;
+        return 0;
+    }
+
+    input.seekg(0,ios::end);
+    const uint64_t fileSize=uint64_t(input.tellg());
+    input.seekg(0,ios::beg);
+
+    char magic[4];
+    int version=0,compression=0,numParticles=0,particlesPerBlock=0,numAttributes=0;
+    input.read(magic,4);
+    read<LITEND>(input,version,compression,numParticles,particlesPerBlock,numAttributes);
+    if(!input || memcmp(magic,PSC_MAGIC,4)!=0){
+        if(errorStream) *errorStream<<"Partio: Magic number of '"<<filename<<"' doesn't match psc magic"<<endl;
+        return 0;
+    }
+    if(version!=PSC_VERSION){
+        if(errorStream) *errorStream<<"Partio: Unsupported psc version "<<version<<" in '"<<filename<<"'"<<endl;
+        return 0;
+    }
+    // every attribute takes at least a name length, a type, a count and a filter, and an offset and size per block
+    const int numBlocks=particlesPerBlock>0 ? int((int64_t(numParticles)+particlesPerBlock-1)/particlesPerBlock) : 0;
+    if(numParticles<0 || particlesPerBlock<=0 || numAttributes<0 || uint64_t(numAttributes)*(16+16*uint64_t(numBlocks))>fileSize){
+        if(errorStream) *errorStream<<"Partio: Invalid psc header in '"<<filename<<"'"<<endl;
+        return 0;
+    }
+#ifndef PARTIO_USE_ZLIB
+    if(compression!=0 && !headersOnly){
+        if(errorStream) *errorStream<<"Partio: psc file '"<<filename<<"' is compressed but partio was not compiled with zlib"<<endl;
+        return 0;
+    }
+#endif
+
+    unique_ptr<ParticlesDataMutable,void(*)(ParticlesDataMutable*)> simple(
+        headersOnly ? new ParticleHeaders : create(layout),[](ParticlesDataMutable* p){p->release();});
+
+    vector<ParticleAttribute> attrs(numAttributes);
+    vector<int> filters(numAttributes);
+    for(int i=0;i<numAttributes;i++){
+        string name;
+        int type=0,count=0;
+        if(readString(input,name)) read<LITEND>(input,type,count,filters[i]);
+        if(!input || type<VECTOR || type>INDEXEDSTR || count<=0 || uint64_t(count)*4>fileSize ||
+            (filters[i]!=PSC_SHUFFLE && filters[i]!=PSC_DELTA_SHUFFLE)){
+            if(errorStream) *errorStream<<"Partio: Invalid attribute "<<name<<" in '"<<filename<<"'"<<endl;
+            return 0;
+        }
+        attrs[i]=simple->addAttribute(name.c_str(),ParticleAttributeType(type),count);
+        if(type==INDEXEDSTR){
+            vector<string> strings;
+            if(!readStrings(input,strings)){
+                if(errorStream) *errorStream<<"Partio: Invalid strings of attribute "<<name<<" in '"<<filename<<"'"<<endl;
+                return 0;
+            }
+            if(!headersOnly) for(size_t k=0;k<strings.size();k++) simple->registerIndexedStr(attrs[i],strings[k].c_str());
+        }
+    }
+
+    if(!readFixedAttributes(input,*simple,headersOnly,fileSize,filename,errorStream)) return 0;
+
+    vector<uint64_t> offsets(size_t(numAttributes)*numBlocks),sizes(offsets.size());
+    for(size_t t=0;t<offsets.size();t++) read<LITEND>(input,offsets[t],sizes[t]);
+    if(!input){
+        if(errorStream) *errorStream<<"Partio: Invalid psc header in '"<<filename<<"'"<<endl;
+        return 0;
+    }
+
+    simple->addParticles(numParticles);
+    if(headersOnly || numParticles==0) return simple.release();
+
+    // read all blocks at once, then decode them in parallel straight into the attribute columns
+    const uint64_t dataStart=uint64_t(input.tellg());
+    const uint64_t dataEnd=fileSize;
+    for(size_t t=0;t<offsets.size();t++){
+        if(offsets[t]<dataStart || offsets[t]>dataEnd || sizes[t]>dataEnd-offsets[t]){
+            if(errorStream) *errorStream<<"Partio: Unexpected end of file in '"<<filename<<"'"<<endl;
+            return 0;
+        }
+        // a block holds at most what its data decompresses to
+        const int i=int(t/numBlocks),blockParticles=min(particlesPerBlock,numParticles-int(t%numBlocks)*particlesPerBlock);
+        const uint64_t maxRawSize=compression==0 ? sizes[t] : sizes[t]*MAX_DEFLATE_RATIO;
+        if(uint64_t(TypeSize(attrs[i].type))*attrs[i].count>maxRawSize/uint64_t(blockParticles)){
+            if(errorStream) *errorStream<<"Partio: Invalid block "<<t%numBlocks<<" of attribute "<<attrs[i].name<<" in '"<<filename<<"'"<<endl;
+            return 0;
+        }
+    }
+    vector<char> data(dataEnd-dataStart);
+    input.seekg(dataStart);
+    if(data.size()) input.read(&data[0],data.size());
+    if(!input){
+        if(errorStream) *errorStream<<"Partio: Unexpected end of file in '"<<filename<<"'"<<endl;
+        return 0;
+    }
+
+    vector<char*> bases(numAttributes);
+    vector<ptrdiff_t> strides(numAttributes);
+    for(int i=0;i<numAttributes;i++){
+        bases[i]=simple->dataWrite<char>(attrs[i],0);
+        strides[i]=numParticles>1 ? simple->dataWrite<char>(attrs[i],1)-bases[i] : 0;
+    }
+    atomic<int> failedTask(-1);
+    parallelTasks(numAttributes*numBlocks,[&](const int task){
+        const int i=task/numBlocks,block=task%numBlocks;
+        const int first=block*particlesPerBlock;
+        const int blockParticles=min(particlesPerBlock,numParticles-first);
+        const size_t size=TypeSize(attrs[i].type)*attrs[i].count;
+        const char* compressed=&data[offsets[task]-dataStart];
+        vector<char> shuffled(size*blockParticles);
+        if(compression==0){
+            if(sizes[task]!=shuffled.size()){failedTask=task;return;}
+            memcpy(shuffled.data(),compressed,shuffled.size());
+        }else{
+#ifdef PARTIO_USE_ZLIB
+            uLongf rawSize=shuffled.size();
+            if(uncompress(reinterpret_cast<Bytef*>(shuffled.data()),&rawSize,reinterpret_cast<const Bytef*>(compressed),uLong(sizes[task]))!=Z_OK || rawSize!=shuffled.size()){
+                failedTask=task;
+                return;
+            }
+#endif
+        }
+        char* destination=bases[i]+first*strides[i];
+        if(strides[i]==ptrdiff_t(size)){
+            decodeBlock(shuffled.data(),blockParticles,attrs[i].count,filters[i],destination);
+        }else{
+            vector<char> words(shuffled.size());
+            decodeBlock(shuffled.data(),blockParticles,attrs[i].count,filters[i],words.data());
+            for(int j=0;j<blockParticles;j++) memcpy(destination+j*strides[i],&words[j*size],size);
+        }
+    });
+    if(failedTask>=0){
+        if(errorStream) *errorStream<<"Partio: Failed to decompress block "<<failedTask%numBlocks<<" of attribute "
+                                   <<attrs[failedTask/numBlocks].name<<" in '"<<filename<<"'"<<endl;
+        return 0;
+    }
+    return simple.release();
+}
+
+bool writePSC(const char* filename,const ParticlesData& p,const bool /*compressed*/,std::ostream* errorStream)
+{
+    const int numParticles=p.numParticles();
+    const int particlesPerBlock=PSC_PARTICLES_PER_BLOCK;
+    const int numBlocks=(numParticles+particlesPerBlock-1)/particlesPerBlock;
+    const int numAttributes=p.numAttributes();
+    vector<ParticleAttribute> attrs(numAttributes);
+    vector<const char*> bases(numAttributes);
+    vector<ptrdiff_t> strides(numAttributes);
+    for(int i=0;i<numAttributes;i++){
+        p.attributeInfo(i,attrs[i]);
+        bases[i]=numParticles ? p.data<char>(attrs[i],0) : 0;
+        strides[i]=numParticles>1 ? p.data<char>(attrs[i],1)-bases[i] : 0;
+    }
+
+    // gathers the words of a block of an attribute
+    auto gather=[&](const int i,const int block,vector<char>& words){
+        const int first=block*particlesPerBlock;
+        const int blockParticles=min(particlesPerBlock,numParticles-first);
+        const size_t size=TypeSize(attrs[i].type)*attrs[i].count;
+        words.resize(size*blockParticles);
+        const char* source=bases[i]+first*strides[i];
+        if(strides[i]==ptrdiff_t(size)) memcpy(words.data(),source,words.size());
+        else for(int j=0;j<blockParticles;j++) memcpy(&words[j*size],source+j*strides[i],size);
+        return blockParticles;
+    };
+
+    // the filter of an attribute is the one that compresses its first block better
+    vector<int> filters(numAttributes,PSC_SHUFFLE);
+#ifdef PARTIO_USE_ZLIB
+    parallelTasks(numBlocks ? numAttributes : 0,[&](const int i){
+        vector<char> words,shuffled,compressed;
+        const int blockParticles=gather(i,0,words);
+        shuffled.resize(words.size());
+        size_t best=0;
+        for(int filter=PSC_SHUFFLE;filter<=PSC_DELTA_SHUFFLE;filter++){
+            encodeBlock(words.data(),blockParticles,attrs[i].count,filter,shuffled.data());
+            if(!compressBlock(shuffled,compressed)) return;
+            if(filter==PSC_SHUFFLE || compressed.size()<best){
+                best=compressed.size();
+                filters[i]=filter;
+            }
+        }
+    });
+#endif
+
+    vector<vector<char> > blockData(size_t(numAttributes)*numBlocks);
+    atomic<bool> failed(false);
+    parallelTasks(numAttributes*numBlocks,[&](const int task){
+        const int i=task/numBlocks,block=task%numBlocks;
+        vector<char> words,shuffled;
+        const int blockParticles=gather(i,block,words);
+        shuffled.resize(words.size());
+        encodeBlock(words.data(),blockParticles,attrs[i].count,filters[i],shuffled.data());
+        if(!compressBlock(shuffled,blockData[task])) failed=true;
+    });
+    if(failed){
+        if(errorStream) *errorStream<<"Partio: Failed to compress particles for "<<filename<<endl;
+        return false;
+    }
+
+    ostringstream header;
+    header.write(PSC_MAGIC,4);
+#ifdef PARTIO_USE_ZLIB
+    write<LITEND>(header,PSC_VERSION,int(1));
+#else
+    write<LITEND>(header,PSC_VERSION,int(0));
+#endif
+    write<LITEND>(header,numParticles,particlesPerBlock,numAttributes);
+    for(int i=0;i<numAttributes;i++){
+        writeString(header,attrs[i].name);
+        write<LITEND>(header,int(attrs[i].type),attrs[i].count,filters[i]);
+        if(attrs[i].type==INDEXEDSTR) writeStrings(header,p.indexedStrs(attrs[i]));
+    }
+    writeFixedAttributes(header,p);
+    uint64_t offset=uint64_t(header.tellp())+blockData.size()*2*sizeof(uint64_t);
+    for(size_t t=0;t<blockData.size();t++){
+        const uint64_t size=blockData[t].size();
+        write<LITEND>(header,offset,size);
+        offset+=size;
+    }
+
+    ofstream output(filename,ios::out|ios::binary);
+    if(!output){
+        if(errorStream) *errorStream<<"Partio: Unable to open file "<<filename<<endl;
+        return false;
+    }
+    const string headerData=header.str();
+    output.write(headerData.data(),headerData.size());
+    for(size_t t=0;t<blockData.size();t++) output.write(blockData[t].data(),blockData[t].size());
+    return bool(output);
+}
+
+}
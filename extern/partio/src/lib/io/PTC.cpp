@@ -82,7 +82,7 @@ bool ParseSpec(const string& spec,string& typeName,string& name)
     return true;
 }
 
-ParticlesDataMutable* readPTC(const char* filename,const bool headersOnly,std::ostream* errorStream)
+ParticlesDataMutable* readPTC(const char* filename,const bool headersOnly,std::ostream* errorStream,const ParticleLayout layout)
 {
     unique_ptr<istream> input(Gzip_In(filename,ios::in|ios::binary));
     if(!*input){
@@ -135,7 +135,7 @@ ParticlesDataMutable* readPTC(const char* filename,const bool headersOnly,std::o
     // Allocate a simple particle with the appropriate number of points
     ParticlesDataMutable* simple=0;
     if(headersOnly) simple=new ParticleHeaders;
-    else simple=create();
+    else simple=create(layout);
     simple->addParticles((int)nPoints);
 
     // PTC files always have something for these items, so allocate the data
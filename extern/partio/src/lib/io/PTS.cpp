@@ -54,7 +54,7 @@ using namespace std;
 
 // TODO: convert this to use iterators like the rest of the readers/writers
 
-ParticlesDataMutable* readPTS(const char* filename,const bool headersOnly,std::ostream* errorStream)
+ParticlesDataMutable* readPTS(const char* filename,const bool headersOnly,std::ostream* errorStream,const ParticleLayout layout)
 {
     unique_ptr<istream> input(Gzip_In(filename,ios::in|ios::binary));
     if (!*input)
@@ -65,7 +65,7 @@ ParticlesDataMutable* readPTS(const char* filename,const bool headersOnly,std::o
 
     ParticlesDataMutable* simple=0;
     if (headersOnly) simple=new ParticleHeaders;
-    else simple=create();
+    else simple=create(layout);
 
     // read NPoints and NPointAttrib
     string word;
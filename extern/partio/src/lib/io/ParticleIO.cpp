@@ -42,7 +42,7 @@ namespace Partio{
 using namespace std;
 
 // reader and writer code
-typedef ParticlesDataMutable* (*READER_FUNCTION)(const char*,const bool,std::ostream*);
+typedef ParticlesDataMutable* (*READER_FUNCTION)(const char*,const bool,std::ostream*,const ParticleLayout);
 typedef bool (*WRITER_FUNCTION)(const char*,const ParticlesData&,const bool,std::ostream*);
 
 PartioMutex initializationMutex;
@@ -68,6 +68,8 @@ readers()
         data["prt"]=readPRT;
         data["bin"]=readBIN;
         data["pts"]=readPTS;
+        data["pbk"]=readPBK;
+        data["psc"]=readPSC;
         data["ptf"]=readPTC;
         data["itbl"]=readBGEO;
         data["atbl"]=readBGEO;
@@ -97,6 +99,8 @@ writers()
         data["pdc"]=writePDC;
         data["prt"]=writePRT;
         data["bin"]=writeBIN;
+        data["pbk"]=writePBK;
+        data["psc"]=writePSC;
         data["ptf"]=writePTC;
         data["itbl"]=writeBGEO;
         data["atbl"]=writeBGEO;
@@ -134,6 +138,12 @@ bool extensionIgnoringGz(const string& filename,string& ret,bool &endsWithGz,std
 
 ParticlesDataMutable*
 read(const char* c_filename,bool verbose,std::ostream& errorStream)
+{
+    return read(c_filename,LAYOUT_SIMPLE,verbose,errorStream);
+}
+
+ParticlesDataMutable*
+read(const char* c_filename,const ParticleLayout layout,bool verbose,std::ostream& errorStream)
 {
     string filename(c_filename);
     string extension;
@@ -144,7 +154,7 @@ read(const char* c_filename,bool verbose,std::ostream& errorStream)
         errorStream<<"Partio: No reader defined for extension "<<extension<<endl;
         return 0;
     }
-    return (*i->second)(c_filename,false,verbose ? &errorStream : 0);
+    return (*i->second)(c_filename,false,verbose ? &errorStream : 0,layout);
 }
 
 ParticlesInfo*
@@ -159,22 +169,51 @@ readHeaders(const char* c_filename,bool verbose,std::ostream& errorStream)
         errorStream<<"Partio: No reader defined for extension "<<extension<<endl;
         return 0;
     }
-    return (*i->second)(c_filename,true,verbose ? &errorStream : 0);
+    return (*i->second)(c_filename,true,verbose ? &errorStream : 0,LAYOUT_SIMPLE);
 }
 
-void
-write(const char* c_filename,const ParticlesData& particles,const bool forceCompressed,bool verbose,std::ostream& errorStream)
+//! Writes with the writer registered for the extension, returns false if there is none or it fails
+static bool
+writeWithRegisteredWriter(const char* c_filename,const ParticlesData& particles,const bool forceCompressed,bool verbose,std::ostream& errorStream)
 {
     string filename(c_filename);
     string extension;
     bool endsWithGz;
-    if(!extensionIgnoringGz(filename,extension,endsWithGz,errorStream)) return;
+    if(!extensionIgnoringGz(filename,extension,endsWithGz,errorStream)) return false;
     map<string,WRITER_FUNCTION>::iterator i=writers().find(extension);
     if(i==writers().end()){
         errorStream<<"Partio: No writer defined for extension "<<extension<<endl;
-        return;
+        return false;
     }
-    (*i->second)(c_filename,particles,forceCompressed || endsWithGz,verbose ? &errorStream : 0);
+    return (*i->second)(c_filename,particles,forceCompressed || endsWithGz,verbose ? &errorStream : 0);
+}
+
+void
+write(const char* c_filename,const ParticlesData& particles,const bool forceCompressed,bool verbose,std::ostream& errorStream)
+{
+    writeWithRegisteredWriter(c_filename,particles,forceCompressed,verbose,errorStream);
+}
+
+ParticlesDataMutable*
+readBricked(const char* c_filename,const float bboxMin[3],const float bboxMax[3],const ParticleLayout layout,bool verbose,std::ostream& errorStream)
+{
+    return readPBKBox(c_filename,bboxMin,bboxMax,verbose ? &errorStream : 0,layout);
+}
+
+bool
+writeBricked(const char* c_filename,const ParticlesData& particles,const int particlesPerBrick,bool verbose,std::ostream& errorStream)
+{
+    return writePBKBricks(c_filename,particles,particlesPerBrick,verbose ? &errorStream : 0);
+}
+
+bool
+writeSpatiallySorted(const char* c_filename,const ParticlesData& particles,const bool forceCompressed,const string& identifier,bool verbose,std::ostream& errorStream)
+{
+    ParticlesDataMutable* sorted=sortSpatially(particles,identifier);
+    if(!sorted) return false;
+    const bool written=writeWithRegisteredWriter(c_filename,*sorted,forceCompressed,verbose,errorStream);
+    sorted->release();
+    return written;
 }
 
 } // namespace Partio
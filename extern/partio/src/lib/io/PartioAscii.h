@@ -0,0 +1,242 @@
+/*
+PARTIO SOFTWARE
+Copyright 2010 Disney Enterprises, Inc. All rights reserved
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are
+met:
+
+* Redistributions of source code must retain the above copyright
+notice, this list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright
+notice, this list of conditions and the following disclaimer in
+the documentation and/or other materials provided with the
+distribution.
+
+* The names "Disney", "Walt Disney Pictures", "Walt Disney Animation
+Studios" or the names of its contributors may NOT be used to
+endorse or promote products derived from this software without
+specific prior written permission from Walt Disney Pictures.
+
+Disclaimer: THIS SOFTWARE IS PROVIDED BY WALT DISNEY PICTURES AND
+CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING,
+BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY, FITNESS
+FOR A PARTICULAR PURPOSE, NONINFRINGEMENT AND TITLE ARE DISCLAIMED.
+IN NO EVENT SHALL WALT DISNEY PICTURES, THE COPYRIGHT HOLDER OR
+CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND BASED ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGES.
+*/
+
+#ifndef _partioascii_h_
+#define _partioascii_h_
+
+#include <algorithm>
+#include <cmath>
+#include <cstdlib>
+#include <cstring>
+#include <istream>
+#include <string>
+#include <thread>
+#include <vector>
+#include <stdint.h>
+
+namespace Partio{
+
+//! Reads everything left in input into buffer
+inline void readRemaining(std::istream& input,std::vector<char>& buffer)
+{
+    static const size_t chunkSize=1<<20;
+    buffer.clear();
+    while(input.good()){
+        size_t offset=buffer.size();
+        buffer.resize(offset+chunkSize);
+        input.read(&buffer[offset],chunkSize);
+        buffer.resize(offset+static_cast<size_t>(input.gcount()));
+    }
+}
+
+inline bool isAsciiSpace(const char c)
+{return c==' ' || c=='\t' || c=='\n' || c=='\r' || c=='\v' || c=='\f';}
+
+inline const char* skipAsciiSpace(const char* p,const char* end)
+{
+    while(p<end && isAsciiSpace(*p)) ++p;
+    return p;
+}
+
+//! Consumes the single character c after optional whitespace
+inline bool parseChar(const char*& p,const char* end,const char c)
+{
+    const char* q=skipAsciiSpace(p,end);
+    if(q==end || *q!=c) return false;
+    p=q+1;
+    return true;
+}
+
+//! Locale independent integer parse, returns false if no number was found
+inline bool parseNumber(const char*& p,const char* end,int& value)
+{
+    const char* q=skipAsciiSpace(p,end);
+    bool negative=false;
+    if(q<end && (*q=='-' || *q=='+')) negative=*q++=='-';
+    if(q==end || *q<'0' || *q>'9') return false;
+    int64_t result=0;
+    while(q<end && *q>='0' && *q<='9') result=result*10+(*q++-'0');
+    value=static_cast<int>(negative ? -result : result);
+    p=q;
+    return true;
+}
+
+//! Locale independent float parse, returns false if no number was found
+/*!
+  Keeps up to 19 significant digits in an integer mantissa and applies the
+  decimal exponent in double precision, which is exact enough for float.
+  inf and nan spellings are handed to strtod.
+*/
+inline bool parseNumber(const char*& p,const char* end,float& value)
+{
+    static const double powersOfTen[]={1e0,1e1,1e2,1e3,1e4,1e5,1e6,1e7,1e8,1e9,1e10,
+        1e11,1e12,1e13,1e14,1e15,1e16,1e17,1e18,1e19,1e20,1e21,1e22};
+
+    const char* q=skipAsciiSpace(p,end);
+    const char* start=q;
+    bool negative=false;
+    if(q<end && (*q=='-' || *q=='+')) negative=*q++=='-';
+
+    uint64_t mantissa=0;
+    int exponent=0,significant=0;
+    bool foundDigit=false;
+    for(;q<end && *q>='0' && *q<='9';++q){
+        foundDigit=true;
+        if(significant<19){
+            mantissa=mantissa*10+(*q-'0');
+            if(mantissa) significant++;
+        }else exponent++;
+    }
+    if(q<end && *q=='.'){
+        for(++q;q<end && *q>='0' && *q<='9';++q){
+            foundDigit=true;
+            if(significant<19){
+                mantissa=mantissa*10+(*q-'0');
+                if(mantissa) significant++;
+                exponent--;
+            }
+        }
+    }
+    if(!foundDigit){
+        // inf/nan, bounded copy since the buffer is not null terminated
+        char word[16];
+        size_t length=0;
+        for(const char* r=start;r<end && length<sizeof(word)-1 && !isAsciiSpace(*r) && *r!='(' && *r!=')';++r)
+            word[length++]=*r;
+        word[length]=0;
+        char* wordEnd=0;
+        double result=strtod(word,&wordEnd);
+        if(wordEnd==word) return false;
+        value=static_cast<float>(result);
+        p=start+(wordEnd-word);
+        return true;
+    }
+    if(q<end && (*q=='e' || *q=='E')){
+        const char* e=q+1;
+        bool negativeExponent=false;
+        if(e<end && (*e=='-' || *e=='+')) negativeExponent=*e++=='-';
+        if(e<end && *e>='0' && *e<='9'){
+            int explicitExponent=0;
+            for(;e<end && *e>='0' && *e<='9';++e)
+                if(explicitExponent<100000) explicitExponent=explicitExponent*10+(*e-'0');
+            exponent+=negativeExponent ? -explicitExponent : explicitExponent;
+            q=e;
+        }
+    }
+
+    double result=static_cast<double>(mantissa);
+    if(mantissa==0) result=0;
+    else if(exponent<0 && exponent>=-22) result/=powersOfTen[-exponent];
+    else if(exponent>0 && exponent<=22) result*=powersOfTen[exponent];
+    else if(exponent!=0) result*=std::pow(10.,exponent);
+    value=static_cast<float>(negative ? -result : result);
+    p=q;
+    return true;
+}
+
+//! Returns one past the end of the first lineCount lines of [begin,end) or 0 if there are fewer
+inline const char* findLines(const char* begin,const char* end,const int lineCount)
+{
+    const char* p=begin;
+    for(int i=0;i<lineCount;i++){
+        if(p>=end) return 0;
+        const char* newline=static_cast<const char*>(memchr(p,'\n',end-p));
+        p=newline ? newline+1 : end;
+    }
+    return p;
+}
+
+//! Parses count records that are stored one per line, in parallel where it pays off
+/*!
+  parseRecord(p,end,index) has to consume record index from p without
+  reading past end. The lines are split into contiguous chunks which are
+  parsed on separate threads. If the records do not map one to one to
+  lines, the whole block is parsed serially instead. Returns the number
+  of records that were parsed.
+
+  The environment variable PARTIO_ASCII_THREADS sets the number of chunks
+  regardless of the hardware threads and the text size, e.g. to test the
+  split on a single core.
+*/
+template<class F>
+int parseRecords(const char* begin,const char* end,const int count,F parseRecord)
+{
+    static const size_t minBytesPerThread=1<<20;
+
+    begin=skipAsciiSpace(begin,end);
+    const char* blockEnd=findLines(begin,end,count);
+    const char* forcedThreads=getenv("PARTIO_ASCII_THREADS");
+    int numThreads=forcedThreads ? atoi(forcedThreads) : 0;
+    if(numThreads<1){
+        numThreads=static_cast<int>(std::thread::hardware_concurrency());
+        if(blockEnd) numThreads=std::min<int>(numThreads,static_cast<int>((blockEnd-begin)/minBytesPerThread));
+    }
+    if(blockEnd && numThreads>1 && count>=numThreads){
+        std::vector<const char*> chunkBegins(numThreads+1);
+        std::vector<int> chunkFirst(numThreads+1);
+        chunkBegins[0]=begin;
+        chunkFirst[0]=0;
+        for(int t=1;t<numThreads;t++){
+            chunkFirst[t]=static_cast<int>(static_cast<int64_t>(count)*t/numThreads);
+            chunkBegins[t]=findLines(chunkBegins[t-1],blockEnd,chunkFirst[t]-chunkFirst[t-1]);
+        }
+        chunkBegins[numThreads]=blockEnd;
+        chunkFirst[numThreads]=count;
+
+        std::vector<char> succeeded(numThreads,0);
+        std::vector<std::thread> threads;
+        for(int t=0;t<numThreads;t++){
+            threads.push_back(std::thread([&,t](){
+                const char* p=chunkBegins[t];
+                const char* chunkEnd=chunkBegins[t+1];
+                for(int i=chunkFirst[t];i<chunkFirst[t+1];i++){
+                    if(!parseRecord(p,chunkEnd,i)) return;
+                }
+                succeeded[t]=skipAsciiSpace(p,chunkEnd)==chunkEnd;
+            }));
+        }
+        for(size_t t=0;t<threads.size();t++) threads[t].join();
+        if(std::find(succeeded.begin(),succeeded.end(),0)==succeeded.end()) return count;
+    }
+
+    const char* p=begin;
+    for(int i=0;i<count;i++){
+        if(!parseRecord(p,end,i)) return i;
+    }
+    return count;
+}
+
+}
+#endif
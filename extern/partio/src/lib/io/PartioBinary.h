@@ -0,0 +1,155 @@
+/*
+PARTIO SOFTWARE
+Copyright 2010 Disney Enterprises, Inc. All rights reserved
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are
+met:
+
+* Redistributions of source code must retain the above copyright
+notice, this list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright
+notice, this list of conditions and the following disclaimer in
+the documentation and/or other materials provided with the
+distribution.
+
+* The names "Disney", "Walt Disney Pictures", "Walt Disney Animation
+Studios" or the names of its contributors may NOT be used to
+endorse or promote products derived from this software without
+specific prior written permission from Walt Disney Pictures.
+
+Disclaimer: THIS SOFTWARE IS PROVIDED BY WALT DISNEY PICTURES AND
+CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING,
+BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY, FITNESS
+FOR A PARTICULAR PURPOSE, NONINFRINGEMENT AND TITLE ARE DISCLAIMED.
+IN NO EVENT SHALL WALT DISNEY PICTURES, THE COPYRIGHT HOLDER OR
+CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND BASED ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGES.
+*/
+
+#ifndef _partiobinary_h_
+#define _partiobinary_h_
+
+#include "../Partio.h"
+#include "PartioEndian.h"
+
+#include <cstring>
+#include <iostream>
+#include <string>
+#include <vector>
+#include <stdint.h>
+
+namespace Partio{
+
+// Building blocks of the little endian binary formats with string tables (.pbk, .psc)
+
+//! Upper bound of the deflate compression ratio, limits the raw size compressed data can claim
+static const uint64_t MAX_DEFLATE_RATIO=1032;
+
+//! Writes a string as int length plus characters
+inline void writeString(std::ostream& output,const std::string& s)
+{
+    write<LITEND>(output,int(s.size()));
+    output.write(s.c_str(),s.size());
+}
+
+//! Reads a string written by writeString, at most 1MB long
+inline bool readString(std::istream& input,std::string& s)
+{
+    int length=0;
+    read<LITEND>(input,length);
+    if(!input || length<0 || length>(1<<20)) return false;
+    s.resize(length);
+    if(length) input.read(&s[0],length);
+    return bool(input);
+}
+
+//! Writes a string table as int count plus strings
+inline void writeStrings(std::ostream& output,const std::vector<std::string>& strings)
+{
+    write<LITEND>(output,int(strings.size()));
+    for(size_t i=0;i<strings.size();i++) writeString(output,strings[i]);
+}
+
+//! Reads a string table written by writeStrings
+inline bool readStrings(std::istream& input,std::vector<std::string>& strings)
+{
+    int numStrings=0;
+    read<LITEND>(input,numStrings);
+    if(!input || numStrings<0) return false;
+    // grown while reading, so a corrupt count fails at the end of the file instead of allocating
+    strings.clear();
+    for(int i=0;i<numStrings;i++){
+        std::string s;
+        if(!readString(input,s)) return false;
+        strings.push_back(s);
+    }
+    return true;
+}
+
+//! All attribute types are made of 4 byte words, only big endian machines have to swap them
+inline void swapWords(char* data,const size_t numBytes)
+{
+    for(size_t i=0;i+4<=numBytes;i+=4) LITEND::swap(*reinterpret_cast<uint32_t*>(data+i));
+}
+
+//! Writes int numFixedAttributes and per fixed attribute: string name, int type, int count[, string table], values
+inline void writeFixedAttributes(std::ostream& output,const ParticlesData& p)
+{
+    write<LITEND>(output,p.numFixedAttributes());
+    for(int i=0;i<p.numFixedAttributes();i++){
+        FixedAttribute attr;
+        p.fixedAttributeInfo(i,attr);
+        writeString(output,attr.name);
+        write<LITEND>(output,int(attr.type),attr.count);
+        if(attr.type==INDEXEDSTR) writeStrings(output,p.fixedIndexedStrs(attr));
+        std::vector<char> values(p.fixedData<char>(attr),p.fixedData<char>(attr)+TypeSize(attr.type)*attr.count);
+        swapWords(values.data(),values.size());
+        output.write(values.data(),values.size());
+    }
+}
+
+//! Reads the fixed attributes written by writeFixedAttributes from a file of fileSize bytes,
+//! returns false after reporting to errorStream if they are invalid
+inline bool readFixedAttributes(std::istream& input,ParticlesDataMutable& particles,const bool headersOnly,
+    const uint64_t fileSize,const char* filename,std::ostream* errorStream)
+{
+    int numFixedAttributes=0;
+    read<LITEND>(input,numFixedAttributes);
+    // every fixed attribute takes at least a name length, a type and a count
+    if(!input || numFixedAttributes<0 || uint64_t(numFixedAttributes)*12>fileSize){
+        if(errorStream) *errorStream<<"Partio: Invalid header in '"<<filename<<"'"<<std::endl;
+        return false;
+    }
+    for(int i=0;i<numFixedAttributes;i++){
+        std::string name;
+        int type=0,count=0;
+        if(readString(input,name)) read<LITEND>(input,type,count);
+        if(!input || type<VECTOR || type>INDEXEDSTR || count<=0 || uint64_t(count)*4>fileSize){
+            if(errorStream) *errorStream<<"Partio: Invalid fixed attribute "<<name<<" in '"<<filename<<"'"<<std::endl;
+            return false;
+        }
+        FixedAttribute attr=particles.addFixedAttribute(name.c_str(),ParticleAttributeType(type),count);
+        std::vector<std::string> strings;
+        std::vector<char> values(TypeSize(attr.type)*count);
+        if(type!=INDEXEDSTR || readStrings(input,strings)) input.read(&values[0],values.size());
+        if(!input){
+            if(errorStream) *errorStream<<"Partio: Invalid fixed attribute "<<name<<" in '"<<filename<<"'"<<std::endl;
+            return false;
+        }
+        if(headersOnly) continue;
+        swapWords(&values[0],values.size());
+        for(size_t k=0;k<strings.size();k++) particles.registerFixedIndexedStr(attr,strings[k].c_str());
+        memcpy(particles.fixedDataWrite<char>(attr),&values[0],values.size());
+    }
+    return true;
+}
+
+}
+#endif
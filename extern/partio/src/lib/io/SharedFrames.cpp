@@ -0,0 +1,418 @@
+/*
+PARTIO SOFTWARE
+Copyright 2010 Disney Enterprises, Inc. All rights reserved
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are
+met:
+
+* Redistributions of source code must retain the above copyright
+notice, this list of conditions and the following disclaimer.
+
+* Redistributions in binary form must reproduce the above copyright
+notice, this list of conditions and the following disclaimer in
+the documentation and/or other materials provided with the
+distribution.
+
+* The names "Disney", "Walt Disney Pictures", "Walt Disney Animation
+Studios" or the names of its contributors may NOT be used to
+endorse or promote products derived from this software without
+specific prior written permission from Walt Disney Pictures.
+
+Disclaimer: THIS SOFTWARE IS PROVIDED BY WALT DISNEY PICTURES AND
+CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING,
+BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY, FITNESS
+FOR A PARTICULAR PURPOSE, NONINFRINGEMENT AND TITLE ARE DISCLAIMED.
+IN NO EVENT SHALL WALT DISNEY PICTURES, THE COPYRIGHT HOLDER OR
+CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND BASED ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGES.
+*/
+
+#ifdef PARTIO_WIN32
+#    define NOMINMAX
+#    include <windows.h>
+#else
+#    include <sys/mman.h>
+#    include <sys/stat.h>
+#    include <fcntl.h>
+#    include <unistd.h>
+#endif
+
+#include "../Partio.h"
+#include "../PartioSharedFrames.h"
+
+#include <algorithm>
+#include <atomic>
+#include <chrono>
+#include <cstring>
+#include <string>
+#include <vector>
+
+namespace Partio{
+
+using namespace std;
+
+/*
+  Layout of the shared memory segment, all offsets are multiples of 64 bytes:
+
+    SharedFramesHeader
+    numSlots times: SharedFrameSlot, slotBytes bytes of particle data
+
+  A slot holds the attributes of a frame as contiguous columns. Its
+  sequence number is odd while the writer fills it, a reader accepts a
+  slot only if the sequence number is even and unchanged after it read
+  the slot header (seqlock). Overwritten frames are detected the same way.
+*/
+
+static const char SHARED_FRAMES_MAGIC[4]={'P','S','H','M'};
+static const int SHARED_FRAMES_VERSION=1;
+static const int SHARED_FRAMES_MAX_ATTRIBUTES=32;
+static const size_t SHARED_FRAMES_ALIGNMENT=64;
+
+struct SharedFramesHeader
+{
+    char magic[4];
+    int version;
+    int numSlots;
+    int slotStride;
+    uint64_t slotBytes;
+    std::atomic<uint64_t> published;
+    std::atomic<uint32_t> closed;
+};
+
+struct SharedFrameAttribute
+{
+    char name[64];
+    int type;
+    int count;
+    uint64_t offset;
+};
+
+struct SharedFrameSlot
+{
+    std::atomic<uint64_t> sequence;
+    uint64_t counter;
+    double time;
+    int frame;
+    int numParticles;
+    int numAttributes;
+    SharedFrameAttribute attributes[SHARED_FRAMES_MAX_ATTRIBUTES];
+};
+
+static inline size_t align(const size_t n)
+{return (n+SHARED_FRAMES_ALIGNMENT-1)/SHARED_FRAMES_ALIGNMENT*SHARED_FRAMES_ALIGNMENT;}
+
+static const size_t SHARED_FRAMES_HEADER_BYTES=align(sizeof(SharedFramesHeader));
+static const size_t SHARED_FRAMES_SLOT_HEADER_BYTES=align(sizeof(SharedFrameSlot));
+
+struct SharedFramesSegment
+{
+    char* base;
+    size_t length;
+    std::string name;
+#ifdef PARTIO_WIN32
+    HANDLE mapping;
+#endif
+
+    SharedFramesHeader& header() const
+    {return *(SharedFramesHeader*)base;}
+
+    SharedFrameSlot& slot(const int i) const
+    {return *(SharedFrameSlot*)(base+SHARED_FRAMES_HEADER_BYTES+size_t(i)*header().slotStride);}
+
+    char* slotData(const int i) const
+    {return (char*)&slot(i)+SHARED_FRAMES_SLOT_HEADER_BYTES;}
+};
+
+static std::string segmentName(const char* name)
+{
+#ifdef PARTIO_WIN32
+    return std::string("Local\\partio_")+name;
+#else
+    return std::string("/partio_")+name;
+#endif
+}
+
+static void unmapSegment(SharedFramesSegment* segment)
+{
+#ifdef PARTIO_WIN32
+    UnmapViewOfFile(segment->base);
+    CloseHandle(segment->mapping);
+#else
+    munmap(segment->base,segment->length);
+#endif
+    delete segment;
+}
+
+//#####################################################################
+// Class SharedFrameWriter
+//#####################################################################
+SharedFrameWriter::
+SharedFrameWriter(SharedFramesSegment* segment,std::ostream* errorStream)
+    :segment(segment),errorStream(errorStream)
+{
+}
+
+SharedFrameWriter::
+~SharedFrameWriter()
+{
+    segment->header().closed.store(1,std::memory_order_release);
+#ifndef PARTIO_WIN32
+    shm_unlink(segment->name.c_str());
+#endif
+    unmapSegment(segment);
+}
+
+SharedFrameWriter* SharedFrameWriter::
+create(const char* name,const int numSlots,const size_t slotBytes,std::ostream* errorStream)
+{
+    if(numSlots<2){
+        if(errorStream) *errorStream<<"Partio: shared frames need at least 2 slots"<<endl;
+        return 0;
+    }
+    const size_t slotStride=SHARED_FRAMES_SLOT_HEADER_BYTES+align(slotBytes);
+    const size_t length=SHARED_FRAMES_HEADER_BYTES+numSlots*slotStride;
+    if(slotStride>size_t(0x7fffffff)){
+        if(errorStream) *errorStream<<"Partio: shared frame slots are too large"<<endl;
+        return 0;
+    }
+
+    SharedFramesSegment* segment=new SharedFramesSegment;
+    segment->name=segmentName(name);
+    segment->length=length;
+#ifdef PARTIO_WIN32
+    segment->mapping=CreateFileMappingA(INVALID_HANDLE_VALUE,0,PAGE_READWRITE,DWORD(uint64_t(length)>>32),DWORD(length&0xffffffff),segment->name.c_str());
+    if(!segment->mapping || GetLastError()==ERROR_ALREADY_EXISTS){
+        if(errorStream) *errorStream<<"Partio: failed to create shared memory "<<segment->name<<endl;
+        if(segment->mapping) CloseHandle(segment->mapping);
+        delete segment;
+        return 0;
+    }
+    segment->base=(char*)MapViewOfFile(segment->mapping,FILE_MAP_ALL_ACCESS,0,0,length);
+    if(!segment->base){
+        if(errorStream) *errorStream<<"Partio: failed to map shared memory "<<segment->name<<endl;
+        CloseHandle(segment->mapping);
+        delete segment;
+        return 0;
+    }
+#else
+    // a segment left behind by a crashed writer is replaced
+    shm_unlink(segment->name.c_str());
+    int fd=shm_open(segment->name.c_str(),O_CREAT|O_EXCL|O_RDWR,0644);
+    if(fd<0 || ftruncate(fd,off_t(length))!=0){
+        if(errorStream) *errorStream<<"Partio: failed to create shared memory "<<segment->name<<endl;
+        if(fd>=0){::close(fd);shm_unlink(segment->name.c_str());}
+        delete segment;
+        return 0;
+    }
+    void* address=mmap(0,length,PROT_READ|PROT_WRITE,MAP_SHARED,fd,0);
+    ::close(fd);
+    if(address==MAP_FAILED){
+        if(errorStream) *errorStream<<"Partio: failed to map shared memory "<<segment->name<<endl;
+        shm_unlink(segment->name.c_str());
+        delete segment;
+        return 0;
+    }
+    segment->base=(char*)address;
+#endif
+
+    // the mapping is zero filled, i.e. all slots are empty and not being written
+    SharedFramesHeader& header=segment->header();
+    header.version=SHARED_FRAMES_VERSION;
+    header.numSlots=numSlots;
+    header.slotStride=int(slotStride);
+    header.slotBytes=slotBytes;
+    header.published.store(0,std::memory_order_relaxed);
+    header.closed.store(0,std::memory_order_relaxed);
+    std::atomic_thread_fence(std::memory_order_release);
+    memcpy(header.magic,SHARED_FRAMES_MAGIC,sizeof(SHARED_FRAMES_MAGIC));
+    return new SharedFrameWriter(segment,errorStream);
+}
+
+bool SharedFrameWriter::
+publish(const ParticlesData& particles,const int frame)
+{
+    SharedFramesHeader& header=segment->header();
+    const int numParticles=particles.numParticles();
+
+    // lay out the columns before the slot is touched
+    std::vector<ParticleAttribute> attrs;
+    std::vector<uint64_t> offsets;
+    uint64_t used=0;
+    for(int i=0;i<particles.numAttributes();i++){
+        ParticleAttribute attr;
+        particles.attributeInfo(i,attr);
+        if(attr.type==NONE || attr.type==INDEXEDSTR) continue;
+        if(attrs.size()==size_t(SHARED_FRAMES_MAX_ATTRIBUTES) || attr.name.size()>=sizeof(SharedFrameAttribute().name)){
+            if(errorStream) *errorStream<<"Partio: skipping attribute "<<attr.name<<" for shared frames"<<endl;
+            continue;
+        }
+        attrs.push_back(attr);
+        offsets.push_back(used);
+        used+=align(size_t(numParticles)*attr.count*sizeof(float));
+    }
+    if(used>header.slotBytes){
+        if(errorStream) *errorStream<<"Partio: frame "<<frame<<" needs "<<used<<" bytes, shared frame slots hold "<<header.slotBytes<<endl;
+        return false;
+    }
+
+    const uint64_t counter=header.published.load(std::memory_order_relaxed)+1;
+    const int index=int((counter-1)%header.numSlots);
+    SharedFrameSlot& slot=segment->slot(index);
+    char* data=segment->slotData(index);
+
+    const uint64_t sequence=slot.sequence.load(std::memory_order_relaxed);
+    slot.sequence.store(sequence+1,std::memory_order_relaxed);
+    std::atomic_thread_fence(std::memory_order_release);
+
+    slot.counter=counter;
+    slot.time=std::chrono::duration<double>(std::chrono::system_clock::now().time_since_epoch()).count();
+    slot.frame=frame;
+    slot.numParticles=numParticles;
+    slot.numAttributes=int(attrs.size());
+    for(size_t i=0;i<attrs.size();i++){
+        const ParticleAttribute& attr=attrs[i];
+        SharedFrameAttribute& shared=slot.attributes[i];
+        memset(shared.name,0,sizeof(shared.name));
+        memcpy(shared.name,attr.name.c_str(),attr.name.size());
+        shared.type=attr.type;
+        shared.count=attr.count;
+        shared.offset=offsets[i];
+        if(!numParticles) continue;
+
+        const size_t size=attr.count*sizeof(float);
+        const char* base=particles.data<char>(attr,0);
+        const ptrdiff_t stride=numParticles>1 ? particles.data<char>(attr,1)-base : 0;
+        char* column=data+offsets[i];
+        if(stride==ptrdiff_t(size)) memcpy(column,base,size*numParticles);
+        else for(int j=0;j<numParticles;j++) memcpy(column+j*size,base+j*stride,size);
+    }
+
+    slot.sequence.store(sequence+2,std::memory_order_release);
+    header.published.store(counter,std::memory_order_release);
+    return true;
+}
+
+uint64_t SharedFrameWriter::
+published() const
+{
+    return segment->header().published.load(std::memory_order_acquire);
+}
+
+//#####################################################################
+// Class SharedFrameReader
+//#####################################################################
+SharedFrameReader::
+SharedFrameReader(SharedFramesSegment* segment)
+    :segment(segment)
+{
+}
+
+SharedFrameReader::
+~SharedFrameReader()
+{
+    unmapSegment(segment);
+}
+
+SharedFrameReader* SharedFrameReader::
+open(const char* name,std::ostream* errorStream)
+{
+    SharedFramesSegment* segment=new SharedFramesSegment;
+    segment->name=segmentName(name);
+#ifdef PARTIO_WIN32
+    segment->mapping=OpenFileMappingA(FILE_MAP_READ,FALSE,segment->name.c_str());
+    if(!segment->mapping){delete segment;return 0;}
+    segment->base=(char*)MapViewOfFile(segment->mapping,FILE_MAP_READ,0,0,0);
+    MEMORY_BASIC_INFORMATION info;
+    if(!segment->base || !VirtualQuery(segment->base,&info,sizeof(info))){
+        if(segment->base) UnmapViewOfFile(segment->base);
+        CloseHandle(segment->mapping);
+        delete segment;
+        return 0;
+    }
+    segment->length=info.RegionSize;
+#else
+    int fd=shm_open(segment->name.c_str(),O_RDONLY,0);
+    if(fd<0){delete segment;return 0;}
+    struct stat info;
+    if(fstat(fd,&info)!=0 || size_t(info.st_size)<SHARED_FRAMES_HEADER_BYTES){::close(fd);delete segment;return 0;}
+    segment->length=size_t(info.st_size);
+    void* address=mmap(0,segment->length,PROT_READ,MAP_SHARED,fd,0);
+    ::close(fd);
+    if(address==MAP_FAILED){delete segment;return 0;}
+    segment->base=(char*)address;
+#endif
+
+    const SharedFramesHeader& header=segment->header();
+    if(memcmp(header.magic,SHARED_FRAMES_MAGIC,sizeof(SHARED_FRAMES_MAGIC))!=0){
+        // the writer has not initialized the segment yet
+        unmapSegment(segment);
+        return 0;
+    }
+    std::atomic_thread_fence(std::memory_order_acquire);
+    if(header.version!=SHARED_FRAMES_VERSION
+        || SHARED_FRAMES_HEADER_BYTES+size_t(header.numSlots)*header.slotStride>segment->length){
+        if(errorStream) *errorStream<<"Partio: incompatible shared memory "<<segment->name<<endl;
+        unmapSegment(segment);
+        return 0;
+    }
+    return new SharedFrameReader(segment);
+}
+
+bool SharedFrameReader::
+acquire(SharedFrame& frame) const
+{
+    const SharedFramesHeader& header=segment->header();
+    for(int attempt=0;attempt<16;attempt++){
+        const uint64_t published=header.published.load(std::memory_order_acquire);
+        if(!published) return false;
+        const int index=int((published-1)%header.numSlots);
+        const SharedFrameSlot& slot=segment->slot(index);
+        const uint64_t sequence=slot.sequence.load(std::memory_order_acquire);
+        if(sequence&1) continue;
+
+        frame.counter=slot.counter;
+        frame.frame=slot.frame;
+        frame.time=slot.time;
+        frame.numParticles=slot.numParticles;
+        const int numAttributes=std::min(std::max(slot.numAttributes,0),SHARED_FRAMES_MAX_ATTRIBUTES);
+        frame.attributes.resize(numAttributes);
+        const char* data=segment->slotData(index);
+        bool complete=frame.numParticles>=0;
+        for(int i=0;i<numAttributes;i++){
+            const SharedFrameAttribute& shared=slot.attributes[i];
+            SharedAttribute& attr=frame.attributes[i];
+            if(shared.count<0 || shared.offset+uint64_t(frame.numParticles)*shared.count*sizeof(float)>header.slotBytes) complete=false;
+            attr.name=std::string(shared.name,strnlen(shared.name,sizeof(shared.name)));
+            attr.type=ParticleAttributeType(shared.type);
+            attr.count=shared.count;
+            attr.data=data+shared.offset;
+        }
+        frame.slot=index;
+        frame.sequence=sequence;
+
+        std::atomic_thread_fence(std::memory_order_acquire);
+        if(slot.sequence.load(std::memory_order_relaxed)==sequence) return complete;
+    }
+    return false;
+}
+
+bool SharedFrameReader::
+valid(const SharedFrame& frame) const
+{
+    std::atomic_thread_fence(std::memory_order_acquire);
+    return segment->slot(frame.slot).sequence.load(std::memory_order_relaxed)==frame.sequence;
+}
+
+bool SharedFrameReader::
+closed() const
+{
+    return segment->header().closed.load(std::memory_order_acquire)!=0;
+}
+
+} // namespace Partio
@@ -36,18 +36,21 @@ OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGES.
 #define _READERS_h_
 
 namespace Partio{
-ParticlesDataMutable* readBGEO(	const char* filename,const bool headersOnly,std::ostream* errorStream);
-ParticlesDataMutable* readGEO(	const char* filename,const bool headersOnly,std::ostream* errorStream);
-ParticlesDataMutable* readPDB(	const char* filename,const bool headersOnly,std::ostream* errorStream);
-ParticlesDataMutable* readPDB32(const char* filename,const bool headersOnly,std::ostream* errorStream);
-ParticlesDataMutable* readPDB64(const char* filename,const bool headersOnly,std::ostream* errorStream);
-ParticlesDataMutable* readPDA(	const char* filename,const bool headersOnly,std::ostream* errorStream);
-ParticlesDataMutable* readMC(	const char* filename,const bool headersOnly,std::ostream* errorStream);
-ParticlesDataMutable* readPTC(	const char* filename,const bool headersOnly,std::ostream* errorStream);
-ParticlesDataMutable* readPDC(	const char* filename,const bool headersOnly,std::ostream* errorStream);
-ParticlesDataMutable* readPRT(	const char* filename,const bool headersOnly,std::ostream* errorStream);
-ParticlesDataMutable* readBIN(	const char* filename,const bool headersOnly,std::ostream* errorStream);
-ParticlesDataMutable* readPTS(  const char* filename,const bool headersOnly,std::ostream* errorStream);
+ParticlesDataMutable* readBGEO(	const char* filename,const bool headersOnly,std::ostream* errorStream,const ParticleLayout layout);
+ParticlesDataMutable* readGEO(	const char* filename,const bool headersOnly,std::ostream* errorStream,const ParticleLayout layout);
+ParticlesDataMutable* readPDB(	const char* filename,const bool headersOnly,std::ostream* errorStream,const ParticleLayout layout);
+ParticlesDataMutable* readPDB32(const char* filename,const bool headersOnly,std::ostream* errorStream,const ParticleLayout layout);
+ParticlesDataMutable* readPDB64(const char* filename,const bool headersOnly,std::ostream* errorStream,const ParticleLayout layout);
+ParticlesDataMutable* readPDA(	const char* filename,const bool headersOnly,std::ostream* errorStream,const ParticleLayout layout);
+ParticlesDataMutable* readMC(	const char* filename,const bool headersOnly,std::ostream* errorStream,const ParticleLayout layout);
+ParticlesDataMutable* readPTC(	const char* filename,const bool headersOnly,std::ostream* errorStream,const ParticleLayout layout);
+ParticlesDataMutable* readPDC(	const char* filename,const bool headersOnly,std::ostream* errorStream,const ParticleLayout layout);
+ParticlesDataMutable* readPRT(	const char* filename,const bool headersOnly,std::ostream* errorStream,const ParticleLayout layout);
+ParticlesDataMutable* readBIN(	const char* filename,const bool headersOnly,std::ostream* errorStream,const ParticleLayout layout);
+ParticlesDataMutable* readPTS(  const char* filename,const bool headersOnly,std::ostream* errorStream,const ParticleLayout layout);
+ParticlesDataMutable* readPBK(	const char* filename,const bool headersOnly,std::ostream* errorStream,const ParticleLayout layout);
+ParticlesDataMutable* readPSC(	const char* filename,const bool headersOnly,std::ostream* errorStream,const ParticleLayout layout);
+ParticlesDataMutable* readPBKBox(const char* filename,const float bboxMin[3],const float bboxMax[3],std::ostream* errorStream,const ParticleLayout layout);
 
 bool writeBGEO(const char* filename,const ParticlesData& p,const bool compressed,std::ostream* errorStream);
 bool writeGEO(const char* filename,const ParticlesData& p,const bool compressed,std::ostream* errorStream);
@@ -60,6 +63,9 @@ bool writeRIB(const char* filename,const ParticlesData& p,const bool compressed,
 bool writePDC(const char* filename,const ParticlesData& p,const bool compressed,std::ostream* errorStream);
 bool writePRT(const char* filename,const ParticlesData& p,const bool compressed,std::ostream* errorStream);
 bool writeBIN(const char* filename,const ParticlesData& p,const bool compressed,std::ostream* errorStream);
+bool writePBK(const char* filename,const ParticlesData& p,const bool compressed,std::ostream* errorStream);
+bool writePSC(const char* filename,const ParticlesData& p,const bool compressed,std::ostream* errorStream);
+bool writePBKBricks(const char* filename,const ParticlesData& p,const int particlesPerBrick,std::ostream* errorStream);
 }
 
 #endif
@@ -3,6 +3,7 @@ import platform
 
 defs = []
 cxx_args = []
+libs = []
 
 defs.append(('PARTIO_USE_ZLIB', None))
 						 
@@ -11,11 +12,13 @@ if platform.system() == 'Windows':
 	defs.append(('_USE_MATH_DEFINES', None))
 elif platform.system() == 'Linux':
 	cxx_args = ["-fPIC", "-w"]
+	libs = ["rt"]
 
 module1 = Extension('_partio',
 					include_dirs = ['../extern/partio/src/lib', '../extern/zlib/src'],
 					define_macros = defs,
 					extra_compile_args = cxx_args,
+					libraries = libs,
 					sources = [
 					'../extern/partio/src/lib/core/Particle.cpp',
 					'../extern/partio/src/lib/core/ParticleCaching.cpp',
@@ -26,14 +29,18 @@ module1 = Extension('_partio',
 					'../extern/partio/src/lib/io/BIN.cpp',
 					'../extern/partio/src/lib/io/GEO.cpp',
 					'../extern/partio/src/lib/io/MC.cpp',
+					'../extern/partio/src/lib/io/MappedFile.cpp',
 					'../extern/partio/src/lib/io/ParticleIO.cpp',
+					'../extern/partio/src/lib/io/PBK.cpp',
 					'../extern/partio/src/lib/io/PDA.cpp',
 					'../extern/partio/src/lib/io/PDB.cpp',
 					'../extern/partio/src/lib/io/PDC.cpp',
 					'../extern/partio/src/lib/io/PRT.cpp',
+					'../extern/partio/src/lib/io/PSC.cpp',
 					'../extern/partio/src/lib/io/PTC.cpp',
 					'../extern/partio/src/lib/io/PTS.cpp',
 					'../extern/partio/src/lib/io/RIB.cpp',
+					'../extern/partio/src/lib/io/SharedFrames.cpp',
 					'../extern/partio/src/lib/io/ZIP.cpp',
 					'../extern/zlib/src/adler32.c',
 					'../extern/zlib/src/compress.c',
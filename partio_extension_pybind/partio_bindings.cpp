@@ -2,47 +2,405 @@
 // Created by stefan on 14.03.21.
 //
 #include <pybind11/pybind11.h>
+#include <pybind11/numpy.h>
+#include <pybind11/stl.h>
 #include <Partio.h>
 #include <PartioAttribute.h>
+#include <PartioSharedFrames.h>
+#include <array>
+#include <memory>
+#include <mutex>
+#include <unordered_map>
 #include <utility>
 
-// Simple custom holder that works like unique_ptr
+namespace py = pybind11;
+
+// Owns one particle set that was handed to Python. Python gives it up by release() or, at the
+// latest, when the last Python reference goes away. NumPy views share the set, it is released
+// when the owner and all views are gone.
+class ParticlesOwnership
+{
+public:
+    explicit ParticlesOwnership(Partio::ParticlesInfo *p);
+    ~ParticlesOwnership() { release(); }
+    void release();
+    bool released() const { return !particles; }
+    // share of the particle set for a view, empty after release()
+    std::shared_ptr<Partio::ParticlesInfo> share() const { return particles; }
+
+    // all particle sets that are owned by Python or views and not released yet, with their
+    // owner or null if only views are left
+    static std::unordered_map<const Partio::ParticlesInfo *, ParticlesOwnership *> &live();
+    static std::mutex &liveMutex();
+
+private:
+    std::shared_ptr<Partio::ParticlesInfo> particles;
+};
+
+std::unordered_map<const Partio::ParticlesInfo *, ParticlesOwnership *> &ParticlesOwnership::live()
+{
+    static std::unordered_map<const Partio::ParticlesInfo *, ParticlesOwnership *> data;
+    return data;
+}
+
+std::mutex &ParticlesOwnership::liveMutex()
+{
+    static std::mutex mutex;
+    return mutex;
+}
+
+ParticlesOwnership::ParticlesOwnership(Partio::ParticlesInfo *p)
+{
+    std::lock_guard<std::mutex> lock(liveMutex());
+    // a set that is already owned keeps its owner, this one does not release it
+    if (p && live().insert(std::make_pair(p, this)).second)
+        particles.reset(p, [](Partio::ParticlesInfo *p)
+                        {
+                            {
+                                std::lock_guard<std::mutex> lock(liveMutex());
+                                live().erase(p);
+                            }
+                            p->release(); });
+}
+
+void ParticlesOwnership::release()
+{
+    std::shared_ptr<Partio::ParticlesInfo> p;
+    {
+        std::lock_guard<std::mutex> lock(liveMutex());
+        p.swap(particles);
+        if (p)
+            live()[p.get()] = 0;
+    }
+    // the set is released here unless views still share it
+}
+
+// Empty particle set that released Python objects point to instead of the freed set
+Partio::ParticlesDataMutable *releasedParticles()
+{
+    static Partio::ParticlesDataMutable *released = Partio::create();
+    return released;
+}
+
+// Releases a particle set early. The Python object is detached from the set, so further calls
+// raise ValueError, a second release() does nothing and a new set at the same address gets a new
+// Python object.
+void releaseParticles(py::object self)
+{
+    auto *inst = reinterpret_cast<py::detail::instance *>(self.ptr());
+    // the particle classes inherit singly, so a set has the same address as any of its bases
+    void *released = static_cast<Partio::ParticlesInfo *>(releasedParticles());
+    const Partio::ParticlesInfo *p = 0;
+    for (auto v_h : py::detail::values_and_holders(inst))
+    {
+        if (!v_h.value_ptr() || v_h.value_ptr() == released)
+            continue;
+        if (!p)
+            p = static_cast<const Partio::ParticlesInfo *>(v_h.value_ptr());
+        if (v_h.instance_registered())
+        {
+            py::detail::deregister_instance(inst, v_h.value_ptr(), v_h.type);
+            v_h.set_instance_registered(false);
+        }
+        v_h.value_ptr() = released;
+    }
+    ParticlesOwnership *owner = 0;
+    {
+        std::lock_guard<std::mutex> lock(ParticlesOwnership::liveMutex());
+        auto it = ParticlesOwnership::live().find(p);
+        if (it != ParticlesOwnership::live().end())
+            owner = it->second;
+    }
+    if (owner)
+        owner->release();
+}
+
+// Holder of the particle classes, copies share the ownership of the particle set
 template <typename T>
-class custom_ptr
+class particles_ptr
 {
+    std::shared_ptr<ParticlesOwnership> owner;
     T *impl;
 
 public:
-    custom_ptr(T *p) { impl = p; }
-    T *get() const { return impl; }
-    // T* release_ptr() { }
+    particles_ptr(T *p) : owner(std::make_shared<ParticlesOwnership>(p)), impl(p) {}
+    T *get() const { return owner->released() ? 0 : impl; }
 };
 
-PYBIND11_DECLARE_HOLDER_TYPE(T, custom_ptr<T>, true);
+PYBIND11_DECLARE_HOLDER_TYPE(T, particles_ptr<T>, true);
 
-namespace py = pybind11;
+// Casts the particle classes like pybind11 does, but raises ValueError for a released set
+template <typename T>
+class particles_caster : public py::detail::type_caster_base<T>
+{
+    void check() const
+    {
+        if (this->value && static_cast<T *>(this->value) == static_cast<T *>(releasedParticles()))
+            throw py::value_error("particle set has been released");
+    }
+
+public:
+    operator T *()
+    {
+        check();
+        return static_cast<T *>(this->value);
+    }
+    operator T &()
+    {
+        check();
+        return py::detail::type_caster_base<T>::operator T &();
+    }
+};
+
+namespace pybind11
+{
+    namespace detail
+    {
+        template <>
+        class type_caster<Partio::ParticlesInfo> : public particles_caster<Partio::ParticlesInfo>
+        {
+        };
+        template <>
+        class type_caster<Partio::ParticlesData> : public particles_caster<Partio::ParticlesData>
+        {
+        };
+        template <>
+        class type_caster<Partio::ParticlesDataMutable> : public particles_caster<Partio::ParticlesDataMutable>
+        {
+        };
+    }
+}
+
+// Capsule with a share of a particle set, as base of a view it keeps the set alive
+py::capsule particlesShare(const Partio::ParticlesInfo &obj)
+{
+    auto *share = new std::shared_ptr<Partio::ParticlesInfo>();
+    {
+        std::lock_guard<std::mutex> lock(ParticlesOwnership::liveMutex());
+        auto it = ParticlesOwnership::live().find(&obj);
+        if (it != ParticlesOwnership::live().end() && it->second)
+            *share = it->second->share();
+    }
+    return py::capsule(share, [](void *share)
+                       { delete static_cast<std::shared_ptr<Partio::ParticlesInfo> *>(share); });
+}
+
+// Copies an attribute into the leading rows/columns of a caller owned array, converting to T
+template <typename S, typename T>
+void copyColumns(const unsigned char *base, const pybind11::ssize_t stride, const int nparticles, const int count, py::detail::unchecked_mutable_reference<T, 2> &out)
+{
+    for (int i = 0; i < nparticles; i++)
+    {
+        const S *data = reinterpret_cast<const S *>(base + i * stride);
+        for (int k = 0; k < count; k++)
+            out(i, k) = static_cast<T>(data[k]);
+    }
+}
+
+template <typename T>
+void copyAttribute(const Partio::ParticlesData &obj, const Partio::ParticleAttribute &attr, py::array_t<T> &into)
+{
+    auto out = into.template mutable_unchecked<2>();
+    const int nparticles = obj.numParticles();
+    if (nparticles == 0)
+        return;
+    // all layouts store an attribute with a constant stride, so only two lookups are needed
+    const unsigned char *base_ptr = obj.data<unsigned char>(attr, 0);
+    const pybind11::ssize_t stride = nparticles > 1 ? obj.data<unsigned char>(attr, 1) - base_ptr : 0;
+    py::gil_scoped_release release;
+    if (attr.type == Partio::ParticleAttributeType::INT || attr.type == Partio::ParticleAttributeType::INDEXEDSTR)
+        copyColumns<int>(base_ptr, stride, nparticles, attr.count, out);
+    else
+        copyColumns<float>(base_ptr, stride, nparticles, attr.count, out);
+}
+
+// NumPy view of an attribute, the owner is the array's base so the particle set lives as long as the view
+py::array attributeArray(py::handle owner, const unsigned char *base_ptr, const unsigned char *next_ptr, const int nparticles, const Partio::ParticleAttribute &attr, const bool writeable)
+{
+    const pybind11::ssize_t stride = next_ptr ? next_ptr - base_ptr : 0;
+    py::array result;
+    switch (attr.type)
+    {
+    case Partio::ParticleAttributeType::VECTOR:
+        result = py::array_t<float>({(pybind11::ssize_t)nparticles, (pybind11::ssize_t)3}, {stride, (pybind11::ssize_t)sizeof(float)}, reinterpret_cast<const float *>(base_ptr), owner);
+        break;
+    case Partio::ParticleAttributeType::FLOAT:
+        result = py::array_t<float>({(pybind11::ssize_t)nparticles, (pybind11::ssize_t)1}, {stride, (pybind11::ssize_t)sizeof(float)}, reinterpret_cast<const float *>(base_ptr), owner);
+        break;
+    case Partio::ParticleAttributeType::INT:
+        result = py::array_t<int>({(pybind11::ssize_t)nparticles, (pybind11::ssize_t)1}, {stride, (pybind11::ssize_t)sizeof(int)}, reinterpret_cast<const int *>(base_ptr), owner);
+        break;
+    default:
+        return py::array();
+    }
+    if (!writeable)
+        py::detail::array_proxy(result.ptr())->flags &= ~py::detail::npy_api::NPY_ARRAY_WRITEABLE_;
+    return result;
+}
+
+// Frame acquired from shared memory, it keeps the mapping alive as long as Python refers to it
+struct SharedFrameView
+{
+    std::shared_ptr<Partio::SharedFrameReader> reader;
+    Partio::SharedFrame frame;
+
+    const Partio::SharedAttribute &attribute(const Partio::ParticleAttribute &attr) const
+    {
+        const int i = attr.attributeIndex;
+        if (i >= 0 && i < (int)frame.attributes.size() && frame.attributes[i].name == attr.name)
+            return frame.attributes[i];
+        for (const Partio::SharedAttribute &shared : frame.attributes)
+            if (shared.name == attr.name)
+                return shared;
+        throw py::key_error("no attribute " + attr.name + " in shared frame");
+    }
+
+    Partio::ParticleAttribute attributeInfo(const int i) const
+    {
+        if (i < 0 || i >= (int)frame.attributes.size())
+            throw py::index_error("attribute index out of range");
+        Partio::ParticleAttribute attr;
+        attr.name = frame.attributes[i].name;
+        attr.type = frame.attributes[i].type;
+        attr.count = frame.attributes[i].count;
+        attr.attributeIndex = i;
+        return attr;
+    }
+};
+
+template <typename T>
+void copySharedAttribute(const SharedFrameView &view, const Partio::SharedAttribute &shared, py::array_t<T> &into)
+{
+    auto out = into.template mutable_unchecked<2>();
+    const int nparticles = view.frame.numParticles;
+    const pybind11::ssize_t stride = shared.count * sizeof(float);
+    const unsigned char *base_ptr = reinterpret_cast<const unsigned char *>(shared.data);
+    py::gil_scoped_release release;
+    if (shared.type == Partio::ParticleAttributeType::INT)
+        copyColumns<int>(base_ptr, stride, nparticles, shared.count, out);
+    else
+        copyColumns<float>(base_ptr, stride, nparticles, shared.count, out);
+}
 
 PYBIND11_MODULE(partio_pybind, m)
 {
+    // registered first, it is used as a default argument below
+    py::enum_<Partio::ParticleLayout>(m, "ParticleLayout")
+        .value("SIMPLE", Partio::LAYOUT_SIMPLE)
+        .value("INTERLEAVE", Partio::LAYOUT_INTERLEAVE)
+        .value("ALIGNED", Partio::LAYOUT_ALIGNED);
+
+    // file access releases the GIL so that several files can be read from worker threads
     m.def(
-        "read", [](const char *filename, const bool verbose)
-        { return Partio::read(filename, verbose); },
-        py::arg("filename"), py::arg("verbose") = true);
+        "read", [](const char *filename, const bool verbose, const Partio::ParticleLayout layout)
+        { return Partio::read(filename, layout, verbose); },
+        py::arg("filename"), py::arg("verbose") = true, py::arg("layout") = Partio::LAYOUT_SIMPLE,
+        py::call_guard<py::gil_scoped_release>());
     m.def(
         "readHeaders", [](const char *filename, const bool verbose)
         { return Partio::readHeaders(filename, verbose); },
-        py::arg("filename"), py::arg("verbose") = true);
+        py::arg("filename"), py::arg("verbose") = true,
+        py::call_guard<py::gil_scoped_release>());
+    m.def(
+        "readBricked", [](const char *filename, const std::array<float, 3> &bboxMin, const std::array<float, 3> &bboxMax, const bool verbose, const Partio::ParticleLayout layout)
+        { return Partio::readBricked(filename, bboxMin.data(), bboxMax.data(), layout, verbose); },
+        py::arg("filename"), py::arg("bboxMin"), py::arg("bboxMax"), py::arg("verbose") = true, py::arg("layout") = Partio::LAYOUT_SIMPLE,
+        py::call_guard<py::gil_scoped_release>());
     m.def(
         "write", [](const char *filename, const Partio::ParticlesData &obj, const bool forceCompressed, const bool verbose)
         { Partio::write(filename, obj, forceCompressed, verbose); },
         py::arg("filename"), py::arg("particlesData"), py::arg("forceCompressed") = false, py::arg("verbose") = true);
-    m.def("create", &Partio::create);
+    m.def(
+        "writeBricked", [](const char *filename, const Partio::ParticlesData &obj, const int particlesPerBrick, const bool verbose)
+        { return Partio::writeBricked(filename, obj, particlesPerBrick, verbose); },
+        py::arg("filename"), py::arg("particlesData"), py::arg("particlesPerBrick") = 16384, py::arg("verbose") = true,
+        py::call_guard<py::gil_scoped_release>());
+    m.def(
+        "writeSpatiallySorted", [](const char *filename, const Partio::ParticlesData &obj, const bool forceCompressed, const std::string &identifier, const bool verbose)
+        { return Partio::writeSpatiallySorted(filename, obj, forceCompressed, identifier, verbose); },
+        py::arg("filename"), py::arg("particlesData"), py::arg("forceCompressed") = false, py::arg("identifier") = "id", py::arg("verbose") = true,
+        py::call_guard<py::gil_scoped_release>());
+    m.def(
+        "create", [](const Partio::ParticleLayout layout)
+        { return Partio::create(layout); },
+        py::arg("layout") = Partio::LAYOUT_SIMPLE);
     m.def("createInterleave", &Partio::createInterleave);
+    m.def("createAligned", &Partio::createAligned);
     m.def("cloneSchema", &Partio::cloneSchema);
     m.def("clone", &Partio::clone);
+    m.def(
+        "computeConnectedComponents", [](const Partio::ParticlesData &obj, const float radius, const int numThreads)
+        {
+            py::array_t<int> clusterIds(obj.numParticles());
+            int *out = clusterIds.mutable_data();
+            int numClusters;
+            {
+                py::gil_scoped_release release;
+                numClusters = Partio::computeConnectedComponents(obj, radius, out, numThreads);
+            }
+            if (numClusters < 0)
+                throw py::value_error("particles need a position attribute of type VECTOR with 3 components");
+            return clusterIds; },
+        py::arg("particlesData"), py::arg("radius"), py::arg("numThreads") = 0);
+    m.def(
+        "interpolatePositions", [](const Partio::ParticlesData &frame0, const Partio::ParticlesData *frame1, const float t, const float dt, py::array into, const std::string &identifier)
+        {
+            // written in place, so no conversion to a temporary copy is allowed
+            if (!into.dtype().is(py::dtype::of<float>()) || into.ndim() != 2 || into.shape(0) < frame0.numParticles() || into.shape(1) != 3 ||
+                !(into.flags() & py::array::c_style))
+                throw py::value_error("into must be a contiguous float32 array with at least numParticles() rows and 3 columns");
+            if (!into.writeable())
+                throw py::value_error("into must be writeable");
+            float *out = static_cast<float *>(into.mutable_data());
+            bool valid;
+            {
+                py::gil_scoped_release release;
+                valid = Partio::interpolatePositions(frame0, frame1, t, dt, out, identifier);
+            }
+            if (!valid)
+                throw py::value_error("particles need a position attribute of type VECTOR with 3 components");
+            return into; },
+        py::arg("frame0"), py::arg("frame1").none(true), py::arg("t"), py::arg("dt"), py::arg("into"), py::arg("identifier") = "id");
+    m.def(
+        "sortSpatially", [](const Partio::ParticlesData &obj, const std::string &identifier, const int numThreads)
+        {
+            Partio::ParticlesDataMutable *sorted;
+            {
+                py::gil_scoped_release release;
+                sorted = Partio::sortSpatially(obj, identifier, numThreads);
+            }
+            if (!sorted)
+                throw py::value_error("particles need a position attribute of type VECTOR with 3 components");
+            return sorted; },
+        py::arg("particlesData"), py::arg("identifier") = "id", py::arg("numThreads") = 0);
+
+    m.def(
+        "liveObjects", []()
+        {
+            std::lock_guard<std::mutex> lock(ParticlesOwnership::liveMutex());
+            return ParticlesOwnership::live().size(); },
+        "Number of particle sets that are held by Python or views of them and not released yet");
+    m.def(
+        "memoryUsage", []()
+        {
+            std::lock_guard<std::mutex> lock(ParticlesOwnership::liveMutex());
+            size_t bytes = 0;
+            for (const auto &owned : ParticlesOwnership::live())
+                bytes += Partio::memoryUsage(*owned.first);
+            return bytes; },
+        "Bytes of particle data held by all live particle sets, including released sets with views left");
 
-    py::class_<Partio::ParticlesInfo, custom_ptr<Partio::ParticlesInfo>>(m, "ParticlesInfo")
-        .def("release", &Partio::ParticlesInfo::release)
+    py::class_<Partio::ParticlesInfo, particles_ptr<Partio::ParticlesInfo>>(m, "ParticlesInfo")
+        .def("release", &releaseParticles)
+        .def(
+            "__enter__", [](py::object self)
+            { return self; })
+        .def(
+            "__exit__", [](py::object self, py::args)
+            { releaseParticles(self); })
+        .def(
+            "memoryUsage", [](const Partio::ParticlesInfo &obj)
+            { return Partio::memoryUsage(obj); })
         .def("numParticles", &Partio::ParticlesInfo::numParticles)
         .def("numAttributes", &Partio::ParticlesInfo::numAttributes)
         .def("numFixedAttributes", &Partio::ParticlesInfo::numFixedAttributes)
@@ -76,46 +434,65 @@ PYBIND11_MODULE(partio_pybind, m)
                 return attr; },
             py::return_value_policy::copy);
 
-    py::class_<Partio::ParticlesData, Partio::ParticlesInfo, custom_ptr<Partio::ParticlesData>>(m, "ParticlesData")
-        .def("data_buffer", [](Partio::ParticlesData &obj, Partio::ParticleAttribute &attr) -> py::memoryview
-             {
-                const pybind11::ssize_t nparticles = obj.numParticles();
-                const unsigned char* base_ptr = obj.data<unsigned char>(attr, 0);
-                const pybind11::ssize_t stride = obj.data<unsigned char>(attr, 1) - base_ptr;
-                Partio::ParticleAttributeType t = attr.type;
-                switch(t){
-                    case Partio::ParticleAttributeType::VECTOR:
-                        return py::memoryview::from_buffer<float>(reinterpret_cast<const float*>(base_ptr), {nparticles, (pybind11::ssize_t)3}, {stride, (pybind11::ssize_t)sizeof(float)});
-                    case Partio::ParticleAttributeType::FLOAT:
-                        return py::memoryview::from_buffer<float>(reinterpret_cast<const float*>(base_ptr), {nparticles, (pybind11::ssize_t)1}, {stride, (pybind11::ssize_t)sizeof(float)});
-                    case Partio::ParticleAttributeType::INT:
-                        return py::memoryview::from_buffer<int>(reinterpret_cast<const int*>(base_ptr), {nparticles, (pybind11::ssize_t)1}, {stride, (pybind11::ssize_t)sizeof(int)});
-                    default: break;
+    py::class_<Partio::ParticlesData, Partio::ParticlesInfo, particles_ptr<Partio::ParticlesData>>(m, "ParticlesData")
+        .def(
+            "data_buffer", [](const Partio::ParticlesData &obj, const Partio::ParticleAttribute &attr)
+            { return attributeArray(particlesShare(obj), obj.data<unsigned char>(attr, 0), obj.numParticles() > 1 ? obj.data<unsigned char>(attr, 1) : 0, obj.numParticles(), attr, false); },
+            py::arg("attr"), "Read-only view of an attribute, the particle set is kept until the view is gone, even after release()")
+        .def(
+            "data_copy", [](const Partio::ParticlesData &obj, const Partio::ParticleAttribute &attr, py::array into) -> py::array
+            {
+                if (into.ndim() != 2 || into.shape(0) < obj.numParticles() || into.shape(1) < attr.count)
+                    throw py::value_error("into must be a 2d array with at least numParticles() rows and attribute count columns");
+                if (!into.writeable())
+                    throw py::value_error("into must be writeable");
+                if (py::isinstance<py::array_t<float>>(into))
+                {
+                    auto typed = py::reinterpret_borrow<py::array_t<float>>(into);
+                    copyAttribute(obj, attr, typed);
                 }
-
-                return py::memoryview(py::buffer_info()); });
-
-    auto pdm = py::class_<Partio::ParticlesDataMutable, Partio::ParticlesData, custom_ptr<Partio::ParticlesDataMutable>>(m, "ParticlesDataMutable")
-                   .def("data_buffer_mutable", [](Partio::ParticlesDataMutable &obj, Partio::ParticleAttribute &attr) -> py::memoryview
-                        {
-                const pybind11::ssize_t nparticles = obj.numParticles();
-                unsigned char* base_ptr = obj.dataWrite<unsigned char>(attr, 0);
-                const pybind11::ssize_t stride = obj.dataWrite<unsigned char>(attr, 1) - base_ptr;
-                Partio::ParticleAttributeType t = attr.type;
-                switch(t){
-                    case Partio::ParticleAttributeType::VECTOR:
-                        return py::memoryview::from_buffer<float>(reinterpret_cast<float*>(base_ptr), {nparticles, (pybind11::ssize_t)3}, {stride, (pybind11::ssize_t)sizeof(float)});
-                    case Partio::ParticleAttributeType::FLOAT:
-                        return py::memoryview::from_buffer<float>(reinterpret_cast<float*>(base_ptr), {nparticles, (pybind11::ssize_t)1}, {stride, (pybind11::ssize_t)sizeof(float)});
-                    case Partio::ParticleAttributeType::INT:
-                        return py::memoryview::from_buffer<int>(reinterpret_cast<int*>(base_ptr), {nparticles, (pybind11::ssize_t)1}, {stride, (pybind11::ssize_t)sizeof(int)});
-                    default: break;
+                else if (py::isinstance<py::array_t<double>>(into))
+                {
+                    auto typed = py::reinterpret_borrow<py::array_t<double>>(into);
+                    copyAttribute(obj, attr, typed);
+                }
+                else if (py::isinstance<py::array_t<int>>(into))
+                {
+                    auto typed = py::reinterpret_borrow<py::array_t<int>>(into);
+                    copyAttribute(obj, attr, typed);
+                }
+                else
+                    throw py::type_error("into must have dtype float32, float64 or int32");
+                return into; },
+            py::arg("attr"), py::arg("into"))
+        .def(
+            "findPoints", [](const Partio::ParticlesData &obj, const std::array<float, 3> &bboxMin, const std::array<float, 3> &bboxMax)
+            {
+                std::vector<Partio::ParticleIndex> points;
+                {
+                    py::gil_scoped_release release;
+                    obj.findPoints(bboxMin.data(), bboxMax.data(), points);
                 }
+                return py::array_t<Partio::ParticleIndex>(points.size(), points.data()); },
+            py::arg("bboxMin"), py::arg("bboxMax"), "Indices of the particles inside the box, sort() has to be called first");
 
-                return py::memoryview(py::buffer_info()); })
+    auto pdm = py::class_<Partio::ParticlesDataMutable, Partio::ParticlesData, particles_ptr<Partio::ParticlesDataMutable>>(m, "ParticlesDataMutable")
+                   .def(
+                       "data_buffer_mutable", [](Partio::ParticlesDataMutable &obj, const Partio::ParticleAttribute &attr)
+                       { return attributeArray(particlesShare(obj), obj.dataWrite<unsigned char>(attr, 0), obj.numParticles() > 1 ? obj.dataWrite<unsigned char>(attr, 1) : 0, obj.numParticles(), attr, true); },
+                       py::arg("attr"), "Writeable view of an attribute, the particle set is kept until the view is gone, even after release()")
+                   .def("sort", &Partio::ParticlesDataMutable::sort, "Builds the kd-tree that findPoints searches",
+                        py::call_guard<py::gil_scoped_release>())
                    .def("addAttribute", &Partio::ParticlesDataMutable::addAttribute)
                    .def("addParticle", &Partio::ParticlesDataMutable::addParticle)
-                   .def("addParticles", &Partio::ParticlesDataMutable::addParticles);
+                   .def(
+                       "addParticles", [](Partio::ParticlesDataMutable &obj, const int count)
+                       {
+                           // the iterator that addParticles returns is not bound, the index is enough to address the new particles
+                           const int first = obj.numParticles();
+                           obj.addParticles(count);
+                           return first; },
+                       py::arg("count"), "Adds count particles and returns the index of the first one");
 
     py::enum_<Partio::ParticleAttributeType>(m, "ParticleAttributeType")
         .value("NONE", Partio::ParticleAttributeType::NONE)
@@ -135,4 +512,100 @@ PYBIND11_MODULE(partio_pybind, m)
         .def_readonly("count", &Partio::FixedAttribute::count)
         .def_readonly("name", &Partio::FixedAttribute::name)
         .def_readonly("attributeIndex", &Partio::FixedAttribute::attributeIndex);
+
+    // live frames from a running simulation, see PartioSharedFrames.h
+    py::class_<Partio::SharedFrameWriter, std::unique_ptr<Partio::SharedFrameWriter>>(m, "SharedFrameWriter")
+        .def(
+            py::init([](const char *name, const int numSlots, const size_t slotBytes)
+                     {
+                Partio::SharedFrameWriter *writer = Partio::SharedFrameWriter::create(name, numSlots, slotBytes);
+                if (!writer)
+                    throw std::runtime_error(std::string("failed to create shared frames ") + name);
+                return std::unique_ptr<Partio::SharedFrameWriter>(writer); }),
+            py::arg("name"), py::arg("numSlots") = 3, py::arg("slotBytes"))
+        .def("publish", &Partio::SharedFrameWriter::publish, py::arg("particlesData"), py::arg("frame"),
+             py::call_guard<py::gil_scoped_release>())
+        .def("published", &Partio::SharedFrameWriter::published);
+
+    py::class_<Partio::SharedFrameReader, std::shared_ptr<Partio::SharedFrameReader>>(m, "SharedFrameReader")
+        .def_static(
+            "open", [](const char *name)
+            { return std::shared_ptr<Partio::SharedFrameReader>(Partio::SharedFrameReader::open(name)); },
+            py::arg("name"), "Maps the shared frames name, None if no producer created them")
+        .def(
+            "acquire", [](const std::shared_ptr<Partio::SharedFrameReader> &reader) -> py::object
+            {
+                SharedFrameView view;
+                view.reader = reader;
+                if (!reader->acquire(view.frame))
+                    return py::none();
+                return py::cast(std::move(view)); },
+            "Newest complete frame or None")
+        .def("closed", &Partio::SharedFrameReader::closed);
+
+    // provides the reading part of the ParticlesData interface that the add-on uses
+    py::class_<SharedFrameView>(m, "SharedFrame")
+        .def_property_readonly("counter", [](const SharedFrameView &view)
+                               { return view.frame.counter; })
+        .def_property_readonly("frame", [](const SharedFrameView &view)
+                               { return view.frame.frame; })
+        .def_property_readonly("time", [](const SharedFrameView &view)
+                               { return view.frame.time; })
+        .def("numParticles", [](const SharedFrameView &view)
+             { return view.frame.numParticles; })
+        .def("numAttributes", [](const SharedFrameView &view)
+             { return (int)view.frame.attributes.size(); })
+        .def("attributeInfo", &SharedFrameView::attributeInfo)
+        .def(
+            "attributeInfo", [](const SharedFrameView &view, const std::string &name)
+            {
+                for (int i = 0; i < (int)view.frame.attributes.size(); i++)
+                    if (view.frame.attributes[i].name == name)
+                        return view.attributeInfo(i);
+                throw py::key_error("no attribute " + name + " in shared frame"); })
+        .def(
+            "valid", [](const SharedFrameView &view)
+            { return view.reader->valid(view.frame); },
+            "Whether the producer did not overwrite the frame yet")
+        .def(
+            "array", [](py::object self, const Partio::ParticleAttribute &attr)
+            {
+                const SharedFrameView &view = self.cast<const SharedFrameView &>();
+                const Partio::SharedAttribute &shared = view.attribute(attr);
+                // read-only view into shared memory, the array keeps the frame and so the mapping alive
+                py::array result;
+                if (shared.type == Partio::ParticleAttributeType::INT)
+                    result = py::array_t<int>({(pybind11::ssize_t)view.frame.numParticles, (pybind11::ssize_t)shared.count}, reinterpret_cast<const int *>(shared.data), self);
+                else
+                    result = py::array_t<float>({(pybind11::ssize_t)view.frame.numParticles, (pybind11::ssize_t)shared.count}, reinterpret_cast<const float *>(shared.data), self);
+                py::detail::array_proxy(result.ptr())->flags &= ~py::detail::npy_api::NPY_ARRAY_WRITEABLE_;
+                return result; },
+            py::arg("attr"))
+        .def(
+            "data_copy", [](const SharedFrameView &view, const Partio::ParticleAttribute &attr, py::array into) -> py::array
+            {
+                const Partio::SharedAttribute &shared = view.attribute(attr);
+                if (into.ndim() != 2 || into.shape(0) < view.frame.numParticles || into.shape(1) < shared.count)
+                    throw py::value_error("into must be a 2d array with at least numParticles() rows and attribute count columns");
+                if (!into.writeable())
+                    throw py::value_error("into must be writeable");
+                if (py::isinstance<py::array_t<float>>(into))
+                {
+                    auto typed = py::reinterpret_borrow<py::array_t<float>>(into);
+                    copySharedAttribute(view, shared, typed);
+                }
+                else if (py::isinstance<py::array_t<double>>(into))
+                {
+                    auto typed = py::reinterpret_borrow<py::array_t<double>>(into);
+                    copySharedAttribute(view, shared, typed);
+                }
+                else if (py::isinstance<py::array_t<int>>(into))
+                {
+                    auto typed = py::reinterpret_borrow<py::array_t<int>>(into);
+                    copySharedAttribute(view, shared, typed);
+                }
+                else
+                    throw py::type_error("into must have dtype float32, float64 or int32");
+                return into; },
+            py::arg("attr"), py::arg("into"));
 }
\ No newline at end of file
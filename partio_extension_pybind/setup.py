@@ -21,6 +21,7 @@ __version__ = "0.0.1"
 
 defs = []
 cxx_args = []
+libs = []
 
 defs.append(('PARTIO_USE_ZLIB', None))
 
@@ -29,6 +30,7 @@ if platform.system() == 'Windows':
     defs.append(('_USE_MATH_DEFINES', None))
 elif platform.system() == 'Linux':
     cxx_args = ["-fPIC", "-w"]
+    libs = ["rt"]
 
 ext_modules = [
     Pybind11Extension("partio_pybind",
@@ -43,14 +45,18 @@ ext_modules = [
                           '../extern/partio/src/lib/io/BIN.cpp',
                           '../extern/partio/src/lib/io/GEO.cpp',
                           '../extern/partio/src/lib/io/MC.cpp',
+                          '../extern/partio/src/lib/io/MappedFile.cpp',
                           '../extern/partio/src/lib/io/ParticleIO.cpp',
+                          '../extern/partio/src/lib/io/PBK.cpp',
                           '../extern/partio/src/lib/io/PDA.cpp',
                           '../extern/partio/src/lib/io/PDB.cpp',
                           '../extern/partio/src/lib/io/PDC.cpp',
                           '../extern/partio/src/lib/io/PRT.cpp',
+                          '../extern/partio/src/lib/io/PSC.cpp',
                           '../extern/partio/src/lib/io/PTC.cpp',
                           '../extern/partio/src/lib/io/PTS.cpp',
                           '../extern/partio/src/lib/io/RIB.cpp',
+                          '../extern/partio/src/lib/io/SharedFrames.cpp',
                           '../extern/partio/src/lib/io/ZIP.cpp',
                           '../extern/zlib/src/adler32.c',
                           '../extern/zlib/src/compress.c',
@@ -68,6 +74,7 @@ ext_modules = [
                       include_dirs=['../extern/partio/src/lib', '../extern/zlib/src'],
                       # Example: passing in the version to the compiled code
                       define_macros=[('VERSION_INFO', __version__)] + defs,
+                      libraries=libs,
                       cxx_std=14
                       ),
 ]
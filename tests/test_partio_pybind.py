@@ -0,0 +1,108 @@
+"""Tests of the partio_pybind module, run with python -m pytest tests (see README.md)."""
+import gc
+import numpy as np
+import pytest
+import partio_pybind
+
+
+def createParticles(position):
+    p = partio_pybind.create()
+    posAttr = p.addAttribute("position", partio_pybind.ParticleAttributeType.VECTOR, 3)
+    p.addParticles(len(position))
+    np.asarray(p.data_buffer_mutable(posAttr))[:] = position
+    return p
+
+
+def test_method_after_release_raises():
+    p = createParticles(np.zeros((4, 3), dtype=np.float32))
+    posAttr = p.attributeInfo("position")
+    p.release()
+    for call in (lambda: p.numParticles(), lambda: p.attributeInfo(0), lambda: p.memoryUsage(),
+                 lambda: p.data_buffer(posAttr), lambda: p.data_buffer_mutable(posAttr), lambda: p.addParticles(1),
+                 lambda: partio_pybind.computeConnectedComponents(p, 1.)):
+        with pytest.raises(ValueError, match="particle set has been released"):
+            call()
+    # a second release does nothing
+    p.release()
+
+
+def test_method_after_with_block_raises():
+    with createParticles(np.zeros((4, 3), dtype=np.float32)) as p:
+        assert p.numParticles() == 4
+    with pytest.raises(ValueError, match="particle set has been released"):
+        p.numParticles()
+
+
+def test_views_outlive_release():
+    position = np.arange(12, dtype=np.float32).reshape(4, 3)
+    p = createParticles(position)
+    liveObjects = partio_pybind.liveObjects()
+    view = p.data_buffer(p.attributeInfo("position"))
+    p.release()
+    # the set is freed when its last view is gone
+    assert partio_pybind.liveObjects() == liveObjects
+    np.testing.assert_array_equal(view, position)
+    del view
+    gc.collect()
+    assert partio_pybind.liveObjects() == liveObjects - 1
+
+
+def test_new_set_after_release():
+    for i in range(100):
+        p = partio_pybind.create()
+        p.release()
+        q = partio_pybind.create()
+        # a set allocated at the address of the released one is not mistaken for it
+        assert q.numParticles() == 0
+        q.release()
+
+
+def test_interpolate_positions_empty_frame():
+    empty = np.zeros((0, 3), dtype=np.float32)
+    with createParticles(empty) as frame0, createParticles(empty) as frame1:
+        # NumPy gives an empty array zero strides
+        assert partio_pybind.interpolatePositions(frame0, frame1, 0.5, 1., empty).shape == (0, 3)
+        assert partio_pybind.interpolatePositions(frame0, None, 0.5, 1., np.empty((4, 3), dtype=np.float32)).shape == (4, 3)
+
+
+def test_interpolate_positions_in_place():
+    position = np.arange(12, dtype=np.float32).reshape(4, 3)
+    with createParticles(position) as frame0, createParticles(position + 2.) as frame1:
+        into = np.empty((6, 3), dtype=np.float32)
+        assert partio_pybind.interpolatePositions(frame0, frame1, 0.5, 1., into) is into
+        np.testing.assert_array_equal(into[:4], position + 1.)
+        for wrong in (np.empty((4, 3)), np.empty((4, 6), dtype=np.float32)[:, ::2], np.empty((3, 3), dtype=np.float32)):
+            with pytest.raises(ValueError):
+                partio_pybind.interpolatePositions(frame0, frame1, 0.5, 1., wrong)
+
+
+@pytest.mark.parametrize("extension", ["pdb32", "pdb64"])
+def test_pdb_channel_size_not_multiple_of_type(tmp_path, extension):
+    fileName = str(tmp_path / ("particles." + extension))
+    with createParticles(np.arange(300, dtype=np.float32).reshape(100, 3)) as p:
+        partio_pybind.write(fileName, p, False, False)
+    with partio_pybind.read(fileName, False) as q:
+        assert q.numParticles() == 100
+    # the data size of the channel follows its name and type
+    data = bytearray(open(fileName, "rb").read())
+    offset = data.index(b"position\0") + len(b"position\0") + 4
+    assert int.from_bytes(data[offset:offset + 4], "little") == 12
+    data[offset:offset + 4] = (13).to_bytes(4, "little")
+    open(fileName, "wb").write(data)
+    assert partio_pybind.read(fileName, False) is None
+
+
+@pytest.mark.parametrize("extension", ["geo", "pda"])
+@pytest.mark.parametrize("chunks", ["1", "4"])
+def test_ascii_split_and_truncated(tmp_path, monkeypatch, extension, chunks):
+    # forces the split of the point block into chunks, also on a single core
+    monkeypatch.setenv("PARTIO_ASCII_THREADS", chunks)
+    fileName = str(tmp_path / ("particles." + extension))
+    position = np.arange(3000, dtype=np.float32).reshape(1000, 3)
+    with createParticles(position) as p:
+        partio_pybind.write(fileName, p, False, False)
+    with partio_pybind.read(fileName, False) as q:
+        np.testing.assert_array_equal(q.data_copy(q.attributeInfo("position"), np.empty((1000, 3), dtype=np.float32)), position)
+    data = open(fileName, "rb").read()
+    open(fileName, "wb").write(data[:len(data) // 2])
+    assert partio_pybind.read(fileName, False) is None